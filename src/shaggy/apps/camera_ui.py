@@ -6,6 +6,7 @@ from PySide6.QtWidgets import QApplication, QHBoxLayout, QMainWindow, QTabWidget
 from shaggy.widgets.channel_levels import AcousticChannels
 from shaggy.widgets.camera_display import CameraDisplay
 from shaggy.widgets.camera_status_bar import CameraStatusBar
+from shaggy.widgets.metrics_table import MetricsTable
 from shaggy.widgets.spectra import SpectraWidget
 from shaggy.transport.host_bridge import HostBridge
 from shaggy.transport import library
@@ -20,7 +21,34 @@ stft_cfg = {
         'window_spec': "HAMMING",
         'scaling_spec': "psd", 
         }
-CFG = {'gstreamer_src': {'sample_rate': 48000, 'channels': 8}, 'stft': stft_cfg}
+psd_cfg = {
+        'num_windows': 1,
+        'window_hop': 1,
+        'mode': "welch",
+        }
+transport_cfg = {
+        'wire': "protobuf",
+        # per hop latency trace frames, summarized on exit
+        'trace': False,
+        }
+execution_cfg = {
+        library.BlockName.ShortTimeFFT.value: library.ExecutionMode.Thread.value,
+        library.BlockName.ChannelLevels.value: library.ExecutionMode.FanOut.value,
+        library.BlockName.PowerSpectralDensity.value: library.ExecutionMode.FanOut.value,
+        }
+delivery_cfg = {
+        library.BlockName.ChannelLevels.value: {'policy': "latest", 'hwm': 2},
+        library.BlockName.PowerSpectralDensity.value: {'policy': "bounded", 'hwm': 10},
+        }
+CFG = {
+        'gstreamer_src': {'sample_rate': 48000, 'channels': 8},
+        'stft': stft_cfg,
+        'psd': psd_cfg,
+        'transport': transport_cfg,
+        'execution': execution_cfg,
+        'delivery': delivery_cfg,
+        'metrics': {'interval_s': 1.},
+        }
 
 
 
@@ -64,14 +92,16 @@ class MainWindow(QMainWindow):
         command = Command()
         command.command = "startup"
         command.thread_id = psd_thread_id
-        command.block_name = library.BlockName.ShortTimeFFT.value
+        command.block_name = library.BlockName.PowerSpectralDensity.value
         command.config = OmegaConf.to_yaml(CFG)
         self.host_bridge.worker_hub.add_worker(command)
         self.spectra = SpectraWidget(
             CFG,
             self.host_bridge,
             psd_thread_id,
+            block_name=library.BlockName.PowerSpectralDensity.value,
         )
+        self.metrics_table = MetricsTable(self.host_bridge)
         channels_tab = QWidget()
         channels_layout = QVBoxLayout(channels_tab)
         channels_layout.setContentsMargins(0, 0, 0, 0)
@@ -79,8 +109,14 @@ class MainWindow(QMainWindow):
         channels_layout.addWidget(self.channel_levels, stretch=1)
         self.tabs.addTab(channels_tab, "channels")
         self.tabs.addTab(self.spectra, "specta")
+        self.tabs.addTab(self.metrics_table, "metrics")
         self._tabs_initialized = True
 
+    def closeEvent(self, event) -> None:
+        if CFG['transport']['trace']:
+            print(self.host_bridge.worker_hub.trace_collector.format())
+        super().closeEvent(event)
+
     def _toggle_record(self, checked: bool) -> None:
         command = Command()
         command.command = "start-record" if checked else "stop-record"
@@ -0,0 +1,70 @@
+#!/usr/bin/env -S uv run
+"""Compute the STFT and PSD of recorded sessions offline, in parallel, as the edge blocks would stream them.
+
+Sessions are session folders, WAV files, or folders of sessions, e.g. a day of ~/data/camera. Results go
+to stft and psd folders in each session, or under --output, see shaggy.recording.spectrogram, and the
+browsing pyramid of a spectrogram to a pyramid folder inside it, see shaggy.recording.pyramid.
+"""
+import os
+
+import click
+from omegaconf import OmegaConf
+
+from shaggy.recording import batch
+
+stft_cfg = {
+        'window_length': 12000,
+        'stride_length': 6000,
+        'window_spec': "HAMMING",
+        'scaling_spec': "psd",
+        }
+psd_cfg = {
+        'num_windows': 1,
+        'window_hop': 1,
+        'mode': "welch",
+        }
+CFG = {
+        'stft': stft_cfg,
+        'psd': psd_cfg,
+        }
+
+
+@click.command()
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--config', 'config_path', type=click.Path(exists=True, dir_okay=False),
+              help="YAML with stft and psd sections, merged over the defaults.")
+@click.option('--output', type=click.Path(file_okay=False), help="Results folder, the session folders if not given.")
+@click.option('--workers', 'num_workers', default=os.cpu_count(), help="Worker processes.")
+@click.option('--chunk-s', default=60., help="Seconds of recording in each STFT chunk.")
+@click.option('--stft/--no-stft', 'do_stft', default=True)
+@click.option('--psd/--no-psd', 'do_psd', default=True)
+@click.option('--pyramid/--no-pyramid', 'do_pyramid', default=True, help="Build the browsing pyramid of each STFT.")
+def my_app(paths, config_path, output, num_workers, chunk_s, do_stft, do_psd, do_pyramid) -> None:
+    cfg = OmegaConf.create(CFG)
+    if config_path:
+        cfg = OmegaConf.merge(cfg, OmegaConf.load(config_path))
+    cfg = OmegaConf.to_container(cfg)
+
+    sessions = []
+    tasks = []
+    for session_path in batch.find_sessions(paths):
+        session_tasks = batch.plan_session(session_path, cfg, output, chunk_s, do_stft, do_psd)
+        if session_tasks is None:
+            click.echo(f"Skipping {session_path}, shorter than half a window.", err=True)
+            continue
+        sessions.append(session_path)
+        tasks.extend(session_tasks)
+    click.echo(f"{len(sessions)} sessions, {len(tasks)} tasks on {num_workers} workers")
+    with click.progressbar(batch.run_tasks(tasks, num_workers), length=len(tasks)) as results:
+        for _ in results:
+            pass
+
+    if do_stft and do_pyramid:
+        tasks = [batch.plan_pyramid(session_path, output) for session_path in sessions]
+        with click.progressbar(batch.run_tasks(tasks, num_workers), length=len(tasks), label="pyramids") as results:
+            for _ in results:
+                pass
+
+
+if __name__ == "__main__":
+    my_app()
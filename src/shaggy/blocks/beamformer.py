@@ -0,0 +1,71 @@
+"""Streaming STFT followed by delay-and-sum beam power, only the beam power map leaves the edge."""
+import zmq
+
+from shaggy.proto import codec, wire
+from shaggy.blocks.block import Block
+from shaggy.blocks.metrics import get_metrics_interval
+from shaggy.signal.beamformer import DelayAndSum
+from shaggy.signal.short_time_fft import ShortTimeFFT as STFT_Function
+from shaggy.transport import delivery, library, trace
+
+
+class Beamformer:
+    """Composition of buffer handling, short time FFT and delay-and-sum beam power."""
+    def __init__(self, cfg, gstreamer_src_address: str, thread_id: str, context: zmq.Context = None,
+                 mode: str = library.ExecutionMode.Thread.value):
+        """Setup components of streaming beam power computation."""
+        self.context = context or zmq.Context.instance()
+        self.thread_id = thread_id
+
+        self.short_time_fft = STFT_Function.from_cfg(cfg)
+        self.delay_and_sum = DelayAndSum.from_cfg(cfg)
+        num_channels = cfg['gstreamer_src'].get('channels')
+        if num_channels is not None and num_channels != self.delay_and_sum.num_channels:
+            raise ValueError(f"Source has {num_channels} channels, the mic array {self.delay_and_sum.num_channels}.")
+        self.wire_format = wire.get_wire_format(cfg)
+        self.publish_rate = self.short_time_fft.sample_rate / self.short_time_fft.stride_length
+
+        self.sub_addresses = {
+            library.BlockName.GStreamerSrc.value: gstreamer_src_address
+        }
+        self.block = Block(
+                thread_id,
+                self.sub_addresses,
+                library.get_block_sockets(library.BlockName.Beamformer.value, thread_id, mode),
+                self.context,
+                mode,
+                pub_policy=delivery.get_delivery_policy(cfg, library.BlockName.Beamformer.value),
+                sub_policies={
+                    library.BlockName.GStreamerSrc.value:
+                        delivery.get_delivery_policy(cfg, library.BlockName.GStreamerSrc.value),
+                },
+                tracing=trace.is_enabled(cfg),
+                block_name=library.BlockName.Beamformer.value,
+                metrics_interval_s=get_metrics_interval(cfg),
+                )
+        self.block.parse_sub = self.parse_sub
+        self.block.parse_control = self.parse_control
+        self.frame_number = 0
+
+    def run(self):
+        self.frame_number = 0
+        self.short_time_fft.reset_stream()
+        self.block.run()
+
+    def parse_sub(self, sub_id, topic, timestamp_ns, message):
+        stft_samples = self.short_time_fft.push(message.T)
+        if stft_samples is None:
+            return
+        self._publish_power(self.delay_and_sum.forward(stft_samples).numpy())
+
+    def parse_control(self, timestamp_ns, message):
+        self.block.shutdown()
+
+    def _publish_power(self, power):
+        """Publish (num_times, num_beams) beam power, a new array each call."""
+        if self.wire_format == wire.BINARY:
+            self.block.publish_array(library.BlockName.Beamformer.value, self.frame_number, power)
+        else:
+            msg = codec.detections_to_proto(power, self.delay_and_sum.angles, self.frame_number, self.publish_rate)
+            self.block.publish(library.BlockName.Beamformer.value, msg)
+        self.frame_number += 1
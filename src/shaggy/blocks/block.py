@@ -1,57 +1,142 @@
 import threading
+import time
+
+import numpy as np
 import zmq
 
-from shaggy.transport import library
+from shaggy.blocks import metrics
+from shaggy.proto import codec, wire
+from shaggy.proto.command_pb2 import Command
+from shaggy.transport import delivery, library, trace
+from shaggy.transport.sample_ring import SampleRingOverrun, SampleRingReader
+
+# protobuf messages decoded once on receipt, parse_sub is passed the decoded read only array
+DECODERS = {
+    library.BlockName.GStreamerSrc.value: codec.proto_to_samples,
+}
 
 class Block:
 
-    def __init__(self, thread_id: str, sub_addresses: dict, pub_address: str, context: zmq.Context = None):
+    def __init__(self, thread_id: str, sub_addresses: dict, pub_address: str | list, context: zmq.Context = None,
+                 mode: str = library.ExecutionMode.Thread.value, pub_policy: delivery.DeliveryPolicy = None,
+                 sub_policies: dict = None, tracing: bool = False, block_name: str = None,
+                 metrics_interval_s: float = None):
+        """
+        Args:
+            pub_policy: Delivery policy of the topic this block publishes.
+            sub_policies: Delivery policy of each subscription, keyed like sub_addresses.
+            tracing: Send a latency trace with each message published while parsing a received one.
+            block_name: Name reported in metrics snapshots.
+            metrics_interval_s: Seconds between metrics snapshots published, none if not given.
+        """
         self.context = context or zmq.Context.instance()
         self.thread_id = thread_id
+        self.mode = mode
 
         self.sub_addresses = sub_addresses
         self.pub_address = pub_address
+        self.pub_policy = pub_policy
+        self.sub_policies = sub_policies or {}
+        self.tracing = tracing
+        self.block_name = block_name
+        self.metrics = metrics.Metrics(metrics_interval_s)
 
         self._running = threading.Event()
 
         self.sub_sockets = None
         self.pub_socket = None
         self.control_socket = None
+        self.sample_rings = {}
+        self.num_overruns = 0
+        self.drop_counter = delivery.DropCounter()
+        self.sequences = {}
+        # trace of the message being parsed, with its receive and compute start times
+        self.trace = None
+        self.receive_ns = None
+        self.compute_start_ns = None
+        # blocks run in this thread on frames decoded here, see add_consumer
+        self.consumers = []
+        self.poller = None
 
     def run(self):
-        poller = self._setup_sockets()
-        self.startup_hook(poller)
+        self.poller = self._setup_sockets()
+        self.metrics.reset()
+        self.startup_hook(self.poller)
 
         self._running.set()
         while self._running.is_set():
-            socks = dict(poller.poll())
+            poll_start_ns = time.monotonic_ns()
+            socks = dict(self.poller.poll(self._get_poll_timeout(poll_start_ns)))
+            self.metrics.poll_wait_ns += time.monotonic_ns() - poll_start_ns
             for sub_id, sub_socket in self.sub_sockets.items():
                 if socks.get(sub_socket) == zmq.POLLIN:
-                    topic, timestamp_ns, message = sub_socket.recv_multipart()
-                    self.parse_sub(sub_id, topic, int(timestamp_ns), message)
+                    frames = self._recv(sub_id, sub_socket)
+                    receive_ns = time.monotonic_ns()
+                    self.metrics.add_queued(bool(sub_socket.getsockopt(zmq.EVENTS) & zmq.POLLIN))
+                    topic, timestamp_ns, message = wire.decode(frames)
+                    # trace frame, if sent, receive time and size, the trace is unpacked only by tracing blocks
+                    received = (frames[3] if len(frames) > 3 else None, receive_ns, sum(len(f) for f in frames))
+                    if isinstance(message, wire.RingReference):
+                        self._parse_ring_reference(sub_id, topic, timestamp_ns, message, received)
+                    else:
+                        if isinstance(message, bytes) and sub_id in DECODERS:
+                            message = DECODERS[sub_id](message)
+                        self._dispatch(sub_id, topic, timestamp_ns, message, received)
+            for consumer in list(self.consumers):
+                if socks.get(consumer.control_socket) == zmq.POLLIN:
+                    timestamp_ns, message = consumer.control_socket.recv_multipart()
+                    consumer._parse_control(int(timestamp_ns), message)
+                    if not consumer._running.is_set():
+                        self.remove_consumer(consumer)
             if socks.get(self.control_socket) == zmq.POLLIN:
                 timestamp_ns, message = self.control_socket.recv_multipart()
-                self.parse_control(int(timestamp_ns), message) 
+                self._parse_control(int(timestamp_ns), message)
+            now_ns = time.monotonic_ns()
+            for block in [self, *self.consumers]:
+                if block.metrics.is_due(now_ns):
+                    block.publish_metrics()
 
+        for consumer in list(self.consumers):
+            self.remove_consumer(consumer)
         for _, sub_socket in self.sub_sockets.items():
             sub_socket.close(0)
-        self.pub_socket.close(0)
-        self.control_socket.close(0)
+        self._close_sockets()
+        for sample_ring in self.sample_rings.values():
+            sample_ring.close()
+        self.sample_rings = {}
         self.shutdown_hook()
 
+    def add_consumer(self, consumer: "Block"):
+        """Run another block in this thread, it is passed every frame this block decodes.
+
+        The consumer keeps its own publish and control sockets but not its subscriptions, so each frame
+        is received and decoded once however many blocks in this process use it. Must be called from
+        the thread running this block.
+        """
+        consumer._bind_sockets()
+        consumer.metrics.reset()
+        self.poller.register(consumer.control_socket, zmq.POLLIN)
+        self.consumers.append(consumer)
+        consumer._running.set()
+        consumer.startup_hook(self.poller)
+
+    def remove_consumer(self, consumer: "Block"):
+        self.consumers.remove(consumer)
+        self.poller.unregister(consumer.control_socket)
+        consumer._running.clear()
+        consumer._close_sockets()
+        consumer.shutdown_hook()
+
     def _setup_sockets(self):
         self.sub_sockets = {}
         for id, address in self.sub_addresses.items():
             socket = self.context.socket(zmq.SUB)
+            delivery.set_receive_policy(socket, self.sub_policies.get(id))
             socket.connect(address)
-            socket.setsockopt_string(zmq.SUBSCRIBE, id)
+            socket.setsockopt_string(zmq.SUBSCRIBE, library.get_topic_prefix(id))
             self.sub_sockets[id] = socket
 
-        self.pub_socket = self.context.socket(zmq.PUB)
-        self.pub_socket.bind(self.pub_address)
-
-        self.control_socket = self.context.socket(zmq.PAIR)
-        self.control_socket.bind(library.get_control_socket(self.thread_id))
+        self._bind_sockets()
 
         poller = zmq.Poller()
         for sub_id, sub_socket in self.sub_sockets.items():
@@ -59,6 +144,133 @@ class Block:
         poller.register(self.control_socket, zmq.POLLIN)
         return poller
 
+    def _bind_sockets(self):
+        self.pub_socket = self.context.socket(zmq.PUB)
+        delivery.set_send_policy(self.pub_socket, self.pub_policy)
+        pub_addresses = [self.pub_address] if isinstance(self.pub_address, str) else self.pub_address
+        for address in pub_addresses:
+            self.pub_socket.bind(address)
+
+        self.control_socket = self.context.socket(zmq.PAIR)
+        self.control_socket.bind(library.get_control_socket(self.thread_id, self.mode))
+
+    def _close_sockets(self):
+        self.pub_socket.close(0)
+        self.control_socket.close(0)
+
+    def _recv(self, sub_id, sub_socket):
+        """Receive the next message, or the newest for latest only subscriptions, counting drops."""
+        frames = sub_socket.recv_multipart(copy=False)
+        num_skipped = 0
+        policy = self.sub_policies.get(sub_id)
+        if policy is not None and policy.policy == delivery.LATEST:
+            frames, num_skipped = delivery.recv_latest(sub_socket, frames, copy=False)
+        self.drop_counter.update(sub_id, wire.get_sequence(frames[1]), num_skipped)
+        return frames
+
+    def _dispatch(self, sub_id, topic, timestamp_ns, message, received: tuple):
+        """Pass a decoded frame to this block and every consumer subscribed to it."""
+        self._parse_traced(sub_id, topic, timestamp_ns, message, received)
+        for consumer in self.consumers:
+            if sub_id in consumer.sub_addresses:
+                consumer._parse_traced(sub_id, topic, timestamp_ns, message, received)
+
+    def _parse_traced(self, sub_id, topic, timestamp_ns, message, received: tuple):
+        trace_frame, receive_ns, num_bytes = received
+        self.metrics.messages_in += 1
+        self.metrics.bytes_in += num_bytes
+        if self.tracing:
+            # untraced sources start the trace at their send time
+            self.trace = trace.Trace(timestamp_ns) if trace_frame is None else trace.Trace.unpack(trace_frame)
+            self.receive_ns = receive_ns
+        parse_start_ns = self.compute_start_ns = time.monotonic_ns()
+        try:
+            self.parse_sub(sub_id, topic, timestamp_ns, message)
+        finally:
+            self.trace = None
+            self.metrics.parse_ns += time.monotonic_ns() - parse_start_ns
+
+    def _parse_control(self, timestamp_ns, message):
+        """Answer stats commands, pass other commands to parse_control."""
+        command = Command()
+        command.ParseFromString(message)
+        if command.command == 'stats':
+            self.publish_metrics()
+        else:
+            self.parse_control(timestamp_ns, message)
+
+    def _get_poll_timeout(self, now_ns: int) -> int | None:
+        """Poll timeout until the next metrics snapshot of this block or a consumer."""
+        timeouts = [block.metrics.get_timeout_ms(now_ns) for block in [self, *self.consumers]]
+        timeouts = [timeout for timeout in timeouts if timeout is not None]
+        return min(timeouts) if timeouts else None
+
+    def _get_trace_frame(self, topic: str) -> bytes | None:
+        """Trace of the message being parsed with this block's hop appended, None outside parse_sub."""
+        if self.trace is None:
+            return None
+        published = self.trace.copy()
+        published.add(topic, self.thread_id, trace.RECEIVE, self.receive_ns)
+        published.add(topic, self.thread_id, trace.COMPUTE_START, self.compute_start_ns)
+        published.add(topic, self.thread_id, trace.COMPUTE_END)
+        published.add(topic, self.thread_id, trace.PUBLISH)
+        return published.pack()
+
+    def _parse_ring_reference(self, sub_id, topic, timestamp_ns, reference: wire.RingReference, received: tuple):
+        """Pass a view of shared memory samples to parse_sub, counting any overrun."""
+        header = reference.header
+        ring_name = library.get_sample_ring_name(wire.TOPIC_NAMES[header.topic_id], header.thread_id)
+        if ring_name not in self.sample_rings:
+            self.sample_rings[ring_name] = SampleRingReader.attach(ring_name)
+        sample_ring = self.sample_rings[ring_name]
+        try:
+            samples = sample_ring.read(reference.start, header.shape[0])
+        except SampleRingOverrun:
+            self.num_overruns += 1
+            return
+        self._dispatch(sub_id, topic, timestamp_ns, samples, received)
+        if not sample_ring.is_valid(reference.start):
+            self.num_overruns += 1
+
+    def publish(self, topic: str, message: bytes, thread_id: str = None):
+        """Publish a protobuf message with a decimal timestamp frame, topic is the block name.
+
+        thread_id is that of a sub-topic, see library.get_sub_thread_id, this block's if None.
+        """
+        topic_frame = library.get_topic(topic, thread_id or self.thread_id)
+        sequence = self.sequences.get(topic_frame, 0)
+        self.sequences[topic_frame] = sequence + 1
+        self.metrics.messages_out += 1
+        self.metrics.bytes_out += len(message)
+        trace_frame = self._get_trace_frame(topic)
+        self.pub_socket.send_string(topic_frame, zmq.SNDMORE)
+        self.pub_socket.send(wire.pack_stamp(sequence), zmq.SNDMORE)
+        if trace_frame is None:
+            self.pub_socket.send(message)
+        else:
+            self.pub_socket.send_multipart([message, trace_frame])
+
+    def publish_array(self, topic: str, frame_number: int, array: np.ndarray, track: bool = False,
+                      thread_id: str = None, **header_fields):
+        """Publish an array with a binary header, the array must not be modified afterwards.
+
+        With track, returns a tracker that is done once 0MQ has released the array memory. thread_id is
+        that of a sub-topic as for publish.
+        """
+        self.metrics.messages_out += 1
+        self.metrics.bytes_out += array.nbytes
+        return wire.send_array(self.pub_socket, topic, thread_id or self.thread_id, frame_number, array, track=track,
+                               trace=self._get_trace_frame(topic), **header_fields)
+
+    def publish_metrics(self):
+        """Publish a snapshot of this block's metrics on the metrics topic."""
+        msg = self.metrics.snapshot(self.block_name, self.thread_id, self.drop_counter.total, self.num_overruns)
+        self.pub_socket.send_multipart([
+            library.get_topic(library.BlockName.Metrics.value, self.thread_id).encode(),
+            wire.pack_stamp(),
+            msg.SerializeToString(),
+        ])
+
     def parse_sub(self, sub_id, topic, timestamp_ns, message):
         pass
 
@@ -1,56 +1,285 @@
+import hashlib
+import logging
+import multiprocessing
 import threading
 import time
 
+from omegaconf import OmegaConf
+
 from shaggy.proto.command_pb2 import Command
 
-from shaggy.blocks import channel_levels, gstreamer_src, heartbeat, short_time_fft
+from shaggy.blocks import (
+        beamformer, channel_levels, fan_out, heartbeat, multi_resolution_stft, power_spectral_density, replay_src,
+        scheduling, short_time_fft, synthetic_src,
+        )
 from shaggy.transport import library
 
 import zmq
 
+
+SYNTHETIC_SOURCE = "synthetic"
+REPLAY_SOURCE = "replay"
+
+logger = logging.getLogger(__name__)
+
+
+def get_block_key(block_name: str, cfg, source_id: str = None) -> str:
+    """Hash of a block's name, source and resolved config, equal for blocks computing the same stream."""
+    yaml_cfg = OmegaConf.to_yaml(cfg, resolve=True, sort_keys=True)
+    return hashlib.sha256(f"{block_name}\n{source_id}\n{yaml_cfg}".encode()).hexdigest()
+
+
+def get_shutdown_command(thread_name: str) -> Command:
+    """Shutdown command of a block thread name, block name and thread id joined by the last hyphen."""
+    thread_info = thread_name.split('-')
+    command = Command()
+    command.command = 'shutdown'
+    command.block_name = '-'.join(thread_info[:-1])
+    command.thread_id = thread_info[-1]
+    return command
+
+
+def run_block(factory, args, mode, cores=None, torch_threads=None):
+    """Construct and run a block, the entry point of blocks run as a spawned process."""
+    if cores is not None:
+        scheduling.pin_current_thread(cores)
+    scheduling.set_torch_threads(torch_threads)
+    instance = factory(*args, context=None, mode=mode)
+    instance.run()
+
+
 class BlockHub:
+    """Starts blocks and routes commands to them.
+
+    Blocks started with a config are shared: a startup whose block name, source and config match a
+    running block attaches to it instead of starting another, its thread name becoming an alias of the
+    running block's. Each startup holds a reference, and the block is shut down when the last is released.
+    A startup under the thread name of a running block with another config is rejected.
+
+    Sharing is between the startups of the one client on the command socket of the EdgeBridge, a PAIR socket,
+    and a missed heartbeat shuts down every block whatever its references.
+    """
 
     def __init__(self, address, context: zmq.Context = None):
         self.context = context or zmq.Context.instance()
         self.address = address
         self.command_pairs = {}
         self.block_threads = {}
+        self.block_modes = {}
+        self.fan_outs = {}
+        # config key to thread name of the running block, users of each shared block and alias thread names
+        self.block_keys = {}
+        self.ref_counts = {}
+        self.aliases = {}
+        # applied placement of each block thread, see blocks.scheduling
+        self.layout = {}
+        self.process_context = multiprocessing.get_context("spawn")
 
     def start_heartbeat(self, thread_id):
-        instance = heartbeat.Heartbeat(thread_id, self.context)
-        return self._start_block(instance, library.BlockName.Heartbeat.value, thread_id)
+        return self._start_block(
+                heartbeat.Heartbeat,
+                (thread_id,),
+                library.BlockName.Heartbeat.value,
+                thread_id,
+                library.ExecutionMode.Thread.value,
+                )
+
+    def start_gstreamer_src(self, cfg, thread_id, mode=library.ExecutionMode.Thread.value):
+        """Start the audio source, the synthetic or replay source if requested by the gstreamer_src source key."""
+        source = cfg['gstreamer_src'].get('source')
+        if source == SYNTHETIC_SOURCE:
+            factory = synthetic_src.SyntheticSrc.from_cfg
+        elif source == REPLAY_SOURCE:
+            factory = replay_src.ReplaySrc.from_cfg
+        else:
+            # imported on use, the synthetic and replay sources run without GStreamer installed
+            from shaggy.blocks import gstreamer_src
+            factory = gstreamer_src.GStreamerSrc.from_cfg
+        return self._start_block(
+                factory,
+                (cfg, thread_id, self.address),
+                library.BlockName.GStreamerSrc.value,
+                thread_id,
+                mode,
+                cfg=cfg,
+                )
+
+    def start_channel_levels(self, gstreamer_src_id, cfg, thread_id, mode=library.ExecutionMode.Thread.value):
+        return self._start_block(
+                channel_levels.ChannelLevels,
+                (cfg, self.get_block_address(gstreamer_src_id, mode), thread_id),
+                library.BlockName.ChannelLevels.value,
+                thread_id,
+                mode,
+                gstreamer_src_id,
+                cfg=cfg,
+                )
+
+    def start_short_time_fft(self, gstreamer_src_id, cfg, thread_id, mode=library.ExecutionMode.Thread.value):
+        return self._start_block(
+                short_time_fft.ShortTimeFFT,
+                (cfg, self.get_block_address(gstreamer_src_id, mode), thread_id),
+                library.BlockName.ShortTimeFFT.value,
+                thread_id,
+                mode,
+                gstreamer_src_id,
+                cfg=cfg,
+                )
+
+    def start_power_spectral_density(self, gstreamer_src_id, cfg, thread_id,
+                                     mode=library.ExecutionMode.Thread.value):
+        return self._start_block(
+                power_spectral_density.PowerSpectralDensity,
+                (cfg, self.get_block_address(gstreamer_src_id, mode), thread_id),
+                library.BlockName.PowerSpectralDensity.value,
+                thread_id,
+                mode,
+                gstreamer_src_id,
+                cfg=cfg,
+                )
+
+    def start_beamformer(self, gstreamer_src_id, cfg, thread_id, mode=library.ExecutionMode.Thread.value):
+        return self._start_block(
+                beamformer.Beamformer,
+                (cfg, self.get_block_address(gstreamer_src_id, mode), thread_id),
+                library.BlockName.Beamformer.value,
+                thread_id,
+                mode,
+                gstreamer_src_id,
+                cfg=cfg,
+                )
+
+    def start_multi_resolution_stft(self, gstreamer_src_id, cfg, thread_id,
+                                    mode=library.ExecutionMode.Thread.value):
+        return self._start_block(
+                multi_resolution_stft.MultiResolutionSTFT,
+                (cfg, self.get_block_address(gstreamer_src_id, mode), thread_id),
+                library.BlockName.MultiResolutionSTFT.value,
+                thread_id,
+                mode,
+                gstreamer_src_id,
+                cfg=cfg,
+                )
 
-    def start_gstreamer_src(self, cfg, thread_id):
-        instance = gstreamer_src.GStreamerSrc.from_cfg(cfg, thread_id, self.address, self.context)
-        return self._start_block(instance, library.BlockName.GStreamerSrc.value, thread_id)
+    def get_block_address(self, thread_name, mode=library.ExecutionMode.Thread.value):
+        """Address a subscriber running in mode should connect to for a running block."""
+        if self.block_modes[thread_name] == library.ExecutionMode.Process.value:
+            mode = library.ExecutionMode.Process.value
+        return library.get_local_address(thread_name, mode)
 
-    def start_channel_levels(self, gstreamer_src_id, cfg, thread_id):
-        instance = channel_levels.ChannelLevels(cfg, gstreamer_src_id, thread_id, self.context)
-        return self._start_block(instance, library.BlockName.ChannelLevels.value, thread_id)
+    def get_running_name(self, thread_name: str) -> str:
+        """Thread name of the block running a started thread name, itself unless it is an alias."""
+        return self.aliases.get(thread_name, thread_name)
 
-    def start_short_time_fft(self, gstreamer_src_id, cfg, thread_id):
-        instance = short_time_fft.ShortTimeFFT(cfg, gstreamer_src_id, thread_id, self.context)
-        return self._start_block(instance, library.BlockName.ShortTimeFFT.value, thread_id)
+    def _start_block(self, factory, args, block_name, thread_id, mode, source_id=None, cfg=None):
+        """Start a block, or attach to a running one with the same config, returning the running thread name.
 
-    def _start_block(self, instance, block_name, thread_id):
+        source_id is the thread name of the block it consumes. Blocks started without a cfg are never shared.
+        """
         thread_name = library.get_thread_name(block_name, thread_id)
-        thread = threading.Thread(target=instance.run)
+        if cfg is not None:
+            block_key = get_block_key(block_name, cfg, source_id)
+            running_name = self.block_keys.get(block_key)
+            if running_name is not None:
+                self.ref_counts[running_name] += 1
+                if thread_name != running_name:
+                    self.aliases[thread_name] = running_name
+                return running_name
+            if thread_name in self.block_threads:
+                raise ValueError(f"Thread {thread_name} is already running with another config.")
+            self.block_keys[block_key] = thread_name
+            self.ref_counts[thread_name] = 1
+        policy = scheduling.SchedulingPolicy.from_cfg(cfg)
+        cores = torch_threads = None
+        if policy is not None:
+            cores = policy.get_cores(block_name)
+            torch_threads = policy.get_torch_threads(block_name, mode)
+            self.layout[thread_name] = (cores, torch_threads)
+            if block_name == library.BlockName.GStreamerSrc.value and policy.capture_cores:
+                self.layout[f"{thread_name} capture"] = (set(policy.capture_cores), None)
+        fan_out_name = None
+        if mode == library.ExecutionMode.Process.value:
+            thread = self.process_context.Process(
+                    target=run_block,
+                    args=(factory, args, mode, cores, torch_threads),
+                    name=thread_name,
+                    daemon=True,
+                    )
+        elif mode == library.ExecutionMode.FanOut.value:
+            instance = factory(*args, context=self.context, mode=mode)
+            fan_out_name = self._get_fan_out(source_id, instance.block, policy)
+            self.fan_outs[fan_out_name].attach(instance.block)
+            thread = self.block_threads[fan_out_name]
+        else:
+            instance = factory(*args, context=self.context, mode=mode)
+            thread = threading.Thread(target=scheduling.run_placed, args=(instance.run, cores, torch_threads))
         self.block_threads[thread_name] = thread
+        self.block_modes[thread_name] = mode
 
         command = self.context.socket(zmq.PAIR)
-        command.connect(library.get_control_socket(thread_id))
+        command.connect(library.get_control_socket(thread_id, mode))
         self.command_pairs[thread_name] = command
 
-        self.block_threads[thread_name].start()
+        if fan_out_name is None:
+            self.block_threads[thread_name].start()
+        else:
+            command = Command()
+            command.command = 'attach'
+            command.block_name = library.BlockName.FanOut.value
+            command.thread_id = source_id
+            self.passthrough(command)
+        if policy is not None:
+            logger.info("Placed %s\n%s", thread_name, scheduling.format_layout(self.layout))
         return thread_name
 
+    def _get_fan_out(self, source_id, consumer, policy=None):
+        """Thread name of the fan out shared by consumers of a source, started on first use."""
+        fan_out_name = library.get_thread_name(library.BlockName.FanOut.value, source_id)
+        if fan_out_name not in self.fan_outs:
+            (source_name, source_address), = consumer.sub_addresses.items()
+            self.fan_outs[fan_out_name] = fan_out.FanOut(source_name, source_address, source_id, self.context,
+                                                         metrics_interval_s=consumer.metrics.interval_s)
+            cores = torch_threads = None
+            if policy is not None:
+                cores = policy.get_cores(library.BlockName.FanOut.value)
+                torch_threads = policy.torch_threads
+                self.layout[fan_out_name] = (cores, torch_threads)
+            self._start_thread(fan_out_name, self.fan_outs[fan_out_name], source_id, cores, torch_threads)
+        return fan_out_name
+
+    def _start_thread(self, thread_name, instance, thread_id, cores=None, torch_threads=None):
+        self.block_threads[thread_name] = threading.Thread(target=scheduling.run_placed,
+                                                           args=(instance.run, cores, torch_threads))
+        self.block_modes[thread_name] = library.ExecutionMode.Thread.value
+        command = self.context.socket(zmq.PAIR)
+        command.connect(library.get_control_socket(thread_id))
+        self.command_pairs[thread_name] = command
+        self.block_threads[thread_name].start()
+
     def passthrough(self, command: Command):
-        thread_name = library.get_thread_name(command.block_name, command.thread_id)
+        thread_name = self.get_running_name(library.get_thread_name(command.block_name, command.thread_id))
         command_pair = self.command_pairs[thread_name]
         msg = command.SerializeToString()
         command_pair.send_string(f"{time.monotonic_ns()}", zmq.SNDMORE)
         command_pair.send(msg)
 
+    def release(self, command: Command) -> str | None:
+        """Release one startup of a block, shut the block down once no startup holds it.
+
+        Returns the thread name of the block shut down, None while it is still in use.
+        """
+        thread_name = library.get_thread_name(command.block_name, command.thread_id)
+        running_name = self.aliases.pop(thread_name, thread_name)
+        if running_name not in self.ref_counts:
+            # unshared blocks shut down on their own command
+            self.passthrough(command)
+            return running_name
+        self.ref_counts[running_name] -= 1
+        if self.ref_counts[running_name] > 0:
+            return None
+        self.shutdown(get_shutdown_command(running_name))
+        return running_name
+
     def shutdown(self, command: Command):
         thread_name = library.get_thread_name(command.block_name, command.thread_id)
         if thread_name != "":
@@ -58,6 +287,13 @@ class BlockHub:
             block_threads = {thread_name: self.block_threads[thread_name]}
             del self.command_pairs[thread_name]
             del self.block_threads[thread_name]
+            del self.block_modes[thread_name]
+            self.fan_outs.pop(thread_name, None)
+            self.ref_counts.pop(thread_name, None)
+            self.layout = {name: placement for name, placement in self.layout.items()
+                           if name.split(' ')[0] != thread_name}
+            self.block_keys = {key: name for key, name in self.block_keys.items() if name != thread_name}
+            self.aliases = {alias: name for alias, name in self.aliases.items() if name != thread_name}
         else:
             command_pairs = self.command_pairs
             block_threads = self.block_threads
@@ -69,17 +305,20 @@ class BlockHub:
                     library.BlockName.Heartbeat.value:
                     self.block_threads[library.BlockName.Heartbeat.value]
                     }
+            self.block_modes = {
+                    library.BlockName.Heartbeat.value:
+                    self.block_modes[library.BlockName.Heartbeat.value]
+                    }
+            self.fan_outs = {}
+            self.block_keys = {}
+            self.ref_counts = {}
+            self.aliases = {}
+            self.layout = {}
 
         for id, command_pair in command_pairs.items():
-            thread_info = id.split('-')
-            if thread_info[0] == library.BlockName.Heartbeat.value:
+            if id.split('-')[0] == library.BlockName.Heartbeat.value:
                 continue
-            block_name = '-'.join(thread_info[:-1])
-            command = Command()
-            command.command = 'shutdown'
-            command.block_name = block_name
-            command.thread_id = thread_info[-1]
-            msg = command.SerializeToString()
+            msg = get_shutdown_command(id).SerializeToString()
 
             command_pair.send_string(f"{time.monotonic_ns()}", zmq.SNDMORE)
             command_pair.send(msg)
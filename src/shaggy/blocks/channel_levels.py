@@ -3,29 +3,38 @@ import time
 import zmq
 
 from shaggy.blocks.block import Block
-from shaggy.blocks import gstreamer_src
+from shaggy.blocks.metrics import get_metrics_interval
 from shaggy.subs import channel_levels
-from shaggy.proto.samples_pb2 import Samples
-from shaggy.proto import channel_levels_pb2
-from shaggy.transport import library
+from shaggy.proto import channel_levels_pb2, wire
+from shaggy.transport import delivery, library, trace
 
 class ChannelLevels:
 
-    def __init__(self, cfg, gstreamer_src_id: str, thread_id: str, context: zmq.Context = None):
+    def __init__(self, cfg, gstreamer_src_address: str, thread_id: str, context: zmq.Context = None,
+                 mode: str = library.ExecutionMode.Thread.value):
         self.context = context or zmq.Context.instance()
         self.thread_id = thread_id
         self.context = context
-        self.gstreamer_src_id = gstreamer_src_id
         self.sub_addresses = {
-            library.BlockName.GStreamerSrc.value: f"inproc://{gstreamer_src_id}"
+            library.BlockName.GStreamerSrc.value: gstreamer_src_address
         }
         self.channel_levels = channel_levels.ChannelLevels.from_cfg(cfg)
+        self.wire_format = wire.get_wire_format(cfg)
 
         self.block = Block(
                 thread_id,
                 self.sub_addresses,
-                library.get_block_socket(library.BlockName.ChannelLevels.value, thread_id),
-                self.context
+                library.get_block_sockets(library.BlockName.ChannelLevels.value, thread_id, mode),
+                self.context,
+                mode,
+                pub_policy=delivery.get_delivery_policy(cfg, library.BlockName.ChannelLevels.value),
+                sub_policies={
+                    library.BlockName.GStreamerSrc.value:
+                        delivery.get_delivery_policy(cfg, library.BlockName.GStreamerSrc.value),
+                },
+                tracing=trace.is_enabled(cfg),
+                block_name=library.BlockName.ChannelLevels.value,
+                metrics_interval_s=get_metrics_interval(cfg),
                 )
         self.block.parse_sub = self.parse_sub
         self.block.parse_control = self.parse_control
@@ -35,21 +44,18 @@ class ChannelLevels:
         self.block.run()
 
     def parse_sub(self, sub_id, topic, timestamp_ns, message):
-        samples = Samples()
         levels_dB = self.channel_levels(message)
         if levels_dB is None:
             return
-        samples.ParseFromString(message)
-        channel_levels = channel_levels_pb2.ChannelLevels()
-        channel_levels.frame_number = self.frame_number
-        channel_levels.num_channels_0 = samples.num_channels_1
-        channel_levels.levels = levels_dB.tobytes()
-        channel_levels.thread_id = self.thread_id
-        msg = channel_levels.SerializeToString()
-
-        self.block.pub_socket.send_string(library.BlockName.ChannelLevels.value, zmq.SNDMORE)
-        self.block.pub_socket.send_string(f"{time.monotonic_ns()}", zmq.SNDMORE)
-        self.block.pub_socket.send_multipart([msg])
+        if self.wire_format == wire.BINARY:
+            self.block.publish_array(library.BlockName.ChannelLevels.value, self.frame_number, levels_dB)
+        else:
+            channel_levels = channel_levels_pb2.ChannelLevels()
+            channel_levels.frame_number = self.frame_number
+            channel_levels.num_channels_0 = levels_dB.shape[0]
+            channel_levels.levels = levels_dB.tobytes()
+            channel_levels.thread_id = self.thread_id
+            self.block.publish(library.BlockName.ChannelLevels.value, channel_levels.SerializeToString())
 
         self.frame_number += 1
 
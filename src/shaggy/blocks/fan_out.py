@@ -0,0 +1,46 @@
+"""Shared receiver for blocks that consume the same source in one process.
+
+Every block subscribing to a source receives and decodes each frame on its own. Blocks started with the
+fan-out execution mode are instead attached to one FanOut per source, which receives the frame once,
+decodes it into a read only array and calls each attached block in turn. Blocks that need isolation
+keep the thread or process modes and their own subscription.
+
+A FanOut publishes only its metrics snapshots, on its own block socket the edge bridge connects to.
+"""
+import queue
+
+import zmq
+
+from shaggy.blocks.block import Block
+from shaggy.proto.command_pb2 import Command
+from shaggy.transport import library
+
+
+class FanOut:
+
+    def __init__(self, source_name: str, source_address: str, thread_id: str, context: zmq.Context = None,
+                 mode: str = library.ExecutionMode.Thread.value, metrics_interval_s: float = None):
+        self.context = context or zmq.Context.instance()
+        self.thread_id = thread_id
+        self.sub_addresses = {source_name: source_address}
+        self.block = Block(thread_id, self.sub_addresses,
+                           library.get_block_socket(library.BlockName.FanOut.value, thread_id, mode), self.context,
+                           mode, block_name=library.BlockName.FanOut.value, metrics_interval_s=metrics_interval_s)
+        self.block.parse_control = self.parse_control
+        self.pending = queue.SimpleQueue()
+
+    def run(self):
+        self.block.run()
+
+    def attach(self, consumer: Block):
+        """Queue a block to run on this thread, it is added on the next attach command."""
+        self.pending.put(consumer)
+
+    def parse_control(self, timestamp_ns, message):
+        command = Command()
+        command.ParseFromString(message)
+        if command.command == 'attach':
+            while not self.pending.empty():
+                self.block.add_consumer(self.pending.get())
+        elif command.command == 'shutdown':
+            self.block.shutdown()
@@ -11,21 +11,28 @@ Gst.init(None)
 from contextlib import contextmanager
 import datetime
 import json
-import pathlib
-import os
+import threading
 import time
 
 from omegaconf import OmegaConf, DictConfig
 import zmq
 
+from shaggy.blocks import source_publisher
+from shaggy.blocks.source_publisher import SourcePublisher
+from shaggy.proto import wire
 from shaggy.proto.command_pb2 import Command
-from shaggy.proto.samples_pb2 import Samples
-from shaggy.transport import library
+from shaggy.recording import chunked, session
+from shaggy.transport import delivery, library, trace
 
 class GStreamerSrc:
     """Stream audio from interface to local buffer."""
 
-    def __init__(self, thread_id: str, rate, num_channels, address: str, context: zmq.Context = None, num_bytes=4) -> Self:
+    def __init__(self, thread_id: str, rate, num_channels, address: str, context: zmq.Context = None, num_bytes=4,
+                 wire_format: str = wire.PROTOBUF, shared_ring_s: float = None,
+                 mode: str = library.ExecutionMode.Thread.value,
+                 delivery_policy: delivery.DeliveryPolicy = None, tracing: bool = False,
+                 record_chunk_s: float = chunked.DEFAULT_CHUNK_S,
+                 record_queue_frames: int = chunked.DEFAULT_QUEUE_FRAMES, capture_cores: tuple = ()) -> Self:
         self.thread_id = thread_id
         self.rate = rate
         self.num_channels = num_channels
@@ -34,17 +41,22 @@ class GStreamerSrc:
         self.context = context
         self.port = 51234
         self.format = f"S{8*num_bytes}LE"
-        self.base_folder = pathlib.Path.home() / "data" / "camera"
+        self.base_folder = session.BASE_FOLDER
+        self.record_chunk_s = record_chunk_s
+        self.record_queue_frames = record_queue_frames
         self.pipeline = None
-        self.record_bin = None
-        self.record_pad = None
-        self.frame_number = 0
-        self.pub_socket = None
+        # frames are queued from the GStreamer streaming thread, record commands arrive on the block thread
+        self.record_lock = threading.Lock()
+        self.recorder = None
         self.control_socket = None
         self.run_loop = True
+        self.mode = mode
+        self.publisher = SourcePublisher(thread_id, rate, num_channels, context, num_bytes, wire_format, shared_ring_s,
+                                         mode, delivery_policy, tracing, capture_cores=capture_cores)
 
     @classmethod
-    def from_cfg(cls, cfg: DictConfig, thread_id: str, address: str, context: zmq.Context = None) -> Self:
+    def from_cfg(cls, cfg: DictConfig, thread_id: str, address: str, context: zmq.Context = None,
+                 mode: str = library.ExecutionMode.Thread.value) -> Self:
         context = context or zmq.Context.instance()
         return cls(
                 thread_id=thread_id,
@@ -52,16 +64,21 @@ class GStreamerSrc:
                 num_channels=cfg['gstreamer_src']['channels'],
                 address = address,
                 context = context,
+                wire_format=wire.get_wire_format(cfg),
+                shared_ring_s=(cfg.get('transport') or {}).get('shared_ring_s'),
+                mode=mode,
+                delivery_policy=delivery.get_delivery_policy(cfg, library.BlockName.GStreamerSrc.value),
+                tracing=trace.is_enabled(cfg),
+                record_chunk_s=(cfg.get('recording') or {}).get('chunk_s', chunked.DEFAULT_CHUNK_S),
+                record_queue_frames=(cfg.get('recording') or {}).get('queue_frames', chunked.DEFAULT_QUEUE_FRAMES),
+                capture_cores=source_publisher.get_capture_cores(cfg),
                 )
  
     @contextmanager
     def start_audio(self) -> None:
-        self.pub_socket = self.context.socket(zmq.PUB)
-        self.pub_socket.bind(
-            library.get_block_socket(library.BlockName.GStreamerSrc.value, self.thread_id)
-        )
+        self.publisher.open()
         self.control_socket = self.context.socket(zmq.PAIR)
-        self.control_socket.bind(library.get_control_socket(self.thread_id))
+        self.control_socket.bind(library.get_control_socket(self.thread_id, self.mode))
         udp_address = library.LOCAL_HOST if self.address == library.LOCAL_HOST else library.EXTERNAL_HOST
 
         pipeline = (
@@ -82,14 +99,14 @@ class GStreamerSrc:
         assert pipeline
         pipeline.get_by_name("audio_sink").connect("new-sample", self._on_gstreamer_audio_sample)
 
-        self.frame_number = 0
         pipeline.set_state(Gst.State.PLAYING)
 
         try:
             yield pipeline
         finally:
             pipeline.set_state(Gst.State.NULL)
-            self.pub_socket.close(0)
+            self.stop_record(pipeline)
+            self.publisher.close()
             self.control_socket.close(0)
 
     def _on_gstreamer_audio_sample(self, sink):
@@ -106,62 +123,39 @@ class GStreamerSrc:
         return Gst.FlowReturn.OK
 
     def _audio_callback(self, data) -> None:
-        """Publish data from acoustic source over 0MQ."""
-        self.pub_socket.send_string(library.BlockName.GStreamerSrc.value, zmq.SNDMORE)
-        timestamp_ns = time.monotonic_ns()
-        self.pub_socket.send_string(f"{time.monotonic_ns()}", zmq.SNDMORE)
-        msg = Samples()
-        msg.frame_number = self.frame_number
-        msg.num_samples_0 = len(data) // (self.num_bytes * self.num_channels)
-        msg.num_channels_1 = self.num_channels
-        msg.samples = data
-        self.pub_socket.send_multipart([msg.SerializeToString()])
-
-        self.frame_number += 1
+        """Publish data from acoustic source over 0MQ, and queue it for the recorder while recording."""
+        capture_ns = time.monotonic_ns()
+        with self.record_lock:
+            if self.recorder is not None:
+                self.recorder.write(data, self.publisher.frame_number, capture_ns, time.time_ns())
+        self.publisher.publish(data, capture_ns)
 
     def start_record(self, pipeline, command) -> None:
-        utc_now = datetime.datetime.now(tz=datetime.timezone.utc)
-        utc_string = utc_now.strftime("%Y-%m-%dT%H_%M_%S")
-        save_folder = self.base_folder / utc_string
+        """Record every published frame to a new session folder, see recording.chunked."""
+        self.stop_record(pipeline)
+        utc_ns, monotonic_ns = time.time_ns(), time.monotonic_ns()
+        utc_now = datetime.datetime.fromtimestamp(utc_ns / 1e9, tz=datetime.timezone.utc)
+        save_folder = self.base_folder / utc_now.strftime(session.FOLDER_FORMAT)
         save_folder.mkdir(parents=True, exist_ok=True)
 
-        with open(os.path.join(save_folder, "logging_config.json"), "w") as f:
+        with open(save_folder / session.CONFIG_FILE, "w") as f:
             json.dump(command.config, f, indent=2)
-        with open(os.path.join(save_folder, "audio_timestamp.txt"), "w") as f:
-            collect_time = datetime.datetime.now(datetime.timezone.utc)
-            f.write(collect_time.strftime("%Y-%m-%dT%H_%M_%S"))
-            f.write(str(int(collect_time.timestamp() * 1e9)))
-            f.write(f"{time.monotonic()}")
-
-        bin_str = (
-                    "queue ! audioconvert ! wavenc"
-                    f"! filesink location={save_folder}/audio.wav"
-            )
-        self.record_bin = Gst.parse_bin_from_description(bin_str, True,)
-
-        tee = pipeline.get_by_name("audio_source")
-        record_sink_pad = self.record_bin.get_static_pad("sink")
-        self.record_pad = tee.get_request_pad("src_%u")
-        pipeline.set_state(Gst.State.PAUSED)
-        pipeline.add(self.record_bin)
-        self.record_pad.link(record_sink_pad)
-        pipeline.set_state(Gst.State.PLAYING)
+        session.write_audio_timestamp(save_folder, utc_ns, monotonic_ns)
+
+        recorder = chunked.QueuedWriter(
+                chunked.ChunkedWriter(save_folder, self.rate, self.num_channels, self.record_chunk_s),
+                self.record_queue_frames,
+                )
+        recorder.open(utc_ns, monotonic_ns)
+        with self.record_lock:
+            self.recorder = recorder
 
     def stop_record(self, pipeline):
         """Stop recording."""
-        if not self.record_bin:
-            return
-        pipeline.set_state(Gst.State.PAUSED)
-
-        self.record_pad.unlink(self.record_bin.get_static_pad("sink"))
-        pipeline.get_by_name("audio_source").release_request_pad(self.record_pad)
-        self.record_pad = None
-
-        self.record_bin.set_state(Gst.State.NULL)
-        pipeline.remove(self.record_bin)
-        self.record_bin = None
-
-        pipeline.set_state(Gst.State.PLAYING)
+        with self.record_lock:
+            recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
 
     def run(self):
         with self.start_audio() as pipeline:
@@ -6,11 +6,11 @@ import zmq
 from shaggy.blocks.block import Block
 from shaggy.proto.command_pb2 import Command
 from shaggy.subs import heartbeat_src
-from shaggy.transport import library
+from shaggy.transport import delivery, library
 HEARTBEAT_MAX_MISSES = 3
 
 class Heartbeat:
-    def __init__(self, thread_id: str, context: zmq.Context = None):
+    def __init__(self, thread_id: str, context: zmq.Context = None, mode: str = library.ExecutionMode.Thread.value):
         self.thread_id = thread_id
         self.context = context or zmq.Context.instance()
 
@@ -18,7 +18,7 @@ class Heartbeat:
         self.heartbeat_thread = threading.Thread(target=self.heartbeat_src.run)
 
         self.sub_addresses = {
-            library.BlockName.Heartbeat.value: library.get_block_socket(
+            library.BlockName.HeartbeatSrc.value: library.get_block_socket(
                 library.BlockName.HeartbeatSrc.value,
                 thread_id,
             )
@@ -26,8 +26,15 @@ class Heartbeat:
         self.block = Block(
             thread_id,
             self.sub_addresses,
-            library.get_block_socket(library.BlockName.Heartbeat.value, thread_id),
+            library.get_block_sockets(library.BlockName.Heartbeat.value, thread_id, mode),
             self.context,
+            mode,
+            pub_policy=delivery.get_delivery_policy(None, library.BlockName.Heartbeat.value),
+            sub_policies={
+                library.BlockName.HeartbeatSrc.value:
+                    delivery.get_delivery_policy(None, library.BlockName.HeartbeatSrc.value),
+            },
+            block_name=library.BlockName.Heartbeat.value,
         )
         self.block.parse_sub = self.parse_sub
         self.block.parse_control = self.parse_control
@@ -54,9 +61,7 @@ class Heartbeat:
         command.thread_id = self.thread_id
         payload = command.SerializeToString()
 
-        self.block.pub_socket.send_string(library.BlockName.Heartbeat.value, zmq.SNDMORE)
-        self.block.pub_socket.send_string(f"{time.monotonic_ns()}", zmq.SNDMORE)
-        self.block.pub_socket.send(payload)
+        self.block.publish(library.BlockName.Heartbeat.value, payload)
         self.num_misses += 1
         if self.num_misses > HEARTBEAT_MAX_MISSES:
             shutdown = Command()
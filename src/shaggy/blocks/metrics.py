@@ -0,0 +1,111 @@
+"""Runtime counters of a block.
+
+Counters are cumulative from the start of the block. Blocks publish a snapshot on the metrics topic
+every interval_s of the metrics config, and on a stats command, the edge bridge forwards them to the
+host. Loads over an interval are the difference of two snapshots, see format_table.
+
+CPU time is the time of the thread running the block, shared with every block attached to the same fan
+out. Queue depth is the number of messages received since a subscription was last found empty, it
+keeps growing while a block can not keep up with its input. Cores are those the thread running the
+block may run on, see blocks.scheduling.
+"""
+import os
+import time
+
+from shaggy.blocks import scheduling
+from shaggy.proto.metrics_pb2 import BlockMetrics
+
+
+def get_metrics_interval(cfg) -> float | None:
+    """Seconds between published snapshots, None if not requested."""
+    return (cfg.get('metrics') or {}).get('interval_s')
+
+
+class Metrics:
+    """Counters updated by Block.run."""
+
+    def __init__(self, interval_s: float = None):
+        self.interval_s = interval_s
+        self.reset()
+
+    def reset(self) -> None:
+        self.start_ns = time.monotonic_ns()
+        self.start_cpu_ns = time.thread_time_ns()
+        self.next_ns = self.start_ns + self._interval_ns()
+        self.messages_in = 0
+        self.messages_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.parse_ns = 0
+        self.poll_wait_ns = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+
+    def add_queued(self, is_queued: bool) -> None:
+        """Record whether more messages were waiting after a receive."""
+        self.queue_depth = self.queue_depth + 1 if is_queued else 0
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def is_due(self, now_ns: int) -> bool:
+        """Check if a periodic snapshot is due, and schedule the next one."""
+        if self.interval_s is None or now_ns < self.next_ns:
+            return False
+        self.next_ns = now_ns + self._interval_ns()
+        return True
+
+    def get_timeout_ms(self, now_ns: int) -> int | None:
+        """Poll timeout until the next periodic snapshot, None to wait indefinitely."""
+        if self.interval_s is None:
+            return None
+        return max(0, (self.next_ns - now_ns) // 1_000_000)
+
+    def snapshot(self, block_name: str, thread_id: str, num_dropped: int = 0, num_overruns: int = 0) -> BlockMetrics:
+        """Counters as a message, must be called from the thread running the block."""
+        msg = BlockMetrics()
+        msg.block_name = block_name or ""
+        msg.thread_id = thread_id or ""
+        msg.elapsed_ns = time.monotonic_ns() - self.start_ns
+        msg.messages_in = self.messages_in
+        msg.messages_out = self.messages_out
+        msg.bytes_in = self.bytes_in
+        msg.bytes_out = self.bytes_out
+        msg.parse_ns = self.parse_ns
+        msg.cpu_ns = time.thread_time_ns() - self.start_cpu_ns
+        msg.poll_wait_ns = self.poll_wait_ns
+        msg.queue_depth = self.queue_depth
+        msg.max_queue_depth = self.max_queue_depth
+        msg.num_dropped = num_dropped
+        msg.num_overruns = num_overruns
+        msg.cores.extend(sorted(os.sched_getaffinity(0)))
+        return msg
+
+    def _interval_ns(self) -> int:
+        return 0 if self.interval_s is None else int(self.interval_s * 1e9)
+
+
+def format_table(snapshots: dict, previous: dict = None) -> str:
+    """Text table of BlockMetrics keyed by thread name.
+
+    Rates and loads are over the time since the previous snapshot of the same block if given, since the
+    block started otherwise. busy is the fraction of time in parse_sub, cpu the fraction of thread CPU.
+    """
+    previous = previous or {}
+    lines = [f"{'block':<36}{'in/s':>8}{'out/s':>8}{'MB/s in':>9}{'MB/s out':>9}{'busy':>7}{'cpu':>7}"
+             f"{'wait':>7}{'queue':>7}{'max q':>7}{'drops':>7}{'cores':>10}"]
+    for thread_name, msg in sorted(snapshots.items()):
+        last = previous.get(thread_name)
+        if last is None or last.elapsed_ns >= msg.elapsed_ns:
+            last = BlockMetrics(elapsed_ns=0)
+        elapsed_s = max(msg.elapsed_ns - last.elapsed_ns, 1) / 1e9
+
+        def rate(field):
+            return (getattr(msg, field) - getattr(last, field)) / elapsed_s
+
+        lines.append(
+                f"{thread_name:<36}{rate('messages_in'):>8.1f}{rate('messages_out'):>8.1f}"
+                f"{rate('bytes_in') / 1e6:>9.2f}{rate('bytes_out') / 1e6:>9.2f}"
+                f"{rate('parse_ns') / 1e9:>7.0%}{rate('cpu_ns') / 1e9:>7.0%}{rate('poll_wait_ns') / 1e9:>7.0%}"
+                f"{msg.queue_depth:>7}{msg.max_queue_depth:>7}{msg.num_dropped:>7}"
+                f"{scheduling.format_cores(msg.cores):>10}"
+                )
+    return "\n".join(lines)
@@ -0,0 +1,115 @@
+"""Streaming STFTs of several resolutions from one subscription and one sample ring.
+
+Resolutions are listed in the multi_resolution_stft section, each entry overriding keys of the stft
+section, e.g. a long window for a fine frequency view and a short one for a fine time view:
+
+    multi_resolution_stft:
+      resolutions:
+        - {window_length: 12000, stride_length: 6000}
+        - {window_length: 960, stride_length: 480, encoding: float16}
+
+Resolution i is published as STFT messages under thread id <thread_id>.i, see library.get_sub_thread_id.
+"""
+import numpy as np
+import zmq
+
+from shaggy.proto import stft_pb2, wire
+from shaggy.blocks.block import Block
+from shaggy.blocks.metrics import get_metrics_interval
+from shaggy.signal.multi_resolution_stft import MultiResolutionSTFT as MultiResolutionFunction, get_resolution_cfgs
+from shaggy.signal.spectral_payload import SpectralPayload
+from shaggy.transport import delivery, library, trace
+
+
+class MultiResolutionSTFT:
+    """Composition of a shared sample ring and one short time FFT per resolution."""
+    def __init__(self, cfg, gstreamer_src_address: str, thread_id: str, context: zmq.Context = None,
+                 mode: str = library.ExecutionMode.Thread.value):
+        """Setup components of streaming multi resolution STFT computation."""
+        self.context = context or zmq.Context.instance()
+        self.thread_id = thread_id
+
+        self.multi_resolution_stft = MultiResolutionFunction.from_cfg(cfg)
+        self.spectral_payloads = [SpectralPayload.from_cfg(resolution_cfg)
+                                  for resolution_cfg in get_resolution_cfgs(cfg)]
+        self.sub_thread_ids = [library.get_sub_thread_id(thread_id, index)
+                               for index in range(self.multi_resolution_stft.num_resolutions)]
+        self.wire_format = wire.get_wire_format(cfg)
+
+        self.sub_addresses = {
+            library.BlockName.GStreamerSrc.value: gstreamer_src_address
+        }
+        self.block = Block(
+                thread_id,
+                self.sub_addresses,
+                library.get_block_sockets(library.BlockName.MultiResolutionSTFT.value, thread_id, mode),
+                self.context,
+                mode,
+                pub_policy=delivery.get_delivery_policy(cfg, library.BlockName.MultiResolutionSTFT.value),
+                sub_policies={
+                    library.BlockName.GStreamerSrc.value:
+                        delivery.get_delivery_policy(cfg, library.BlockName.GStreamerSrc.value),
+                },
+                tracing=trace.is_enabled(cfg),
+                block_name=library.BlockName.MultiResolutionSTFT.value,
+                metrics_interval_s=get_metrics_interval(cfg),
+                )
+        self.block.parse_sub = self.parse_sub
+        self.block.parse_control = self.parse_control
+        self.frame_numbers = [0] * len(self.sub_thread_ids)
+
+    def run(self):
+        self.frame_numbers = [0] * len(self.sub_thread_ids)
+        self.multi_resolution_stft.reset_stream()
+        self.block.run()
+
+    def parse_sub(self, sub_id, topic, timestamp_ns, message):
+        for index, stft_samples in enumerate(self.multi_resolution_stft.push(message.T)):
+            if stft_samples is not None:
+                self._publish_stft(index, stft_samples)
+
+    def parse_control(self, timestamp_ns, message):
+        self.block.shutdown()
+
+    def _publish_stft(self, index: int, stft_samples):
+        """Publish the STFT samples of one resolution on its sub-topic."""
+        transform = self.multi_resolution_stft.transforms[index]
+        spectral_payload = self.spectral_payloads[index]
+        thread_id = self.sub_thread_ids[index]
+        frame_number = self.frame_numbers[index]
+
+        # (num_times, num_freq, num_channels) buffer the STFT was computed into
+        stft_buf = stft_samples.permute(2, 1, 0).numpy()
+        sample_buf = spectral_payload.encode(spectral_payload.select(stft_buf))
+        num_times, num_freq, num_channels = sample_buf.shape
+        self.frame_numbers[index] += 1
+
+        if self.wire_format == wire.BINARY:
+            tracker = self.block.publish_array(
+                    library.BlockName.MultiResolutionSTFT.value,
+                    frame_number,
+                    sample_buf,
+                    track=True,
+                    thread_id=thread_id,
+                    **wire.spectral_header_fields(spectral_payload),
+                    )
+            if not tracker.done and np.may_share_memory(sample_buf, stft_buf):
+                transform.detach_output()
+            return
+
+        msg = stft_pb2.STFT()
+
+        msg.frame_number = frame_number
+        msg.num_times_0 = num_times
+        msg.num_fft = transform.mfft
+        msg.sample_rate = transform.sample_rate
+        msg.num_channel_2 = num_channels
+        msg.thread_id = thread_id
+        msg.num_freq_1 = num_freq
+        msg.bin_start = spectral_payload.bin_start
+        msg.encoding = spectral_payload.encoding
+        msg.scale = spectral_payload.scale
+        msg.offset = spectral_payload.offset
+
+        msg.stft_samples = sample_buf.tobytes()
+        self.block.publish(library.BlockName.MultiResolutionSTFT.value, msg.SerializeToString(), thread_id)
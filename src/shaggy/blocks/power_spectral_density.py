@@ -0,0 +1,114 @@
+"""Streaming STFT followed by power spectrum averaging, only the averaged PSD leaves the edge."""
+import numpy as np
+import zmq
+
+from shaggy.proto import psd_pb2, wire
+from shaggy.blocks.block import Block
+from shaggy.blocks.metrics import get_metrics_interval
+from shaggy.signal.short_time_fft import ShortTimeFFT as STFT_Function
+from shaggy.signal.spectral_average import SpectralAverage
+from shaggy.signal import spectral_payload
+from shaggy.transport import delivery, library, trace
+
+
+class PowerSpectralDensity:
+    """Composition of buffer handling, short time FFT and Welch, exponential or max-hold averaging."""
+    def __init__(self, cfg, gstreamer_src_address: str, thread_id: str, context: zmq.Context = None,
+                 mode: str = library.ExecutionMode.Thread.value):
+        """Setup components of streaming PSD computation."""
+        self.context = context or zmq.Context.instance()
+        self.thread_id = thread_id
+        self.context = context
+
+        self.short_time_fft = STFT_Function.from_cfg(cfg)
+        self.spectral_average = SpectralAverage.from_cfg(cfg)
+        self.spectral_payload = spectral_payload.SpectralPayload.from_cfg(cfg, spectral_payload.FLOAT32)
+        if self.spectral_payload.encoding == spectral_payload.COMPLEX64:
+            raise ValueError("Power spectral density can not be encoded as a complex spectrum.")
+        self.wire_format = wire.get_wire_format(cfg)
+        self.power = None
+
+        self.sub_addresses = {
+            library.BlockName.GStreamerSrc.value: gstreamer_src_address
+        }
+        self.block = Block(
+                thread_id,
+                self.sub_addresses,
+                library.get_block_sockets(library.BlockName.PowerSpectralDensity.value, thread_id, mode),
+                self.context,
+                mode,
+                pub_policy=delivery.get_delivery_policy(cfg, library.BlockName.PowerSpectralDensity.value),
+                sub_policies={
+                    library.BlockName.GStreamerSrc.value:
+                        delivery.get_delivery_policy(cfg, library.BlockName.GStreamerSrc.value),
+                },
+                tracing=trace.is_enabled(cfg),
+                block_name=library.BlockName.PowerSpectralDensity.value,
+                metrics_interval_s=get_metrics_interval(cfg),
+                )
+        self.block.parse_sub = self.parse_sub
+        self.block.parse_control = self.parse_control
+        self.frame_number = 0
+
+    def run(self):
+        self.frame_number = 0
+        self.short_time_fft.reset_stream()
+        self.spectral_average.reset()
+        self.block.run()
+
+    def parse_sub(self, sub_id, topic, timestamp_ns, message):
+        stft_samples = self.short_time_fft.push(message.T)
+        if stft_samples is None:
+            return
+        psd = self.spectral_average.update(self._get_power(stft_samples))
+        if psd is None:
+            return
+        self._publish_psd(psd)
+
+    def parse_control(self, timestamp_ns, message):
+        self.block.shutdown()
+
+    def _get_power(self, stft_samples) -> np.ndarray:
+        """(num_times, num_freq, num_channels) power of the transmitted bins and channels of an STFT."""
+        stft_buf = self.spectral_payload.select(stft_samples.permute(2, 1, 0).numpy())
+        if self.power is None or self.power.shape != stft_buf.shape:
+            self.power = np.empty(stft_buf.shape, dtype=np.float32)
+        return spectral_payload.get_power(stft_buf, out=self.power)
+
+    def _publish_psd(self, psd: np.ndarray):
+        """Publish a (num_freq, num_channels) PSD."""
+        num_freq, num_channels = psd.shape
+        # float32 power is the average buffer itself, other encodings are new arrays
+        psd_buf = self.spectral_payload.encode(psd)
+
+        if self.wire_format == wire.BINARY:
+            tracker = self.block.publish_array(
+                    library.BlockName.PowerSpectralDensity.value,
+                    self.frame_number,
+                    psd_buf,
+                    track=True,
+                    **wire.spectral_header_fields(self.spectral_payload),
+                    )
+            if not tracker.done and np.may_share_memory(psd_buf, psd):
+                self.spectral_average.detach_output()
+            self.frame_number += 1
+            return
+
+        msg = psd_pb2.PSD()
+
+        msg.frame_number = self.frame_number
+        msg.num_freq_0 = num_freq
+        msg.num_channels_1 = num_channels
+        msg.num_fft = self.short_time_fft.mfft
+        msg.sample_rate = self.short_time_fft.sample_rate
+        msg.num_windows = self.spectral_average.num_windows
+        msg.thread_id = self.thread_id
+        msg.bin_start = self.spectral_payload.bin_start
+        msg.encoding = self.spectral_payload.encoding
+        msg.scale = self.spectral_payload.scale
+        msg.offset = self.spectral_payload.offset
+
+        msg.psd = psd_buf.tobytes()
+        self.block.publish(library.BlockName.PowerSpectralDensity.value, msg.SerializeToString())
+
+        self.frame_number += 1
@@ -0,0 +1,171 @@
+"""Replay of a recorded session, wire compatible with GStreamerSrc.
+
+The audio of a session folder, chunked or audio.wav, or a WAV file is memory mapped and published in
+frames of frame_length samples, exactly as the live source published them when the recording is float32,
+so every downstream block runs unchanged on recorded data. Frames are paced at speed times real time, or
+published as fast as consumers take them when speed is 0: the source then waits for min_subscribers
+consumer blocks to subscribe and stalls instead of dropping when a consumer's queue is full, so a recording
+can be processed offline without losses. The edge bridge's own subscription is not counted, and a fan-out
+counts once for every block attached to it.
+
+A seek command moves the replay to a UTC time or to an offset into the recording, given in the command
+config as utc_ns or offset_s. At the end of the recording the source idles until it is shut down or
+seeks back.
+"""
+from pathlib import Path
+from typing_extensions import Annotated, Self
+import time
+
+from omegaconf import DictConfig, OmegaConf
+from pydantic import Field
+from pydantic.dataclasses import dataclass
+import zmq
+
+from shaggy.blocks.source_publisher import SourcePublisher
+from shaggy.proto.command_pb2 import Command
+from shaggy.recording import chunked, session, wav
+from shaggy.transport import library
+
+IDLE_POLL_MS = 100
+
+
+@dataclass
+class ReplaySrcConfig:
+    """Definition of a replayed session.
+
+    Attributes:
+        path: Session folder, or a WAV file to replay.
+        frame_length: Number of samples in each published frame.
+        speed: Multiple of real time, 0 publishes as fast as consumers allow.
+        start_s: Offset into the recording of the first frame.
+        min_subscribers: Consumer blocks to wait for before publishing when speed is 0.
+    """
+
+    path: str
+    frame_length: Annotated[int, Field(gt=0)] = 480
+    speed: Annotated[float, Field(ge=0)] = 1.
+    start_s: Annotated[float, Field(ge=0)] = 0.
+    min_subscribers: Annotated[int, Field(ge=0)] = 1
+
+
+class ReplaySrc:
+    """Publish a recorded session as the gstreamer-src topic."""
+
+    def __init__(self, config: ReplaySrcConfig, publisher: SourcePublisher, thread_id: str,
+                 context: zmq.Context = None, mode: str = library.ExecutionMode.Thread.value) -> Self:
+        self.config = config
+        self.publisher = publisher
+        self.thread_id = thread_id
+        self.context = context or zmq.Context.instance()
+        self.mode = mode
+        self.control_socket = None
+        self.run_loop = True
+        self.path = Path(config.path).expanduser()
+        self.info, self.samples = session.open_audio(self.path)
+        self.start_utc_ns = session.get_start_utc_ns(self.path)
+        self.frame_s = config.frame_length / self.info.sample_rate
+        self.position = 0
+        self.next_frame_s = None
+
+    @classmethod
+    def from_cfg(cls, cfg: DictConfig, thread_id: str, address: str = None, context: zmq.Context = None,
+                 mode: str = library.ExecutionMode.Thread.value) -> Self:
+        """Initilize class instance from keywords, same arguments as GStreamerSrc.from_cfg.
+
+        The recording must have the sample rate and channels of the gstreamer_src config, which consumers
+        are configured with.
+        """
+        context = context or zmq.Context.instance()
+        config = ReplaySrcConfig(**cfg['replay_src'])
+        publisher = SourcePublisher.from_cfg(cfg, thread_id, context, mode, backpressure=config.speed == 0)
+        instance = cls(config, publisher, thread_id, context, mode)
+        expected = (cfg['gstreamer_src']['sample_rate'], cfg['gstreamer_src']['channels'])
+        if (instance.info.sample_rate, instance.info.num_channels) != expected:
+            raise ValueError(f"{instance.path} has {instance.info.num_channels} channels at "
+                             f"{instance.info.sample_rate} Hz, the gstreamer_src config {expected[1]} at "
+                             f"{expected[0]} Hz.")
+        return instance
+
+    def seek(self, utc_ns: int = None, offset_s: float = None) -> None:
+        """Move the replay to a UTC time or an offset into the recording, clipped to the recording.
+
+        UTC times of chunked recordings are found through the frame index, of WAV files from the start time.
+        """
+        if utc_ns is not None and isinstance(self.samples, chunked.ChunkedReader):
+            position = self.samples.find(utc_ns)
+        elif utc_ns is not None:
+            if self.start_utc_ns is None:
+                raise ValueError(f"{self.path} has no start time to seek to a UTC time.")
+            position = round((utc_ns - self.start_utc_ns) / 1e9 * self.info.sample_rate)
+        else:
+            position = round((offset_s or 0.) * self.info.sample_rate)
+        self.position = min(max(position, 0), self.info.num_samples)
+        self.next_frame_s = None
+
+    def is_ready(self) -> bool:
+        """Check if there are samples left and, when not paced, enough consumers to receive them."""
+        if self.position >= self.info.num_samples:
+            return False
+        if self.config.speed > 0:
+            return True
+        # consumer blocks subscribe to every gstreamer-src thread
+        consumer_topic = library.get_topic_prefix(library.BlockName.GStreamerSrc.value)
+        return self.publisher.get_num_subscribers(consumer_topic) >= self.config.min_subscribers
+
+    def publish_frame(self) -> None:
+        """Publish the frame at the current position, the last frame of the recording may be shorter."""
+        frame = self.samples[self.position:self.position + self.config.frame_length]
+        self.publisher.publish(wav.to_float32(frame).tobytes())
+        self.position += len(frame)
+
+    def run(self):
+        self.publisher.open()
+        self.control_socket = self.context.socket(zmq.PAIR)
+        self.control_socket.bind(library.get_control_socket(self.thread_id, self.mode))
+        poller = zmq.Poller()
+        poller.register(self.control_socket, zmq.POLLIN)
+        is_paced = self.config.speed > 0
+
+        self.seek(offset_s=self.config.start_s)
+        self.run_loop = True
+        try:
+            while self.run_loop:
+                if not self.is_ready():
+                    self.next_frame_s = None
+                    if self.control_socket.poll(IDLE_POLL_MS):
+                        self.parse_control(self.control_socket.recv_multipart()[1])
+                    continue
+
+                now_s = time.monotonic()
+                if self.next_frame_s is None:
+                    self.next_frame_s = now_s
+                timeout_ms = max(0., self.next_frame_s - now_s) * 1000 if is_paced else 0
+                socks = dict(poller.poll(timeout_ms))
+                if socks.get(self.control_socket) == zmq.POLLIN:
+                    self.parse_control(self.control_socket.recv_multipart()[1])
+                    continue
+                if is_paced and time.monotonic() < self.next_frame_s:
+                    continue
+                try:
+                    self.publish_frame()
+                except zmq.Again:
+                    # a consumer's queue stayed full, the frame is published again
+                    continue
+                if is_paced:
+                    self.next_frame_s += self.frame_s / self.config.speed
+        finally:
+            self.publisher.close()
+            self.control_socket.close(0)
+
+    def parse_control(self, message):
+        command = Command()
+        command.ParseFromString(message)
+        if command.command == 'shutdown':
+            self.run_loop = False
+        elif command.command == 'seek':
+            seek_cfg = OmegaConf.create(command.config or "{}")
+            try:
+                self.seek(utc_ns=seek_cfg.get('utc_ns'), offset_s=seek_cfg.get('offset_s'))
+            except ValueError:
+                # a UTC time in a recording without start time, the replay carries on where it was
+                pass
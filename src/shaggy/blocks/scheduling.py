@@ -0,0 +1,160 @@
+"""CPU placement of edge blocks, from the scheduling section of a config.
+
+    scheduling:
+      capture_cores: [0]
+      torch_threads: 2
+      blocks:
+        short-time-fft: {cores: [2, 3], torch_threads: 2}
+        power-spectral-density: {cores: [1]}
+
+Capture cores are reserved for the thread publishing captured audio, the GStreamer streaming thread
+calling back with audio or the run loop of the synthetic and replay sources, which pins itself on its
+first frame. Every other block thread is pinned to its listed cores, or to every core available to the
+process but the capture cores. Threads inherit the placement of the thread creating them, so GStreamer
+elements such as x264enc and the torch thread pool stay off the capture cores too.
+
+Of the GStreamer source only the appsink callback thread, behind the queue of the audio branch, runs on
+the capture cores. The alsasrc thread reading the interface is started with the pipeline by the block
+thread and keeps its non capture cores.
+
+BlockHub keeps the applied placements in its layout and logs format_layout of it at INFO level whenever
+a block is placed. The metrics snapshot of each block carries the cores its thread runs on.
+
+Torch intra-op threads are a per-process setting: blocks run as processes use their own torch_threads,
+blocks run as threads share the top level torch_threads. Blocks started without a scheduling section
+are not pinned.
+"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from typing_extensions import Annotated, Self
+
+from pydantic import Field
+from pydantic.dataclasses import dataclass
+
+from shaggy.transport import library
+
+
+@dataclass
+class BlockPlacement:
+    """Placement of one block.
+
+    Attributes:
+        cores: Cores the block thread may run on, every non capture core if None.
+        torch_threads: Torch intra-op threads of a block run as a process.
+    """
+
+    cores: Optional[Tuple[int, ...]] = None
+    torch_threads: Optional[Annotated[int, Field(gt=0)]] = None
+
+
+@dataclass
+class SchedulingPolicy:
+    """Placement of the blocks of an edge.
+
+    Attributes:
+        capture_cores: Cores reserved for the audio capture thread.
+        torch_threads: Torch intra-op threads of the edge process.
+        blocks: Placement of blocks by block name.
+    """
+
+    capture_cores: Tuple[int, ...] = ()
+    torch_threads: Optional[Annotated[int, Field(gt=0)]] = None
+    blocks: Dict[str, BlockPlacement] = Field(default_factory=dict)
+
+    def __post_init__(self) -> Self:
+        """Parameter checks."""
+        available = get_available_cores()
+        if not set(self.capture_cores) <= available:
+            raise ValueError(f"Capture cores {self.capture_cores} are not all available in {sorted(available)}.")
+        if self.capture_cores and not available - set(self.capture_cores):
+            raise ValueError("Capture cores leave no core for the other blocks.")
+        for block_name, placement in self.blocks.items():
+            if placement.cores is None:
+                continue
+            if not set(placement.cores) <= available:
+                raise ValueError(
+                        f"{block_name} cores {placement.cores} are not all available in {sorted(available)}.")
+            if set(placement.cores) & set(self.capture_cores):
+                raise ValueError(f"{block_name} cores {placement.cores} include reserved capture cores.")
+
+    @classmethod
+    def from_cfg(cls, cfg) -> Optional[Self]:
+        """Initilize class instance from keywords, None without a scheduling section."""
+        scheduling_cfg = cfg.get('scheduling') if cfg is not None else None
+        if not scheduling_cfg:
+            return None
+        blocks_cfg = scheduling_cfg.get('blocks') or {}
+        return cls(
+                capture_cores=tuple(scheduling_cfg.get('capture_cores') or ()),
+                torch_threads=scheduling_cfg.get('torch_threads'),
+                blocks={
+                    block_name: BlockPlacement(
+                        cores=tuple(block_cfg['cores']) if block_cfg.get('cores') is not None else None,
+                        torch_threads=block_cfg.get('torch_threads'),
+                        )
+                    for block_name, block_cfg in blocks_cfg.items()
+                },
+                )
+
+    def get_cores(self, block_name: str) -> set:
+        """Cores of a block thread."""
+        placement = self.blocks.get(block_name)
+        if placement is not None and placement.cores is not None:
+            return set(placement.cores)
+        return get_available_cores() - set(self.capture_cores)
+
+    def get_torch_threads(self, block_name: str, mode: str) -> Optional[int]:
+        """Torch intra-op threads to set for a block run in mode, None to leave the process setting."""
+        placement = self.blocks.get(block_name)
+        if mode == library.ExecutionMode.Process.value and placement and placement.torch_threads is not None:
+            return placement.torch_threads
+        return self.torch_threads
+
+
+def get_available_cores() -> set:
+    """Cores the edge process may run on."""
+    return set(os.sched_getaffinity(0))
+
+
+def pin_current_thread(cores) -> set:
+    """Restrict the calling thread to cores, returns the cores it now runs on."""
+    native_id = threading.get_native_id()
+    os.sched_setaffinity(native_id, cores)
+    return set(os.sched_getaffinity(native_id))
+
+
+def set_torch_threads(num_threads: Optional[int]) -> None:
+    if num_threads is None:
+        return
+    # imported on use, sources and the bridge run without torch
+    import torch
+    torch.set_num_threads(num_threads)
+
+
+def run_placed(run, cores: set = None, torch_threads: int = None):
+    """Thread target applying a placement before running a block."""
+    if cores is not None:
+        pin_current_thread(cores)
+    set_torch_threads(torch_threads)
+    return run()
+
+
+def format_cores(cores) -> str:
+    """Cores as ranges, e.g. 0,2-5."""
+    cores = sorted(cores)
+    ranges = []
+    for core in cores:
+        if ranges and core == ranges[-1][1] + 1:
+            ranges[-1][1] = core
+        else:
+            ranges.append([core, core])
+    return ",".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+
+def format_layout(layout: dict) -> str:
+    """Text table of applied placements, (cores, torch threads) keyed by thread name."""
+    lines = [f"{'block':<36}{'cores':>12}{'torch':>7}"]
+    for thread_name, (cores, torch_threads) in sorted(layout.items()):
+        lines.append(f"{thread_name:<36}{format_cores(cores):>12}{torch_threads or '-':>7}")
+    return "\n".join(lines)
@@ -9,33 +9,43 @@ import torch
 from omegaconf import DictConfig
 import zmq
 
-from shaggy.subs.stft_buffer import STFTBuffer
-from shaggy.proto import stft_pb2
+from shaggy.proto import stft_pb2, wire
 from shaggy.blocks.block import Block
-from shaggy.blocks import gstreamer_src
+from shaggy.blocks.metrics import get_metrics_interval
 from shaggy.signal.short_time_fft import ShortTimeFFT as STFT_Function
-from shaggy.transport import library
+from shaggy.signal.spectral_payload import SpectralPayload
+from shaggy.transport import delivery, library, trace
 
 class ShortTimeFFT:
     """Composition of buffer handling and short time FFT computation."""
-    def __init__(self, cfg, gstreamer_src_id: str, thread_id: str, context: zmq.Context = None):
+    def __init__(self, cfg, gstreamer_src_address: str, thread_id: str, context: zmq.Context = None,
+                 mode: str = library.ExecutionMode.Thread.value):
         """Setup components of streaming STFT computation."""
         self.context = context or zmq.Context.instance()
         self.thread_id = thread_id
         self.context = context
 
         self.short_time_fft = STFT_Function.from_cfg(cfg)
-        self.short_time_fft_buffer = STFTBuffer.from_cfg(cfg)
+        self.spectral_payload = SpectralPayload.from_cfg(cfg)
+        self.wire_format = wire.get_wire_format(cfg)
 
-        self.gstreamer_src_id = gstreamer_src_id
         self.sub_addresses = {
-            library.BlockName.GStreamerSrc.value: f"inproc://{gstreamer_src_id}"
+            library.BlockName.GStreamerSrc.value: gstreamer_src_address
         }
         self.block = Block(
                 thread_id,
                 self.sub_addresses,
-                library.get_block_socket(library.BlockName.ShortTimeFFT.value, thread_id),
-                self.context
+                library.get_block_sockets(library.BlockName.ShortTimeFFT.value, thread_id, mode),
+                self.context,
+                mode,
+                pub_policy=delivery.get_delivery_policy(cfg, library.BlockName.ShortTimeFFT.value),
+                sub_policies={
+                    library.BlockName.GStreamerSrc.value:
+                        delivery.get_delivery_policy(cfg, library.BlockName.GStreamerSrc.value),
+                },
+                tracing=trace.is_enabled(cfg),
+                block_name=library.BlockName.ShortTimeFFT.value,
+                metrics_interval_s=get_metrics_interval(cfg),
                 )
         self.block.parse_sub = self.parse_sub
         self.block.parse_control = self.parse_control
@@ -43,13 +53,13 @@ class ShortTimeFFT:
 
     def run(self):
         self.frame_number = 0
+        self.short_time_fft.reset_stream()
         self.block.run()
 
     def parse_sub(self, sub_id, topic, timestamp_ns, message):
-        samples = self.short_time_fft_buffer(message)
-        if samples is None:
+        stft_samples = self.short_time_fft.push(message.T)
+        if stft_samples is None:
             return
-        stft_samples = self.short_time_fft(samples)
         self._publish_stft(stft_samples)
 
     def parse_control(self, timestamp_ns, message):
@@ -58,7 +68,24 @@ class ShortTimeFFT:
     def _publish_stft(self, stft_samples):
         """Prepare STFT samples for ZMQ publish."""
 
-        num_channels, num_freq, num_times = stft_samples.shape
+        # (num_times, num_freq, num_channels) buffer the STFT was computed into
+        stft_buf = stft_samples.permute(2, 1, 0).numpy()
+        # the full complex spectrum is the computed buffer itself, reduced payloads are new arrays
+        sample_buf = self.spectral_payload.encode(self.spectral_payload.select(stft_buf))
+        num_times, num_freq, num_channels = sample_buf.shape
+
+        if self.wire_format == wire.BINARY:
+            tracker = self.block.publish_array(
+                    library.BlockName.ShortTimeFFT.value,
+                    self.frame_number,
+                    sample_buf,
+                    track=True,
+                    **wire.spectral_header_fields(self.spectral_payload),
+                    )
+            if not tracker.done and np.may_share_memory(sample_buf, stft_buf):
+                self.short_time_fft.detach_output()
+            self.frame_number += 1
+            return
 
         msg = stft_pb2.STFT()
 
@@ -68,15 +95,13 @@ class ShortTimeFFT:
         msg.sample_rate = self.short_time_fft.sample_rate
         msg.num_channel_2 = num_channels
         msg.thread_id = self.thread_id
+        msg.num_freq_1 = num_freq
+        msg.bin_start = self.spectral_payload.bin_start
+        msg.encoding = self.spectral_payload.encoding
+        msg.scale = self.spectral_payload.scale
+        msg.offset = self.spectral_payload.offset
 
-        sample_buf = stft_samples.numpy()
-        sample_buf = np.moveaxis(sample_buf, [0, 1, 2], [-1, -2, -3])
-        sample_buf = sample_buf.tobytes()
-        msg.stft_samples = sample_buf
-        msg = msg.SerializeToString()
-
-        self.block.pub_socket.send_string(library.BlockName.ShortTimeFFT.value, zmq.SNDMORE)
-        self.block.pub_socket.send_string(f"{time.monotonic_ns()}", zmq.SNDMORE)
-        self.block.pub_socket.send_multipart([msg])
+        msg.stft_samples = sample_buf.tobytes()
+        self.block.publish(library.BlockName.ShortTimeFFT.value, msg.SerializeToString())
 
         self.frame_number += 1
@@ -0,0 +1,190 @@
+"""Publish captured audio frames on the gstreamer-src topic.
+
+Shared by every audio source so consumers can not tell them apart: frames go out as protobuf Samples, as
+binary arrays, or into a shared memory sample ring, with the same sequence numbers and trace frames.
+"""
+import threading
+import time
+
+import numpy as np
+from omegaconf import DictConfig
+import zmq
+
+from shaggy.blocks import scheduling
+from shaggy.proto import wire
+from shaggy.proto.samples_pb2 import Samples
+from shaggy.transport import delivery, library, trace
+from shaggy.transport.sample_ring import SampleRingWriter
+
+# shared ring spans up to a tenth of a second are contiguous views
+SHARED_RING_MARGIN_DIVISOR = 10
+# queue per subscriber of a back pressured source with a lossless policy
+BACKPRESSURE_HWM = 100
+# longest a back pressured publish blocks, so the caller can still handle control commands
+BACKPRESSURE_TIMEOUT_MS = 100
+
+
+def get_capture_cores(cfg) -> tuple:
+    """Cores reserved for the capture thread by the scheduling policy of a config."""
+    policy = scheduling.SchedulingPolicy.from_cfg(cfg)
+    return () if policy is None else policy.capture_cores
+
+
+class SourcePublisher:
+    """Publish interleaved (num_samples, num_channels) audio frames of one source thread."""
+
+    def __init__(self, thread_id: str, rate: int, num_channels: int, context: zmq.Context = None, num_bytes: int = 4,
+                 wire_format: str = wire.PROTOBUF, shared_ring_s: float = None,
+                 mode: str = library.ExecutionMode.Thread.value, delivery_policy: delivery.DeliveryPolicy = None,
+                 tracing: bool = False, backpressure: bool = False, capture_cores: tuple = ()):
+        self.thread_id = thread_id
+        self.rate = rate
+        self.num_channels = num_channels
+        self.num_bytes = num_bytes
+        self.context = context or zmq.Context.instance()
+        self.wire_format = wire_format
+        self.shared_ring_s = shared_ring_s
+        self.mode = mode
+        self.delivery_policy = delivery_policy
+        self.tracing = tracing
+        self.backpressure = backpressure
+        self.capture_cores = capture_cores
+        # native id of the thread last pinned to the capture cores
+        self.capture_thread = None
+        self.pub_socket = None
+        self.sample_ring = None
+        self.frame_number = 0
+        # number of subscriptions of a back pressured publisher by topic
+        self.subscriptions = {}
+
+    @classmethod
+    def from_cfg(cls, cfg: DictConfig, thread_id: str, context: zmq.Context = None,
+                 mode: str = library.ExecutionMode.Thread.value, backpressure: bool = False):
+        return cls(
+                thread_id=thread_id,
+                rate=cfg['gstreamer_src']['sample_rate'],
+                num_channels=cfg['gstreamer_src']['channels'],
+                context=context,
+                wire_format=wire.get_wire_format(cfg),
+                shared_ring_s=(cfg.get('transport') or {}).get('shared_ring_s'),
+                mode=mode,
+                delivery_policy=delivery.get_delivery_policy(cfg, library.BlockName.GStreamerSrc.value),
+                tracing=trace.is_enabled(cfg),
+                backpressure=backpressure,
+                capture_cores=get_capture_cores(cfg),
+                )
+
+    def open(self) -> None:
+        """Bind the publisher.
+
+        A back pressured publisher is an XPUB that counts its subscriptions and blocks instead of dropping
+        when a subscriber's queue is full. publish raises zmq.Again when the frame could not be sent within
+        BACKPRESSURE_TIMEOUT_MS, nothing was sent then and the frame can be published again.
+        """
+        if self.backpressure:
+            self.pub_socket = self.context.socket(zmq.XPUB)
+            self.pub_socket.setsockopt(zmq.XPUB_NODROP, 1)
+            # every (un)subscription is passed up, not only the first and last of a topic
+            self.pub_socket.setsockopt(zmq.XPUB_VERBOSER, 1)
+            policy = self.delivery_policy
+            self.pub_socket.setsockopt(zmq.SNDHWM, policy.socket_hwm if policy and policy.socket_hwm
+                                       else BACKPRESSURE_HWM)
+            self.pub_socket.setsockopt(zmq.SNDTIMEO, BACKPRESSURE_TIMEOUT_MS)
+        else:
+            self.pub_socket = self.context.socket(zmq.PUB)
+            delivery.set_send_policy(self.pub_socket, self.delivery_policy)
+        self.subscriptions = {}
+        for pub_address in library.get_block_sockets(library.BlockName.GStreamerSrc.value, self.thread_id, self.mode):
+            self.pub_socket.bind(pub_address)
+        if self.shared_ring_s:
+            self.sample_ring = SampleRingWriter.create(
+                    library.get_sample_ring_name(library.BlockName.GStreamerSrc.value, self.thread_id),
+                    self.num_channels,
+                    capacity=int(self.shared_ring_s * self.rate),
+                    margin=self.rate // SHARED_RING_MARGIN_DIVISOR,
+                    )
+        self.frame_number = 0
+
+    def close(self) -> None:
+        self.pub_socket.close(0)
+        if self.sample_ring is not None:
+            self.sample_ring.close()
+            self.sample_ring = None
+
+    def get_num_subscribers(self, topic: str = None) -> int:
+        """Number of subscriptions of a back pressured publisher, after reading pending (un)subscribes.
+
+        Only subscriptions to exactly topic are counted if given. Blocks subscribe to the topic prefix of the
+        source, the edge bridge to the source's own topic along with the topics of every other block.
+        """
+        while True:
+            try:
+                message = self.pub_socket.recv(zmq.NOBLOCK)
+            except zmq.Again:
+                break
+            change = {b"\x01": 1, b"\x00": -1}.get(message[:1], 0)
+            self.subscriptions[message[1:]] = self.subscriptions.get(message[1:], 0) + change
+        if topic is not None:
+            return self.subscriptions.get(topic.encode(), 0)
+        return sum(self.subscriptions.values())
+
+    def publish(self, data, capture_ns: int = None) -> None:
+        """Publish one frame of float32 samples, data is a bytes like buffer of interleaved samples.
+
+        Binary frames are sent without copying bytes data, other buffers are copied first as their memory
+        may be reused once this returns.
+        """
+        capture_ns = time.monotonic_ns() if capture_ns is None else capture_ns
+        if self.capture_cores and threading.get_native_id() != self.capture_thread:
+            # the capture thread is only known once it calls, e.g. a GStreamer streaming thread
+            scheduling.pin_current_thread(self.capture_cores)
+            self.capture_thread = threading.get_native_id()
+        if self.sample_ring is not None:
+            samples = np.frombuffer(data, dtype=np.float32).reshape((-1, self.num_channels))
+            start = self.sample_ring.write(samples)
+            wire.send_ring_reference(
+                    self.pub_socket,
+                    library.BlockName.GStreamerSrc.value,
+                    self.thread_id,
+                    self.frame_number,
+                    start,
+                    *samples.shape,
+                    trace=self._get_trace_frame(capture_ns),
+                    )
+            self.frame_number += 1
+            return
+
+        if self.wire_format == wire.BINARY:
+            # zero copy send needs memory that is not reused, e.g. a mapped GStreamer buffer
+            data = data if isinstance(data, bytes) else bytes(data)
+            samples = np.frombuffer(data, dtype=np.float32).reshape((-1, self.num_channels))
+            wire.send_array(
+                    self.pub_socket,
+                    library.BlockName.GStreamerSrc.value,
+                    self.thread_id,
+                    self.frame_number,
+                    samples,
+                    trace=self._get_trace_frame(capture_ns),
+                    )
+            self.frame_number += 1
+            return
+
+        topic = library.get_topic(library.BlockName.GStreamerSrc.value, self.thread_id)
+        self.pub_socket.send_string(topic, zmq.SNDMORE)
+        self.pub_socket.send(wire.pack_stamp(self.frame_number), zmq.SNDMORE)
+        msg = Samples()
+        msg.frame_number = self.frame_number
+        msg.num_samples_0 = memoryview(data).nbytes // (self.num_bytes * self.num_channels)
+        msg.num_channels_1 = self.num_channels
+        msg.samples = data
+        payload = msg.SerializeToString()
+        trace_frame = self._get_trace_frame(capture_ns)
+        self.pub_socket.send_multipart([payload] if trace_frame is None else [payload, trace_frame])
+
+        self.frame_number += 1
+
+    def _get_trace_frame(self, capture_ns: int) -> bytes | None:
+        if not self.tracing:
+            return None
+        return trace.Trace(capture_ns).add(
+                library.BlockName.GStreamerSrc.value, self.thread_id, trace.PUBLISH).pack()
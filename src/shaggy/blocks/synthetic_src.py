@@ -0,0 +1,122 @@
+"""Synthetic audio source, wire compatible with GStreamerSrc and needing no audio interface or camera.
+
+Every channel carries a sine tone plus white noise, delayed by delay_samples per channel as if a plane
+wave crossed a uniform line array. Frames are paced at the sample rate, or published as fast as
+consumers allow when realtime is off.
+"""
+from typing import Optional
+from typing_extensions import Annotated, Self
+import time
+
+import numpy as np
+from omegaconf import DictConfig
+from pydantic import Field
+from pydantic.dataclasses import dataclass
+import zmq
+
+from shaggy.blocks.source_publisher import SourcePublisher
+from shaggy.proto.command_pb2 import Command
+from shaggy.transport import library
+
+
+@dataclass
+class SyntheticSrcConfig:
+    """Definition of a synthetic source.
+
+    Attributes:
+        sample_rate: Integer number of samples per second.
+        num_channels: Number of channels.
+        frame_length: Number of samples in each published frame.
+        tone_hz: Frequency of the tone.
+        amplitude: Peak amplitude of the tone.
+        noise_level: Standard deviation of the white noise.
+        delay_samples: Fractional delay of the tone between neighbouring channels.
+        realtime: Pace frames at the sample rate.
+        seed: Noise generator seed, frames are reproducible for a given seed.
+    """
+
+    sample_rate: Annotated[int, Field(gt=0)] = 48000
+    num_channels: Annotated[int, Field(gt=0)] = 8
+    frame_length: Annotated[int, Field(gt=0)] = 480
+    tone_hz: float = 1000.
+    amplitude: float = 0.1
+    noise_level: Annotated[float, Field(ge=0)] = 0.01
+    delay_samples: float = 0.
+    realtime: bool = True
+    seed: Optional[int] = 0
+
+
+class SyntheticSrc:
+    """Generate audio frames and publish them as the gstreamer-src topic."""
+
+    def __init__(self, config: SyntheticSrcConfig, publisher: SourcePublisher, thread_id: str,
+                 context: zmq.Context = None, mode: str = library.ExecutionMode.Thread.value) -> Self:
+        self.config = config
+        self.publisher = publisher
+        self.thread_id = thread_id
+        self.context = context or zmq.Context.instance()
+        self.mode = mode
+        self.control_socket = None
+        self.run_loop = True
+        self.rng = np.random.default_rng(config.seed)
+        self.phase_step = 2 * np.pi * config.tone_hz / config.sample_rate
+        self.channel_phases = -self.phase_step * config.delay_samples * np.arange(config.num_channels)
+        self.frame_s = config.frame_length / config.sample_rate
+        self.num_samples = 0
+
+    @classmethod
+    def from_cfg(cls, cfg: DictConfig, thread_id: str, address: str = None, context: zmq.Context = None,
+                 mode: str = library.ExecutionMode.Thread.value) -> Self:
+        """Initilize class instance from keywords, same arguments as GStreamerSrc.from_cfg."""
+        context = context or zmq.Context.instance()
+        synthetic_cfg = cfg.get('synthetic_src') or {}
+        config = SyntheticSrcConfig(
+                sample_rate=cfg['gstreamer_src']['sample_rate'],
+                num_channels=cfg['gstreamer_src']['channels'],
+                **synthetic_cfg,
+                )
+        publisher = SourcePublisher.from_cfg(cfg, thread_id, context, mode)
+        return cls(config, publisher, thread_id, context, mode)
+
+    def generate(self) -> np.ndarray:
+        """Next (frame_length, num_channels) float32 frame."""
+        config = self.config
+        n = self.num_samples + np.arange(config.frame_length)
+        phase = self.phase_step * n[:, None] + self.channel_phases
+        frame = config.amplitude * np.sin(phase)
+        if config.noise_level > 0:
+            frame += self.rng.normal(0., config.noise_level, frame.shape)
+        self.num_samples += config.frame_length
+        return frame.astype(np.float32)
+
+    def run(self):
+        self.publisher.open()
+        self.control_socket = self.context.socket(zmq.PAIR)
+        self.control_socket.bind(library.get_control_socket(self.thread_id, self.mode))
+        poller = zmq.Poller()
+        poller.register(self.control_socket, zmq.POLLIN)
+
+        self.num_samples = 0
+        next_frame_s = time.monotonic()
+        self.run_loop = True
+        try:
+            while self.run_loop:
+                timeout_ms = max(0., next_frame_s - time.monotonic()) * 1000 if self.config.realtime else 0
+                socks = dict(poller.poll(timeout_ms))
+                if socks.get(self.control_socket) == zmq.POLLIN:
+                    _, message = self.control_socket.recv_multipart()
+                    self.parse_control(message)
+                    continue
+                if self.config.realtime and time.monotonic() < next_frame_s:
+                    continue
+                self.publisher.publish(self.generate().tobytes())
+                next_frame_s += self.frame_s
+        finally:
+            self.publisher.close()
+            self.control_socket.close(0)
+
+    def parse_control(self, message):
+        command = Command()
+        command.ParseFromString(message)
+        if command.command == 'shutdown':
+            self.run_loop = False
@@ -27,13 +27,23 @@ def samples_to_protobuf(
     return msg.SerializeToString()
 
 
+def proto_to_samples(msg: bytes) -> np.ndarray:
+    """Return a read only (num_samples, num_channels) view of a Samples protobuf message."""
+    pb = Samples()
+    pb.ParseFromString(msg)
+    samples = np.frombuffer(pb.samples, dtype=np.float32)
+    return samples.reshape((pb.num_samples_0, pb.num_channels_1))
+
+
 def detections_to_proto(
-    detections: Tensor,
-    angles: Tensor,
+    detections: Tensor | np.ndarray,
+    angles: Tensor | np.ndarray,
     frame_number: int,
-    publish_rate: int,
+    publish_rate: float,
 ) -> bytes:
-    """Convert a detection tensor into a serialized Detections protobuf."""
+    """Convert (num_times, num_beams) detections and (num_angles, 2) angles into a serialized Detections protobuf."""
+    detections = _to_numpy(detections)
+    angles = _to_numpy(angles)
     num_times, num_beams = map(int, detections.shape)
 
     msg = Detections()
@@ -42,17 +52,23 @@ def detections_to_proto(
     msg.publish_rate = float(publish_rate)
     msg.num_beams = num_beams
     msg.num_times = num_times
-    msg.samples.extend(detections.flatten().astype(np.float32).tolist())
+    msg.samples.extend(detections.ravel().astype(np.float32).tolist())
     msg.num_angles = angles.shape[0]
-    msg.angles.extend(angles.flatten().astype(np.float32).tolist())
+    msg.angles.extend(angles.ravel().astype(np.float32).tolist())
 
     return msg.SerializeToString()
 
 
 def proto_to_detections(msg):
-    """Return a detection array from a protobuff message."""
+    """Return (num_times, num_beams) detections and (num_angles, 2) angles from a protobuff message."""
     pb = Detections()
     pb.ParseFromString(msg)
-    detections = np.array(pb.samples).reshape(pb.num_beams, pb.num_times)
-    angles = np.array(pb.angles).reshape(pb.num_angles, 2)
+    detections = np.array(pb.samples, dtype=np.float32).reshape(pb.num_times, pb.num_beams)
+    angles = np.array(pb.angles, dtype=np.float32).reshape(pb.num_angles, 2)
     return detections, angles
+
+
+def _to_numpy(array: Tensor | np.ndarray) -> np.ndarray:
+    if isinstance(array, Tensor):
+        return array.numpy(force=True)
+    return np.asarray(array)
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10\x64\x65tections.proto\x12\x06shaggy\"\xf9\x01\n\nDetections\x12\x19\n\x0c\x66rame_number\x18\x01 \x01(\x05H\x00\x88\x01\x01\x12\x19\n\x0cpublish_rate\x18\x03 \x01(\x02H\x01\x88\x01\x01\x12\x16\n\tnum_beams\x18\x04 \x01(\x05H\x02\x88\x01\x01\x12\x16\n\tnum_times\x18\x05 \x01(\x05H\x03\x88\x01\x01\x12\x17\n\nnum_angles\x18\x06 \x01(\x05H\x04\x88\x01\x01\x12\x0f\n\x07samples\x18\x07 \x03(\x02\x12\x0e\n\x06\x61ngles\x18\x08 \x03(\x02\x42\x0f\n\r_frame_numberB\x0f\n\r_publish_rateB\x0c\n\n_num_beamsB\x0c\n\n_num_timesB\r\n\x0b_num_anglesb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10\x64\x65tections.proto\x12\x06shaggy\"\xaf\x02\n\nDetections\x12\x19\n\x0c\x66rame_number\x18\x01 \x01(\x05H\x00\x88\x01\x01\x12\x1e\n\x11time_reference_ns\x18\x02 \x01(\x03H\x01\x88\x01\x01\x12\x19\n\x0cpublish_rate\x18\x03 \x01(\x02H\x02\x88\x01\x01\x12\x16\n\tnum_beams\x18\x04 \x01(\x05H\x03\x88\x01\x01\x12\x16\n\tnum_times\x18\x05 \x01(\x05H\x04\x88\x01\x01\x12\x17\n\nnum_angles\x18\x06 \x01(\x05H\x05\x88\x01\x01\x12\x0f\n\x07samples\x18\x07 \x03(\x02\x12\x0e\n\x06\x61ngles\x18\x08 \x03(\x02\x42\x0f\n\r_frame_numberB\x14\n\x12_time_reference_nsB\x0f\n\r_publish_rateB\x0c\n\n_num_beamsB\x0c\n\n_num_timesB\r\n\x0b_num_anglesb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -32,5 +32,5 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'detections_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_DETECTIONS']._serialized_start=29
-  _globals['_DETECTIONS']._serialized_end=278
+  _globals['_DETECTIONS']._serialized_end=332
 # @@protoc_insertion_point(module_scope)
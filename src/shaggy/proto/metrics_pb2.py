@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: metrics.proto
+# Protobuf Python Version: 6.33.2
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    6,
+    33,
+    2,
+    '',
+    'metrics.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rmetrics.proto\x12\x06shaggy\"\xd5\x04\n\x0c\x42lockMetrics\x12\x17\n\nblock_name\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x16\n\tthread_id\x18\x02 \x01(\tH\x01\x88\x01\x01\x12\x17\n\nelapsed_ns\x18\x03 \x01(\x04H\x02\x88\x01\x01\x12\x18\n\x0bmessages_in\x18\x04 \x01(\x04H\x03\x88\x01\x01\x12\x19\n\x0cmessages_out\x18\x05 \x01(\x04H\x04\x88\x01\x01\x12\x15\n\x08\x62ytes_in\x18\x06 \x01(\x04H\x05\x88\x01\x01\x12\x16\n\tbytes_out\x18\x07 \x01(\x04H\x06\x88\x01\x01\x12\x15\n\x08parse_ns\x18\x08 \x01(\x04H\x07\x88\x01\x01\x12\x13\n\x06\x63pu_ns\x18\t \x01(\x04H\x08\x88\x01\x01\x12\x19\n\x0cpoll_wait_ns\x18\n \x01(\x04H\t\x88\x01\x01\x12\x18\n\x0bqueue_depth\x18\x0b \x01(\rH\n\x88\x01\x01\x12\x1c\n\x0fmax_queue_depth\x18\x0c \x01(\rH\x0b\x88\x01\x01\x12\x18\n\x0bnum_dropped\x18\r \x01(\x04H\x0c\x88\x01\x01\x12\x19\n\x0cnum_overruns\x18\x0e \x01(\x04H\r\x88\x01\x01\x12\r\n\x05\x63ores\x18\x0f \x03(\rB\r\n\x0b_block_nameB\x0c\n\n_thread_idB\r\n\x0b_elapsed_nsB\x0e\n\x0c_messages_inB\x0f\n\r_messages_outB\x0b\n\t_bytes_inB\x0c\n\n_bytes_outB\x0b\n\t_parse_nsB\t\n\x07_cpu_nsB\x0f\n\r_poll_wait_nsB\x0e\n\x0c_queue_depthB\x12\n\x10_max_queue_depthB\x0e\n\x0c_num_droppedB\x0f\n\r_num_overrunsb\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'metrics_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_BLOCKMETRICS']._serialized_start=26
+  _globals['_BLOCKMETRICS']._serialized_end=623
+# @@protoc_insertion_point(module_scope)
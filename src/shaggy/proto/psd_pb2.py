@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: psd.proto
+# Protobuf Python Version: 6.33.2
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    6,
+    33,
+    2,
+    '',
+    'psd.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tpsd.proto\x12\x06shaggy\"\xc7\x03\n\x03PSD\x12\x19\n\x0c\x66rame_number\x18\x01 \x01(\x05H\x00\x88\x01\x01\x12\x17\n\nnum_freq_0\x18\x02 \x01(\x05H\x01\x88\x01\x01\x12\x1b\n\x0enum_channels_1\x18\x03 \x01(\x05H\x02\x88\x01\x01\x12\x14\n\x07num_fft\x18\x04 \x01(\x05H\x03\x88\x01\x01\x12\x18\n\x0bsample_rate\x18\x05 \x01(\x05H\x04\x88\x01\x01\x12\x18\n\x0bnum_windows\x18\x06 \x01(\x05H\x05\x88\x01\x01\x12\x10\n\x03psd\x18\x07 \x01(\x0cH\x06\x88\x01\x01\x12\x16\n\tthread_id\x18\x08 \x01(\tH\x07\x88\x01\x01\x12\x16\n\tbin_start\x18\t \x01(\x05H\x08\x88\x01\x01\x12\x15\n\x08\x65ncoding\x18\n \x01(\tH\t\x88\x01\x01\x12\x12\n\x05scale\x18\x0b \x01(\x02H\n\x88\x01\x01\x12\x13\n\x06offset\x18\x0c \x01(\x02H\x0b\x88\x01\x01\x42\x0f\n\r_frame_numberB\r\n\x0b_num_freq_0B\x11\n\x0f_num_channels_1B\n\n\x08_num_fftB\x0e\n\x0c_sample_rateB\x0e\n\x0c_num_windowsB\x06\n\x04_psdB\x0c\n\n_thread_idB\x0c\n\n_bin_startB\x0b\n\t_encodingB\x08\n\x06_scaleB\t\n\x07_offsetb\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'psd_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_PSD']._serialized_start=22
+  _globals['_PSD']._serialized_end=477
+# @@protoc_insertion_point(module_scope)
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\nstft.proto\x12\x06shaggy\"\xa8\x02\n\x04STFT\x12\x19\n\x0c\x66rame_number\x18\x01 \x01(\x05H\x00\x88\x01\x01\x12\x18\n\x0bnum_times_0\x18\x02 \x01(\x05H\x01\x88\x01\x01\x12\x14\n\x07num_fft\x18\x03 \x01(\x05H\x02\x88\x01\x01\x12\x18\n\x0bsample_rate\x18\x04 \x01(\x05H\x03\x88\x01\x01\x12\x1a\n\rnum_channel_2\x18\x05 \x01(\x05H\x04\x88\x01\x01\x12\x19\n\x0cstft_samples\x18\x06 \x01(\x0cH\x05\x88\x01\x01\x12\x16\n\tthread_id\x18\x07 \x01(\tH\x06\x88\x01\x01\x42\x0f\n\r_frame_numberB\x0e\n\x0c_num_times_0B\n\n\x08_num_fftB\x0e\n\x0c_sample_rateB\x10\n\x0e_num_channel_2B\x0f\n\r_stft_samplesB\x0c\n\n_thread_idb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\nstft.proto\x12\x06shaggy\"\xd8\x03\n\x04STFT\x12\x19\n\x0c\x66rame_number\x18\x01 \x01(\x05H\x00\x88\x01\x01\x12\x18\n\x0bnum_times_0\x18\x02 \x01(\x05H\x01\x88\x01\x01\x12\x14\n\x07num_fft\x18\x03 \x01(\x05H\x02\x88\x01\x01\x12\x18\n\x0bsample_rate\x18\x04 \x01(\x05H\x03\x88\x01\x01\x12\x1a\n\rnum_channel_2\x18\x05 \x01(\x05H\x04\x88\x01\x01\x12\x19\n\x0cstft_samples\x18\x06 \x01(\x0cH\x05\x88\x01\x01\x12\x16\n\tthread_id\x18\x07 \x01(\tH\x06\x88\x01\x01\x12\x17\n\nnum_freq_1\x18\x08 \x01(\x05H\x07\x88\x01\x01\x12\x16\n\tbin_start\x18\t \x01(\x05H\x08\x88\x01\x01\x12\x15\n\x08\x65ncoding\x18\n \x01(\tH\t\x88\x01\x01\x12\x12\n\x05scale\x18\x0b \x01(\x02H\n\x88\x01\x01\x12\x13\n\x06offset\x18\x0c \x01(\x02H\x0b\x88\x01\x01\x42\x0f\n\r_frame_numberB\x0e\n\x0c_num_times_0B\n\n\x08_num_fftB\x0e\n\x0c_sample_rateB\x10\n\x0e_num_channel_2B\x0f\n\r_stft_samplesB\x0c\n\n_thread_idB\r\n\x0b_num_freq_1B\x0c\n\n_bin_startB\x0b\n\t_encodingB\x08\n\x06_scaleB\t\n\x07_offsetb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -32,5 +32,5 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'stft_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_STFT']._serialized_start=23
-  _globals['_STFT']._serialized_end=319
+  _globals['_STFT']._serialized_end=495
 # @@protoc_insertion_point(module_scope)
@@ -0,0 +1,232 @@
+"""Binary wire format for streaming topics.
+
+Streaming topics can be sent as three frames, [topic, header, payload], where the header is a small
+fixed size struct and the payload is the raw array memory. Payloads are sent with copy=False and
+wrapped with np.frombuffer on receipt, so neither side serializes the samples. Commands stay on the
+protobuf path in codec.py, and the decimal timestamp framing is still understood by every receiver.
+
+Sources writing into a shared memory sample ring send the same header with the sample ring flag set,
+the payload is then only the int64 sequence number of the first referenced sample.
+
+Protobuf messages keep a decimal timestamp frame, followed by the publisher's sequence number of
+the topic, e.g. b"123456789:42". The binary header frame number plays the same role.
+
+A fourth frame may follow either format with a latency trace, see transport.trace.
+
+Reduced spectral payloads carry the index of their first frequency bin, and quantized dB payloads set
+the decibel flag with value_dB = code * scale + offset.
+"""
+
+import struct
+import time
+from typing import NamedTuple
+
+import numpy as np
+import zmq
+
+from shaggy.transport import library
+
+PROTOBUF = "protobuf"
+BINARY = "binary"
+
+MAGIC = b"SHGW"
+MAX_DIMS = 4
+# magic, topic id, thread id, frame number, monotonic ns, dtype code, number of dims, flags, shape,
+# scale, offset, first frequency bin
+HEADER = struct.Struct(f"<4sH8sQQBBB{MAX_DIMS}IffI")
+FLAG_SAMPLE_RING = 1
+FLAG_DECIBEL = 2
+RING_START = struct.Struct("<q")
+
+DTYPES = (
+    np.dtype(np.float32),
+    np.dtype(np.complex64),
+    np.dtype(np.float16),
+    np.dtype(np.uint8),
+    np.dtype(np.uint16),
+    np.dtype(np.int32),
+    np.dtype(np.int64),
+    np.dtype(np.float64),
+)
+DTYPE_CODES = {dtype: code for code, dtype in enumerate(DTYPES)}
+TOPIC_IDS = {block_name.value: topic_id for topic_id, block_name in enumerate(library.BlockName)}
+TOPIC_NAMES = {topic_id: topic for topic, topic_id in TOPIC_IDS.items()}
+
+
+class Header(NamedTuple):
+    """Decoded binary header frame."""
+    topic_id: int
+    thread_id: str
+    frame_number: int
+    timestamp_ns: int
+    dtype: np.dtype
+    shape: tuple
+    flags: int = 0
+    scale: float = 1.
+    offset: float = 0.
+    bin_start: int = 0
+
+
+class RingReference(NamedTuple):
+    """Samples published into a shared memory sample ring."""
+    header: Header
+    start: int
+
+
+def get_wire_format(cfg) -> str:
+    """Wire format requested by a block config, protobuf unless specified."""
+    transport_cfg = cfg.get('transport') or {}
+    wire_format = transport_cfg.get('wire', PROTOBUF)
+    if wire_format not in (PROTOBUF, BINARY):
+        raise ValueError(f"wire format {wire_format} not reckognized.")
+    return wire_format
+
+
+def pack_header(topic: str, thread_id: str, frame_number: int, dtype: np.dtype, shape: tuple,
+                timestamp_ns: int = None, flags: int = 0, scale: float = 1., offset: float = 0.,
+                bin_start: int = 0) -> bytes:
+    """Fixed size header describing a raw array payload."""
+    if len(shape) > MAX_DIMS:
+        raise ValueError(f"Binary payloads support at most {MAX_DIMS} dimensions, got {len(shape)}.")
+    if timestamp_ns is None:
+        timestamp_ns = time.monotonic_ns()
+    return HEADER.pack(
+            MAGIC,
+            TOPIC_IDS[topic],
+            thread_id.encode(),
+            frame_number,
+            timestamp_ns,
+            DTYPE_CODES[np.dtype(dtype)],
+            len(shape),
+            flags,
+            *shape,
+            *(0,) * (MAX_DIMS - len(shape)),
+            scale,
+            offset,
+            bin_start,
+            )
+
+
+def is_header(frame) -> bool:
+    """Check if a timestamp frame is a binary header."""
+    frame = _to_bytes(frame)
+    return len(frame) == HEADER.size and frame[:len(MAGIC)] == MAGIC
+
+
+def unpack_header(frame) -> Header:
+    """Decode a binary header frame."""
+    _, topic_id, thread_id, frame_number, timestamp_ns, dtype_code, ndim, flags, *shape, scale, offset, \
+        bin_start = HEADER.unpack(_to_bytes(frame))
+    return Header(
+            topic_id=topic_id,
+            thread_id=thread_id.rstrip(b"\0").decode(),
+            frame_number=frame_number,
+            timestamp_ns=timestamp_ns,
+            dtype=DTYPES[dtype_code],
+            shape=tuple(shape[:ndim]),
+            flags=flags,
+            scale=scale,
+            offset=offset,
+            bin_start=bin_start,
+            )
+
+
+def to_array(header: Header, payload) -> np.ndarray:
+    """Read only array view of a payload frame, no copy is made."""
+    if isinstance(payload, zmq.Frame):
+        payload = payload.buffer
+    array = np.frombuffer(payload, dtype=header.dtype).reshape(header.shape)
+    array.flags.writeable = False
+    return array
+
+
+def send_array(socket: zmq.Socket, topic: str, thread_id: str, frame_number: int, array: np.ndarray,
+               timestamp_ns: int = None, track: bool = False, trace: bytes = None,
+               **header_fields) -> zmq.MessageTracker | None:
+    """Publish an array as a header frame plus a zero copy payload frame.
+
+    The array memory must not be modified after sending, or until the returned tracker is done. Any
+    header_fields (flags, scale, offset, bin_start) are passed to pack_header.
+    """
+    array = np.ascontiguousarray(array)
+    header = pack_header(topic, thread_id, frame_number, array.dtype, array.shape, timestamp_ns, **header_fields)
+    frames = [library.get_topic(topic, thread_id).encode(), header, array]
+    if trace is not None:
+        frames.append(trace)
+    return socket.send_multipart(frames, copy=False, track=track)
+
+
+def send_ring_reference(socket: zmq.Socket, topic: str, thread_id: str, frame_number: int, start: int,
+                        num_samples: int, num_channels: int, timestamp_ns: int = None, trace: bytes = None) -> None:
+    """Publish a notification that float32 samples are ready in a shared memory sample ring."""
+    header = pack_header(
+            topic,
+            thread_id,
+            frame_number,
+            np.float32,
+            (num_samples, num_channels),
+            timestamp_ns,
+            flags=FLAG_SAMPLE_RING,
+            )
+    frames = [library.get_topic(topic, thread_id).encode(), header, RING_START.pack(start)]
+    if trace is not None:
+        frames.append(trace)
+    socket.send_multipart(frames)
+
+
+def spectral_header_fields(spectral_payload) -> dict:
+    """Header fields describing a signal.spectral_payload.SpectralPayload encoding."""
+    return dict(
+            flags=FLAG_DECIBEL if spectral_payload.is_db else 0,
+            scale=spectral_payload.scale,
+            offset=spectral_payload.offset,
+            bin_start=spectral_payload.bin_start,
+            )
+
+
+def pack_stamp(sequence: int = None, timestamp_ns: int = None) -> bytes:
+    """Decimal timestamp frame of a protobuf message, with the topic sequence number if given."""
+    if timestamp_ns is None:
+        timestamp_ns = time.monotonic_ns()
+    if sequence is None:
+        return f"{timestamp_ns}".encode()
+    return f"{timestamp_ns}:{sequence}".encode()
+
+
+def unpack_stamp(frame) -> tuple:
+    """Timestamp and sequence number, None if not sent, of a decimal timestamp frame."""
+    timestamp_ns, _, sequence = _to_bytes(frame).partition(b":")
+    return int(timestamp_ns), int(sequence) if sequence else None
+
+
+def get_sequence(frame) -> int | None:
+    """Topic sequence number from either kind of timestamp frame."""
+    if is_header(frame):
+        return unpack_header(frame).frame_number
+    return unpack_stamp(frame)[1]
+
+
+def decode(frames: list) -> tuple:
+    """Topic, timestamp and message from either wire format.
+
+    Returns:
+        topic: Compound block name and thread id topic frame as bytes.
+        timestamp_ns: Monotonic send time.
+        message: Protobuf bytes, a read only array for binary payloads, or a RingReference.
+    """
+    topic, stamp, payload = frames[:3]
+    topic = _to_bytes(topic)
+    stamp = _to_bytes(stamp)
+    if is_header(stamp):
+        header = unpack_header(stamp)
+        if header.flags & FLAG_SAMPLE_RING:
+            start, = RING_START.unpack(_to_bytes(payload))
+            return topic, header.timestamp_ns, RingReference(header, start)
+        return topic, header.timestamp_ns, to_array(header, payload)
+    return topic, unpack_stamp(stamp)[0], _to_bytes(payload)
+
+
+def _to_bytes(frame) -> bytes:
+    if isinstance(frame, zmq.Frame):
+        return frame.bytes
+    return frame
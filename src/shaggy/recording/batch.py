@@ -0,0 +1,199 @@
+"""Offline STFT and PSD of recorded sessions, bit for bit the output of the streaming blocks.
+
+The streaming ShortTimeFFT pre pads the first samples pushed, emits every window as soon as it is
+complete and post pads on flush, and the FFT of a window does not depend on the windows computed with
+it. The windows of a session are therefore computed in independent chunks, each from its own
+overlapping span of the mapped recording, and equal those of a block fed the whole session from its
+first sample.
+
+PSD averages carry state from the first window of a session, Welch's running sum included, so each
+session is averaged in one pass over its windows in order. Its outputs match the PowerSpectralDensity
+block while every source frame completes at most one window, i.e. stride_length >= frame length.
+
+Sessions shorter than half a window can not be post padded by the streaming transform either, they are
+not planned. tests/test_batch.py compares the results with streaming output on synthetic sessions.
+"""
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from shaggy.recording import chunked, pyramid, session, spectrogram, wav
+from shaggy.signal import spectral_payload
+from shaggy.signal.short_time_fft import ShortTimeFFT
+from shaggy.signal.spectral_average import SpectralAverage
+
+STFT_TASK = "stft"
+PSD_TASK = "psd"
+PYRAMID_TASK = "pyramid"
+
+
+def is_session(path) -> bool:
+    path = Path(path)
+    return path.is_file() or chunked.is_chunked(path) or (path / session.AUDIO_FILE).exists()
+
+
+def find_sessions(paths) -> list:
+    """Sessions given as session folders or WAV files, or every session inside other folders."""
+    sessions = []
+    for path in map(Path, paths):
+        if is_session(path):
+            sessions.append(path)
+        else:
+            sessions.extend(sorted(child for child in path.iterdir() if child.is_dir() and is_session(child)))
+    return sessions
+
+
+def get_session_cfg(cfg: dict, info) -> dict:
+    """Config of the streaming blocks run on a recording, with its sample rate and channels."""
+    return {**cfg, 'gstreamer_src': {'sample_rate': info.sample_rate, 'channels': info.num_channels}}
+
+
+def get_output_folder(session_path: Path, output: Path = None) -> Path:
+    """Results folder of a session, the session folder itself if no output folder is given."""
+    folder = session_path.parent / session_path.stem if session_path.is_file() else session_path
+    return folder if output is None else Path(output) / folder.name
+
+
+def compute_windows(stft: ShortTimeFFT, samples, num_samples: int, start: int, stop: int) -> np.ndarray:
+    """Windows start to stop of a session as (num_times, num_freq, num_channels), reusing stft's output buffer.
+
+    Args:
+        samples: Session samples, sliced like a (num_samples, num_channels) array.
+    """
+    first = start * stft.stride_length + stft.first_index
+    last = (stop - 1) * stft.stride_length + stft.window_length + stft.first_index
+    # channel major like the streaming ring, zeros stand for the stream's pre and post padding
+    span = np.zeros((samples.shape[1], last - first), dtype=np.float32)
+    begin, end = max(first, 0), min(last, num_samples)
+    if end > begin:
+        span[:, begin - first:end - first] = wav.to_float32(samples[begin:end]).T
+    return stft.forward_into(torch.from_numpy(span)).permute(2, 1, 0).numpy()
+
+
+def get_min_samples(stft: ShortTimeFFT) -> int:
+    """Fewest samples of a stream the transform can post pad, those reaching past the first window's middle."""
+    return stft.window_length - stft.m_num_mid
+
+
+def plan_session(session_path: Path, cfg: dict, output: Path = None, chunk_s: float = 60.,
+                 do_stft: bool = True, do_psd: bool = True) -> list | None:
+    """Write the metadata of a session's results and return the tasks computing them.
+
+    Returns None, writing nothing, for sessions with fewer samples than get_min_samples.
+    """
+    info, _ = session.open_audio(session_path)
+    session_cfg = get_session_cfg(cfg, info)
+    stft = ShortTimeFFT.from_cfg(session_cfg)
+    if info.num_samples < get_min_samples(stft):
+        return None
+    num_windows = stft.get_num_windows(info.num_samples)
+    chunk_times = max(1, round(chunk_s * info.sample_rate / stft.stride_length))
+    folder = get_output_folder(session_path, output)
+    stream_metadata = {
+        'source': str(session_path),
+        'sample_rate': info.sample_rate,
+        'num_samples': info.num_samples,
+        'window_length': stft.window_length,
+        'stride_length': stft.stride_length,
+        'mfft': stft.mfft,
+        'window_spec': stft.window_spec,
+        'scaling_spec': stft.scaling_spec,
+        'first_index': stft.first_index,
+        'num_windows': num_windows,
+    }
+
+    tasks = []
+    if do_stft:
+        payload = spectral_payload.SpectralPayload.from_cfg(session_cfg)
+        spectrogram.write_metadata(folder / STFT_TASK, {
+            'format': spectrogram.STFT_FORMAT,
+            **stream_metadata,
+            **spectrogram.get_payload_metadata(payload),
+            'num_times': num_windows,
+            'chunk_times': chunk_times,
+        })
+        for chunk, start in enumerate(range(0, num_windows, chunk_times)):
+            tasks.append((STFT_TASK, session_path, folder / STFT_TASK, session_cfg, chunk, start,
+                          min(start + chunk_times, num_windows)))
+    if do_psd:
+        payload = spectral_payload.SpectralPayload.from_cfg(session_cfg, spectral_payload.FLOAT32)
+        if payload.encoding == spectral_payload.COMPLEX64:
+            raise ValueError("Power spectral density can not be encoded as a complex spectrum.")
+        average = SpectralAverage.from_cfg(session_cfg)
+        spectrogram.write_metadata(folder / PSD_TASK, {
+            'format': spectrogram.PSD_FORMAT,
+            **stream_metadata,
+            **spectrogram.get_payload_metadata(payload),
+            'num_windows_averaged': average.num_windows,
+            'window_hop': average.window_hop,
+            'mode': average.mode,
+        }, spectrogram.PSD_METADATA_FILE)
+        tasks.append((PSD_TASK, session_path, folder / PSD_TASK, session_cfg, chunk_times))
+    return tasks
+
+
+def plan_pyramid(session_path: Path, output: Path = None) -> tuple:
+    """Task building the pyramid of a session's spectrogram, once every STFT chunk is written."""
+    return PYRAMID_TASK, session_path, get_output_folder(session_path, output) / STFT_TASK
+
+
+def run_stft_chunk(session_path: Path, folder: Path, cfg: dict, chunk: int, start: int, stop: int) -> None:
+    info, samples = session.open_audio(session_path)
+    stft = ShortTimeFFT.from_cfg(cfg)
+    payload = spectral_payload.SpectralPayload.from_cfg(cfg)
+    windows = compute_windows(stft, samples, info.num_samples, start, stop)
+    np.save(spectrogram.get_chunk_path(folder, chunk), payload.encode(payload.select(windows)))
+
+
+def run_psd(session_path: Path, folder: Path, cfg: dict, chunk_times: int) -> None:
+    """Average a session's windows in order, chunk_times at a time."""
+    info, samples = session.open_audio(session_path)
+    stft = ShortTimeFFT.from_cfg(cfg)
+    payload = spectral_payload.SpectralPayload.from_cfg(cfg, spectral_payload.FLOAT32)
+    average = SpectralAverage.from_cfg(cfg)
+    num_windows = stft.get_num_windows(info.num_samples)
+    outputs, output_windows = [], []
+    for start in range(0, num_windows, chunk_times):
+        stop = min(start + chunk_times, num_windows)
+        power = spectral_payload.get_power(payload.select(compute_windows(stft, samples, info.num_samples,
+                                                                          start, stop)))
+        for window in range(start, stop):
+            # one window per update, as the block receives it with one source frame
+            psd = average.update(power[window - start:window - start + 1])
+            if psd is not None:
+                outputs.append(payload.encode(psd).copy())
+                output_windows.append(window)
+    num_freq, num_channels = payload.num_freq, payload.num_channels
+    np.save(folder / spectrogram.PSD_FILE,
+            np.stack(outputs) if outputs else np.empty((0, num_freq, num_channels), dtype=payload.dtype))
+    np.save(folder / spectrogram.PSD_WINDOWS_FILE, np.array(output_windows, dtype=np.int64))
+
+
+def run_task(task: tuple) -> tuple:
+    """Run a planned task, returns its kind and session."""
+    kind, session_path, *args = task
+    if kind == STFT_TASK:
+        run_stft_chunk(session_path, *args)
+    elif kind == PSD_TASK:
+        run_psd(session_path, *args)
+    else:
+        pyramid.build_pyramid(*args)
+    return kind, session_path
+
+
+def init_worker() -> None:
+    # workers already run one per core
+    torch.set_num_threads(1)
+
+
+def run_tasks(tasks: list, num_workers: int):
+    """Run tasks in a process pool, yields each finished task's kind and session."""
+    if num_workers <= 1:
+        yield from map(run_task, tasks)
+        return
+    # PSD passes are the longest tasks, started first so they overlap the STFT chunks
+    tasks = sorted(tasks, key=lambda task: task[0] != PSD_TASK)
+    with multiprocessing.get_context("spawn").Pool(num_workers, initializer=init_worker) as pool:
+        yield from pool.imap_unordered(run_task, tasks)
@@ -0,0 +1,287 @@
+"""Chunked recording of interleaved float32 samples with a frame index.
+
+A recording folder holds recording.json with the layout and start time, chunk files audio_00000.raw,
+audio_00001.raw, ... of chunk_samples samples each, preallocated when opened, and index.bin with one
+fixed size record per published frame:
+
+    frame_number, chunk, offset, num_samples, monotonic_ns, utc_ns
+
+Samples are contiguous across chunks, a frame may continue into the next chunk. Sample n of the
+recording is at sample n % chunk_samples of chunk n // chunk_samples, so reading any range is a seek
+into mapped files. Frames are written in order, so frames and times are found by bisecting the index.
+
+num_samples is written to recording.json when the recording is closed, a recording cut short keeps its
+preallocated last chunk and its length is taken from the index.
+
+A QueuedWriter writes on its own thread so capture never waits on the filesystem. Frames arriving while
+its queue is full are dropped and recorded as zeros, so sample n stays at the start time plus n samples.
+The index has no records of dropped frames and skips their frame numbers, their count is written to
+recording.json as num_dropped.
+"""
+import json
+import os
+from pathlib import Path
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+FORMAT = "chunked-v1"
+METADATA_FILE = "recording.json"
+INDEX_FILE = "index.bin"
+CHUNK_FORMAT = "audio_{:05d}.raw"
+DTYPE = np.dtype("<f4")
+DEFAULT_CHUNK_S = 60.
+DEFAULT_QUEUE_FRAMES = 500
+INDEX = struct.Struct("<QIIIQQ")
+INDEX_DTYPE = np.dtype([
+        ('frame_number', "<u8"),
+        ('chunk', "<u4"),
+        ('offset', "<u4"),
+        ('num_samples', "<u4"),
+        ('monotonic_ns', "<u8"),
+        ('utc_ns', "<u8"),
+        ])
+
+
+def is_chunked(folder) -> bool:
+    return (Path(folder) / METADATA_FILE).exists()
+
+
+def preallocate(fd: int, num_bytes: int) -> None:
+    """Reserve the blocks of a file, or only set its size where that is not supported."""
+    try:
+        os.posix_fallocate(fd, 0, num_bytes)
+    except (AttributeError, OSError):
+        os.ftruncate(fd, num_bytes)
+
+
+class ChunkedWriter:
+    """Append frames to a chunked recording, frames are written by one thread at a time."""
+
+    def __init__(self, folder, sample_rate: int, num_channels: int, chunk_s: float = DEFAULT_CHUNK_S):
+        self.folder = Path(folder)
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.chunk_samples = int(chunk_s * sample_rate)
+        self.frame_bytes = num_channels * DTYPE.itemsize
+        self.num_samples = 0
+        self.chunk_fd = None
+        self.chunk = -1
+        self.index_file = None
+        self.metadata = None
+
+    def open(self, utc_ns: int = None, monotonic_ns: int = None) -> None:
+        """Create the folder and files, stamped with the start time, now if not given."""
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.metadata = {
+            'format': FORMAT,
+            'sample_rate': self.sample_rate,
+            'num_channels': self.num_channels,
+            'dtype': DTYPE.str,
+            'chunk_samples': self.chunk_samples,
+            'utc_ns': time.time_ns() if utc_ns is None else utc_ns,
+            'monotonic_ns': time.monotonic_ns() if monotonic_ns is None else monotonic_ns,
+        }
+        self._write_metadata()
+        self.index_file = open(self.folder / INDEX_FILE, "wb")
+        self.num_samples = 0
+        self._open_chunk(0)
+
+    def write(self, data, frame_number: int, monotonic_ns: int, utc_ns: int) -> None:
+        """Append one frame, data is a bytes like buffer of interleaved float32 samples."""
+        data = memoryview(data).cast("B")
+        num_samples = data.nbytes // self.frame_bytes
+        chunk, offset = divmod(self.num_samples, self.chunk_samples)
+        self.index_file.write(INDEX.pack(frame_number, chunk, offset, num_samples, monotonic_ns, utc_ns))
+        written = 0
+        while written < num_samples:
+            chunk, offset = divmod(self.num_samples, self.chunk_samples)
+            if chunk != self.chunk:
+                self._open_chunk(chunk)
+            count = min(num_samples - written, self.chunk_samples - offset)
+            os.pwrite(self.chunk_fd, data[written * self.frame_bytes:(written + count) * self.frame_bytes],
+                      offset * self.frame_bytes)
+            written += count
+            self.num_samples += count
+
+    def write_zeros(self, num_samples: int) -> None:
+        """Append num_samples of silence without an index record, preallocated chunks read as zeros."""
+        if num_samples <= 0:
+            return
+        last_chunk = (self.num_samples + num_samples - 1) // self.chunk_samples
+        for chunk in range(self.chunk + 1, last_chunk + 1):
+            self._open_chunk(chunk)
+        self.num_samples += num_samples
+
+    def close(self) -> None:
+        """Trim the last chunk to the samples written and record the length."""
+        if self.chunk_fd is None:
+            return
+        last_samples = self.num_samples - self.chunk * self.chunk_samples
+        os.ftruncate(self.chunk_fd, last_samples * self.frame_bytes)
+        os.close(self.chunk_fd)
+        self.chunk_fd = None
+        self.index_file.close()
+        self.metadata['num_samples'] = self.num_samples
+        self._write_metadata()
+
+    def _open_chunk(self, chunk: int) -> None:
+        if self.chunk_fd is not None:
+            os.close(self.chunk_fd)
+        self.chunk_fd = os.open(self.folder / CHUNK_FORMAT.format(chunk), os.O_RDWR | os.O_CREAT | os.O_TRUNC,
+                                0o644)
+        preallocate(self.chunk_fd, self.chunk_samples * self.frame_bytes)
+        self.chunk = chunk
+
+    def _write_metadata(self) -> None:
+        (self.folder / METADATA_FILE).write_text(json.dumps(self.metadata, indent=2))
+
+
+class QueuedWriter:
+    """ChunkedWriter run on a writer thread, fed through a bounded queue of frames."""
+
+    def __init__(self, writer: ChunkedWriter, max_frames: int = DEFAULT_QUEUE_FRAMES):
+        self.writer = writer
+        self.frames = queue.Queue(max_frames)
+        self.num_dropped = 0
+        # samples of the frames dropped since the last queued one, written as zeros before it
+        self.num_dropped_samples = 0
+        self.thread = None
+
+    def open(self, utc_ns: int = None, monotonic_ns: int = None) -> None:
+        """Open the recording and start the writer thread."""
+        self.writer.open(utc_ns, monotonic_ns)
+        self.num_dropped = 0
+        self.num_dropped_samples = 0
+        self.thread = threading.Thread(target=self._run, name=f"recorder-{self.writer.folder.name}", daemon=True)
+        self.thread.start()
+
+    def write(self, data, frame_number: int, monotonic_ns: int, utc_ns: int) -> bool:
+        """Queue a copy of one frame without waiting, returns False if the queue was full and it is dropped."""
+        data = memoryview(data).cast("B")
+        try:
+            self.frames.put_nowait((self.num_dropped_samples, (bytes(data), frame_number, monotonic_ns, utc_ns)))
+        except queue.Full:
+            self.num_dropped += 1
+            self.num_dropped_samples += data.nbytes // self.writer.frame_bytes
+            return False
+        self.num_dropped_samples = 0
+        return True
+
+    def close(self) -> None:
+        """Write the frames still queued, then close the recording."""
+        if self.thread is None:
+            return
+        self.frames.put((self.num_dropped_samples, None))
+        self.thread.join()
+        self.thread = None
+        self.writer.metadata['num_dropped'] = self.num_dropped
+        self.writer.close()
+
+    def _run(self) -> None:
+        while True:
+            num_zeros, frame = self.frames.get()
+            self.writer.write_zeros(num_zeros)
+            if frame is None:
+                return
+            self.writer.write(*frame)
+
+
+class RecordingInfo:
+    """Layout and start time of a chunked recording, from its metadata."""
+
+    def __init__(self, metadata: dict, num_samples: int):
+        self.sample_rate = metadata['sample_rate']
+        self.num_channels = metadata['num_channels']
+        self.dtype = np.dtype(metadata['dtype'])
+        self.chunk_samples = metadata['chunk_samples']
+        self.utc_ns = metadata['utc_ns']
+        self.monotonic_ns = metadata['monotonic_ns']
+        self.num_samples = num_samples
+        self.num_dropped = metadata.get('num_dropped', 0)
+
+
+class ChunkedReader:
+    """Random access to the samples of a chunked recording, sliced like a (num_samples, num_channels) array."""
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        metadata = json.loads((self.folder / METADATA_FILE).read_text())
+        if metadata.get('format') != FORMAT:
+            raise ValueError(f"{self.folder} is not a {FORMAT} recording.")
+        index_path = self.folder / INDEX_FILE
+        num_records = index_path.stat().st_size // INDEX_DTYPE.itemsize
+        self.index = (np.memmap(index_path, dtype=INDEX_DTYPE, mode="r", shape=(num_records,)) if num_records
+                      else np.empty(0, dtype=INDEX_DTYPE))
+        self.info = RecordingInfo(metadata, metadata.get('num_samples', 0))
+        if 'num_samples' not in metadata and num_records:
+            self.info.num_samples = self.get_position(num_records - 1) + int(self.index[-1]['num_samples'])
+        self.chunks = {}
+
+    def __len__(self) -> int:
+        return self.info.num_samples
+
+    @property
+    def shape(self) -> tuple:
+        return self.info.num_samples, self.info.num_channels
+
+    def __getitem__(self, key) -> np.ndarray:
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("Recordings are indexed by contiguous sample slices.")
+        start, stop, _ = key.indices(self.info.num_samples)
+        return self.read(start, stop)
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """Samples start to stop, a view into the mapped chunk if they are in one."""
+        chunk_samples = self.info.chunk_samples
+        stop = max(start, min(stop, self.info.num_samples))
+        parts = []
+        position = start
+        while position < stop:
+            chunk, offset = divmod(position, chunk_samples)
+            count = min(stop - position, chunk_samples - offset)
+            parts.append(self._get_chunk(chunk)[offset:offset + count])
+            position += count
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return np.empty((0, self.info.num_channels), dtype=self.info.dtype)
+        return np.concatenate(parts)
+
+    def get_frame(self, frame_number: int) -> np.ndarray:
+        """Index record of a frame, KeyError if it was not recorded."""
+        record = int(np.searchsorted(self.index['frame_number'], frame_number))
+        if record == len(self.index) or int(self.index[record]['frame_number']) != frame_number:
+            raise KeyError(f"Frame {frame_number} is not in {self.folder}.")
+        return self.index[record]
+
+    def get_position(self, record: int) -> int:
+        """Sample position of the start of an index record."""
+        entry = self.index[record]
+        return int(entry['chunk']) * self.info.chunk_samples + int(entry['offset'])
+
+    def find(self, utc_ns: int) -> int:
+        """Sample position of a UTC time, interpolated from the frame received before it."""
+        if len(self.index) == 0:
+            return 0
+        record = max(int(np.searchsorted(self.index['utc_ns'], utc_ns, side="right")) - 1, 0)
+        position = self.get_position(record) + round(
+                (utc_ns - int(self.index[record]['utc_ns'])) * self.info.sample_rate / 1e9)
+        return min(max(position, 0), self.info.num_samples)
+
+    def read_time(self, utc_ns: int, duration_s: float) -> np.ndarray:
+        """Samples of duration_s from a UTC time."""
+        start = self.find(utc_ns)
+        return self.read(start, start + round(duration_s * self.info.sample_rate))
+
+    def _get_chunk(self, chunk: int) -> np.memmap:
+        if chunk not in self.chunks:
+            path = self.folder / CHUNK_FORMAT.format(chunk)
+            num_samples = min(path.stat().st_size // (self.info.num_channels * self.info.dtype.itemsize),
+                              self.info.chunk_samples)
+            self.chunks[chunk] = np.memmap(path, dtype=self.info.dtype, mode="r",
+                                           shape=(num_samples, self.info.num_channels))
+        return self.chunks[chunk]
@@ -0,0 +1,201 @@
+"""Multi-resolution power of a chunked spectrogram, for browsing long recordings.
+
+Level 0 is the power of every STFT window, level l the mean and the max of 2**l consecutive windows,
+halving down to a level that fits in one tile. Levels are stored channel major, level_00.npy as
+(num_channels + 1, num_times, num_freq) float32 power with the channel average last, and mean_01.npy,
+max_01.npy, ... for the decimated levels, so one channel of a time range is contiguous. Storage is about
+three times the power of the spectrogram.
+
+Levels are memory mapped and read in tiles of TILE_TIMES columns of one channel, kept in an LRU cache.
+A view of any time span reads at most about two columns per displayed column, from the coarsest level
+that still resolves them, so its cost does not depend on the length of the session.
+"""
+from collections import OrderedDict
+import json
+from pathlib import Path
+
+import numpy as np
+
+from shaggy.recording import spectrogram
+
+FORMAT = "pyramid-v1"
+METADATA_FILE = "pyramid.json"
+LEVEL_FORMAT = "{}_{:02d}.npy"
+LEVEL_0 = "level"
+MEAN = "mean"
+MAX = "max"
+TILE_TIMES = 256
+CACHE_BYTES = 256 * 2 ** 20
+# power read at a time while building
+BUILD_BYTES = 256 * 2 ** 20
+
+
+def get_level_path(folder, stat: str, level: int) -> Path:
+    return Path(folder) / LEVEL_FORMAT.format(LEVEL_0 if level == 0 else stat, level)
+
+
+def get_block_times(num_channels: int, num_freq: int) -> int:
+    """Even number of columns of every channel read at a time while building."""
+    return max(2, BUILD_BYTES // (num_channels * num_freq * 4) // 2 * 2)
+
+
+def build_pyramid(stft_folder, folder=None) -> Path:
+    """Build the pyramid of a spectrogram, in a pyramid folder inside it if no folder is given."""
+    reader = spectrogram.SpectrogramReader(stft_folder)
+    folder = Path(stft_folder) / "pyramid" if folder is None else Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    num_times = reader.num_times
+    num_freq = reader.metadata['bin_stop'] - reader.metadata['bin_start']
+    num_channels = len(reader.metadata['channels'])
+    block_times = get_block_times(num_channels + 1, num_freq)
+
+    level = np.lib.format.open_memmap(get_level_path(folder, MEAN, 0), mode="w+", dtype=np.float32,
+                                      shape=(num_channels + 1, num_times, num_freq))
+    for start in range(0, num_times, block_times):
+        stop = min(start + block_times, num_times)
+        power = reader.read_power(start, stop)
+        level[:num_channels, start:stop] = power.transpose(2, 0, 1)
+        level[num_channels, start:stop] = power.mean(axis=-1)
+    level.flush()
+    level_times = [num_times]
+    means = maxes = level
+
+    while level_times[-1] > TILE_TIMES:
+        num_level = len(level_times)
+        num_times = (level_times[-1] + 1) // 2
+        shape = (num_channels + 1, num_times, num_freq)
+        next_means = np.lib.format.open_memmap(get_level_path(folder, MEAN, num_level), mode="w+",
+                                               dtype=np.float32, shape=shape)
+        next_maxes = np.lib.format.open_memmap(get_level_path(folder, MAX, num_level), mode="w+",
+                                               dtype=np.float32, shape=shape)
+        for start in range(0, level_times[-1], block_times):
+            stop = min(start + block_times, level_times[-1])
+            # a trailing odd column is its own mean and max
+            pairs = slice(start, stop - (stop - start) % 2)
+            out = slice(start // 2, (stop + 1) // 2)
+            block_means = np.asarray(means[:, pairs])
+            block_maxes = np.asarray(maxes[:, pairs])
+            next_means[:, out.start:out.start + block_means.shape[1] // 2] = (
+                    block_means[:, 0::2] + block_means[:, 1::2]) / 2
+            next_maxes[:, out.start:out.start + block_maxes.shape[1] // 2] = np.maximum(
+                    block_maxes[:, 0::2], block_maxes[:, 1::2])
+            if (stop - start) % 2:
+                next_means[:, out.stop - 1] = means[:, stop - 1]
+                next_maxes[:, out.stop - 1] = maxes[:, stop - 1]
+        next_means.flush()
+        next_maxes.flush()
+        level_times.append(num_times)
+        means, maxes = next_means, next_maxes
+
+    metadata = {
+        'format': FORMAT,
+        'spectrogram': str(Path(stft_folder)),
+        **{key: reader.metadata[key] for key in ('sample_rate', 'window_length', 'stride_length', 'mfft',
+                                                 'first_index', 'bin_start', 'bin_stop', 'channels')},
+        'level_times': level_times,
+        'tile_times': TILE_TIMES,
+    }
+    (folder / METADATA_FILE).write_text(json.dumps(metadata, indent=2))
+    return folder
+
+
+class TileCache:
+    """Least recently used arrays up to a total size in bytes."""
+
+    def __init__(self, max_bytes: int = CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.tiles = OrderedDict()
+
+    def get(self, key, load) -> np.ndarray:
+        """Cached array of key, from load() if it is not cached."""
+        if key in self.tiles:
+            self.tiles.move_to_end(key)
+            return self.tiles[key]
+        tile = load()
+        self.tiles[key] = tile
+        self.num_bytes += tile.nbytes
+        while self.num_bytes > self.max_bytes and len(self.tiles) > 1:
+            _, evicted = self.tiles.popitem(last=False)
+            self.num_bytes -= evicted.nbytes
+        return tile
+
+
+class SpectrogramPyramid:
+    """Power columns of a recorded spectrogram at any time span."""
+
+    def __init__(self, folder, cache_bytes: int = CACHE_BYTES):
+        self.folder = Path(folder)
+        self.metadata = json.loads((self.folder / METADATA_FILE).read_text())
+        if self.metadata.get('format') != FORMAT:
+            raise ValueError(f"{self.folder} is not a {FORMAT} spectrogram pyramid.")
+        self.level_times = self.metadata['level_times']
+        self.tile_times = self.metadata['tile_times']
+        self.sample_rate = self.metadata['sample_rate']
+        self.window_s = self.metadata['stride_length'] / self.sample_rate
+        self.num_channels = len(self.metadata['channels'])
+        self.f_axis = (np.arange(self.metadata['bin_start'], self.metadata['bin_stop']) * self.sample_rate
+                       / self.metadata['mfft'])
+        self.cache = TileCache(cache_bytes)
+        self.levels = {}
+
+    @property
+    def num_levels(self) -> int:
+        return len(self.level_times)
+
+    @property
+    def duration_s(self) -> float:
+        return self.level_times[0] * self.window_s
+
+    def get_window(self, time_s: np.ndarray) -> np.ndarray:
+        """Fractional STFT window centred at session times."""
+        metadata = self.metadata
+        return ((time_s * self.sample_rate - metadata['first_index'] - metadata['window_length'] // 2)
+                / metadata['stride_length'])
+
+    def get_level(self, windows_per_column: float) -> int:
+        """Coarsest level with at least one column per displayed column."""
+        if windows_per_column <= 1:
+            return 0
+        return min(int(np.log2(windows_per_column)), self.num_levels - 1)
+
+    def read(self, level: int, start: int, stop: int, channel: int = None, stat: str = MEAN) -> np.ndarray:
+        """(stop - start, num_freq) power of one channel, the channel average if None."""
+        channel = self.num_channels if channel is None else channel
+        first_tile, last_tile = start // self.tile_times, (stop - 1) // self.tile_times
+        tiles = [self._get_tile(level, stat, channel, tile) for tile in range(first_tile, last_tile + 1)]
+        offset = first_tile * self.tile_times
+        return np.concatenate(tiles)[start - offset:stop - offset]
+
+    def get_columns(self, start_s: float, stop_s: float, num_columns: int, channel: int = None,
+                    stat: str = MEAN) -> np.ndarray:
+        """(num_columns, num_freq) power from start_s to stop_s, zero outside the recording.
+
+        Each column is the level column nearest its centre, at the coarsest level with at least one
+        column per displayed column, so short spans repeat single STFT windows.
+        """
+        centres_s = start_s + (np.arange(num_columns) + 0.5) * (stop_s - start_s) / num_columns
+        windows = self.get_window(centres_s)
+        level = self.get_level((windows[-1] - windows[0]) / max(num_columns - 1, 1))
+        indices = np.floor(windows / 2 ** level).astype(np.int64)
+        is_inside = (indices >= 0) & (indices < self.level_times[level])
+        columns = np.zeros((num_columns, len(self.f_axis)), dtype=np.float32)
+        if is_inside.any():
+            first, last = indices[is_inside][0], indices[is_inside][-1]
+            power = self.read(level, first, last + 1, channel, stat)
+            columns[is_inside] = power[indices[is_inside] - first]
+        return columns
+
+    def _get_tile(self, level: int, stat: str, channel: int, tile: int) -> np.ndarray:
+        stat = MEAN if level == 0 else stat
+
+        def load():
+            start = tile * self.tile_times
+            return np.array(self._get_level(level, stat)[channel, start:start + self.tile_times])
+
+        return self.cache.get((level, stat, channel, tile), load)
+
+    def _get_level(self, level: int, stat: str) -> np.ndarray:
+        if (level, stat) not in self.levels:
+            self.levels[level, stat] = np.load(get_level_path(self.folder, stat, level), mmap_mode="r")
+        return self.levels[level, stat]
@@ -0,0 +1,86 @@
+"""Layout of recorded sessions.
+
+GStreamerSrc.start_record writes each session to its own folder under ~/data/camera, named by the UTC
+start time, with the record command config in logging_config.json, the start time in audio_timestamp.txt
+and the audio as a chunked recording, see chunked. Older sessions have the audio in audio.wav and the
+fields of the timestamp written without separators.
+"""
+import datetime
+from pathlib import Path
+import re
+import time
+from typing import NamedTuple
+
+from shaggy.recording import chunked, wav
+
+BASE_FOLDER = Path.home() / "data" / "camera"
+AUDIO_FILE = "audio.wav"
+CONFIG_FILE = "logging_config.json"
+TIMESTAMP_FILE = "audio_timestamp.txt"
+FOLDER_FORMAT = "%Y-%m-%dT%H_%M_%S"
+# folder name, UTC ns and monotonic s, space separated or, in older sessions, back to back
+TIMESTAMP = re.compile(r"(\d{4}-\d{2}-\d{2}T\d{2}_\d{2}_\d{2}) ?(\d{19}) ?(\d+\.\d+)")
+
+
+class AudioTimestamp(NamedTuple):
+    """Start time of a recording."""
+    utc_ns: int
+    monotonic_s: float
+
+
+def get_session_folder(path) -> Path:
+    """Session folder of a session folder or of any file in it."""
+    path = Path(path).expanduser()
+    return path if path.is_dir() else path.parent
+
+
+def read_audio_timestamp(path) -> AudioTimestamp | None:
+    """Start time of a session, None if it has no timestamp file."""
+    timestamp_path = get_session_folder(path) / TIMESTAMP_FILE
+    if not timestamp_path.exists():
+        return None
+    text = timestamp_path.read_text().strip()
+    match = TIMESTAMP.fullmatch(text)
+    if match is None:
+        raise ValueError(f"Timestamp {text!r} of {timestamp_path} not reckognized.")
+    return AudioTimestamp(int(match.group(2)), float(match.group(3)))
+
+
+def write_audio_timestamp(folder, utc_ns: int = None, monotonic_ns: int = None) -> AudioTimestamp:
+    """Write the start time of a session, now if not given."""
+    utc_ns = time.time_ns() if utc_ns is None else utc_ns
+    monotonic_s = (time.monotonic_ns() if monotonic_ns is None else monotonic_ns) / 1e9
+    utc = datetime.datetime.fromtimestamp(utc_ns / 1e9, tz=datetime.timezone.utc)
+    (Path(folder) / TIMESTAMP_FILE).write_text(f"{utc.strftime(FOLDER_FORMAT)} {utc_ns} {monotonic_s:.9f}\n")
+    return AudioTimestamp(utc_ns, monotonic_s)
+
+
+def get_folder_time(path) -> datetime.datetime:
+    """UTC start time from a session folder name, to the second."""
+    folder = get_session_folder(path)
+    return datetime.datetime.strptime(folder.name, FOLDER_FORMAT).replace(tzinfo=datetime.timezone.utc)
+
+
+def open_audio(path) -> tuple:
+    """Layout and samples of a session folder or WAV file, samples are sliced like a (num_samples,
+    num_channels) array without reading the rest of the recording."""
+    path = Path(path).expanduser()
+    if path.is_dir() and chunked.is_chunked(path):
+        reader = chunked.ChunkedReader(path)
+        return reader.info, reader
+    return wav.map_wav(path / AUDIO_FILE if path.is_dir() else path)
+
+
+def get_start_utc_ns(path) -> int | None:
+    """UTC time of the first sample of a session, to the second from the folder name if it has no
+    timestamp, None if that fails too."""
+    folder = get_session_folder(path)
+    if chunked.is_chunked(folder):
+        return chunked.ChunkedReader(folder).info.utc_ns
+    timestamp = read_audio_timestamp(folder)
+    if timestamp is not None:
+        return timestamp.utc_ns
+    try:
+        return int(get_folder_time(folder).timestamp()) * 1_000_000_000
+    except ValueError:
+        return None
@@ -0,0 +1,96 @@
+"""Chunked spectrograms of recorded sessions, written by shaggy-process.
+
+A spectrogram folder holds spectrogram.json with the STFT and payload parameters, and stft_00000.npy,
+stft_00001.npy, ... of chunk_times windows each, every chunk but the last full. Chunks are
+(num_times, num_freq, num_channels) arrays in the payload encoding of the stft config, the layout the
+ShortTimeFFT block publishes. Window k starts at sample k * stride_length + first_index of the session,
+first_index being negative as the stream is pre padded.
+
+A PSD folder holds psd.json, psd.npy with the (num_outputs, num_freq, num_channels) encoded averages and
+windows.npy with the STFT window each average was output on.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+from shaggy.signal import spectral_payload
+
+STFT_FORMAT = "spectrogram-v1"
+PSD_FORMAT = "psd-v1"
+STFT_METADATA_FILE = "spectrogram.json"
+PSD_METADATA_FILE = "psd.json"
+CHUNK_FORMAT = "stft_{:05d}.npy"
+PSD_FILE = "psd.npy"
+PSD_WINDOWS_FILE = "windows.npy"
+
+
+def get_payload_metadata(payload: spectral_payload.SpectralPayload) -> dict:
+    return {
+        'bin_start': payload.bin_start,
+        'bin_stop': payload.bin_stop,
+        'channels': payload.channel_numbers,
+        'encoding': payload.encoding,
+        'scale': payload.scale,
+        'offset': payload.offset,
+    }
+
+
+def write_metadata(folder, metadata: dict, file_name: str = STFT_METADATA_FILE) -> None:
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / file_name).write_text(json.dumps(metadata, indent=2))
+
+
+def get_chunk_path(folder, chunk: int) -> Path:
+    return Path(folder) / CHUNK_FORMAT.format(chunk)
+
+
+class SpectrogramReader:
+    """Windows of a chunked spectrogram, chunks are memory mapped as they are read."""
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.metadata = json.loads((self.folder / STFT_METADATA_FILE).read_text())
+        if self.metadata.get('format') != STFT_FORMAT:
+            raise ValueError(f"{self.folder} is not a {STFT_FORMAT} spectrogram.")
+        self.num_times = self.metadata['num_times']
+        self.chunk_times = self.metadata['chunk_times']
+        self.sample_rate = self.metadata['sample_rate']
+        self.chunks = {}
+
+    @property
+    def is_db(self) -> bool:
+        return self.metadata['encoding'] in spectral_payload.DB_ENCODINGS
+
+    def get_time_s(self, window: int | np.ndarray) -> float | np.ndarray:
+        """Session time of the centre of windows."""
+        metadata = self.metadata
+        start = np.asarray(window) * metadata['stride_length'] + metadata['first_index']
+        return (start + metadata['window_length'] // 2) / self.sample_rate
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """Encoded windows start to stop, a view into the mapped chunk if they are in one."""
+        stop = max(start, min(stop, self.num_times))
+        parts = []
+        window = start
+        while window < stop:
+            chunk, offset = divmod(window, self.chunk_times)
+            count = min(stop - window, self.chunk_times - offset)
+            parts.append(self._get_chunk(chunk)[offset:offset + count])
+            window += count
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return np.empty((0, 0, 0))
+        return np.concatenate(parts)
+
+    def read_power(self, start: int, stop: int) -> np.ndarray:
+        """Float32 power of windows start to stop."""
+        metadata = self.metadata
+        return spectral_payload.to_power(self.read(start, stop), metadata['scale'], metadata['offset'], self.is_db)
+
+    def _get_chunk(self, chunk: int) -> np.ndarray:
+        if chunk not in self.chunks:
+            self.chunks[chunk] = np.load(get_chunk_path(self.folder, chunk), mmap_mode="r")
+        return self.chunks[chunk]
@@ -0,0 +1,89 @@
+"""Memory mapped reading of recorded WAV files.
+
+Recordings are written by GStreamer wavenc, which only fills in the data size when the stream ends, so
+a data chunk with a missing or oversized length is taken to run to the end of the file.
+"""
+from pathlib import Path
+import struct
+from typing import NamedTuple
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+CHUNK = struct.Struct("<4sI")
+FMT = struct.Struct("<HHIIHH")
+# data size written by streaming encoders before the size is known
+UNKNOWN_SIZES = (0, 0xFFFFFFFF)
+
+
+class WavInfo(NamedTuple):
+    """Layout of the samples in a WAV file."""
+    sample_rate: int
+    num_channels: int
+    dtype: np.dtype
+    data_offset: int
+    num_samples: int
+
+
+def read_wav_info(path) -> WavInfo:
+    """Parse the RIFF chunks of a WAV file up to its data chunk."""
+    path = Path(path)
+    file_size = path.stat().st_size
+    fmt = None
+    with open(path, "rb") as f:
+        riff, _ = CHUNK.unpack(f.read(CHUNK.size))
+        if riff != b"RIFF" or f.read(4) != b"WAVE":
+            raise ValueError(f"{path} is not a RIFF WAVE file.")
+        while True:
+            header = f.read(CHUNK.size)
+            if len(header) < CHUNK.size:
+                raise ValueError(f"{path} has no data chunk.")
+            chunk_id, chunk_size = CHUNK.unpack(header)
+            if chunk_id == b"fmt ":
+                chunk = f.read(chunk_size)
+                fmt = FMT.unpack_from(chunk)
+                if fmt[0] == WAVE_FORMAT_EXTENSIBLE:
+                    # sub format GUID starts with the format code
+                    fmt = (struct.unpack_from("<H", chunk, 24)[0], *fmt[1:])
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"{path} has no fmt chunk before its data.")
+                data_offset = f.tell()
+                if chunk_size in UNKNOWN_SIZES or data_offset + chunk_size > file_size:
+                    chunk_size = file_size - data_offset
+                break
+            else:
+                f.seek(chunk_size + chunk_size % 2, 1)
+
+    audio_format, num_channels, sample_rate, _, block_align, bits = fmt
+    dtype = get_dtype(audio_format, bits)
+    return WavInfo(sample_rate, num_channels, dtype, data_offset, chunk_size // block_align)
+
+
+def get_dtype(audio_format: int, bits: int) -> np.dtype:
+    if audio_format == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        return np.dtype("<f4")
+    if audio_format == WAVE_FORMAT_PCM and bits == 16:
+        return np.dtype("<i2")
+    if audio_format == WAVE_FORMAT_PCM and bits == 32:
+        return np.dtype("<i4")
+    raise ValueError(f"WAV format {audio_format} with {bits} bit samples is not supported.")
+
+
+def map_wav(path) -> tuple:
+    """Read only (num_samples, num_channels) map of the samples of a WAV file, and its layout."""
+    info = read_wav_info(path)
+    if info.num_samples == 0:
+        return info, np.empty((0, info.num_channels), dtype=info.dtype)
+    samples = np.memmap(path, dtype=info.dtype, mode="r", offset=info.data_offset,
+                        shape=(info.num_samples, info.num_channels))
+    return info, samples
+
+
+def to_float32(samples: np.ndarray) -> np.ndarray:
+    """Float32 copy of samples in [-1, 1), float samples are copied unchanged."""
+    if samples.dtype.kind == "f":
+        return np.array(samples, dtype=np.float32)
+    return samples.astype(np.float32) * np.float32(1 / -np.iinfo(samples.dtype).min)
@@ -0,0 +1,148 @@
+"""
+Frequency domain delay-and-sum beam power over an azimuth and elevation grid.
+
+Each beam phase aligns the channels of every bin for a plane wave arriving from its direction and
+averages them, beam power is the aligned power summed over the bins of a band. Steering vectors are a
+(num_freq, num_beams, num_channels) complex64 tensor, computed once for each geometry, grid and band and
+shared by every beamformer with the same ones, so a frame costs one batched product across beams, bins
+and channels. Steering memory is 8 * num_freq * num_beams * num_channels bytes, bin_step thins the band
+for dense grids.
+
+Directions are unit vectors towards the source, azimuth from the x axis towards y and elevation from
+the x-y plane towards z, in the coordinates of the mic positions.
+"""
+
+from functools import lru_cache
+from typing import List, Tuple
+from typing_extensions import Annotated, Self
+
+import numpy as np
+import torch
+from pydantic import Field
+from pydantic.dataclasses import dataclass
+from torch import Tensor
+
+SPEED_OF_SOUND = 343.
+
+
+@dataclass
+class BeamformerConfig:
+    """Definition of a delay-and-sum beam grid.
+
+    Attributes:
+        positions: Mic positions in m, one per STFT channel.
+        sample_rate: Integer number of data samples per second.
+        mfft: Integer number of samples in each FFT.
+        azimuth_deg: First and last azimuth of the grid.
+        elevation_deg: First and last elevation of the grid.
+        num_azimuth: Number of azimuths, evenly spaced.
+        num_elevation: Number of elevations, evenly spaced.
+        f_bounds: Lower and upper frequency in Hz of the summed bins.
+        bin_step: Use every bin_step-th bin of the band.
+        speed_of_sound: Speed of sound in m/s.
+    """
+
+    positions: List[Tuple[float, float, float]]
+    sample_rate: Annotated[int, Field(gt=0)]
+    mfft: Annotated[int, Field(gt=0)]
+    azimuth_deg: Tuple[float, float] = (-90., 90.)
+    elevation_deg: Tuple[float, float] = (0., 0.)
+    num_azimuth: Annotated[int, Field(gt=0)] = 37
+    num_elevation: Annotated[int, Field(gt=0)] = 1
+    f_bounds: Tuple[float, float] = (500., 4000.)
+    bin_step: Annotated[int, Field(gt=0)] = 1
+    speed_of_sound: Annotated[float, Field(gt=0)] = SPEED_OF_SOUND
+
+    def __post_init__(self) -> Self:
+        """Parameter checks."""
+        if self.f_bounds[0] > self.f_bounds[1]:
+            raise ValueError("Lower frequency bound must be less than or equal to the upper bound.")
+
+
+def get_mic_positions(cfg) -> list:
+    """Mic positions in m of a mic_array config, grid positions scaled by the spacing."""
+    mic_cfg = cfg['mic_array']
+    spacing = mic_cfg.get('spacing', 1.)
+    return [tuple(float(spacing * x) for x in position) for position in mic_cfg['grid_positions']]
+
+
+def get_angles(config: BeamformerConfig) -> np.ndarray:
+    """(num_beams, 2) azimuth and elevation in degrees, azimuth varying fastest."""
+    azimuths = np.linspace(*config.azimuth_deg, config.num_azimuth)
+    elevations = np.linspace(*config.elevation_deg, config.num_elevation)
+    elevation_grid, azimuth_grid = np.meshgrid(elevations, azimuths, indexing="ij")
+    return np.stack((azimuth_grid.ravel(), elevation_grid.ravel()), axis=-1).astype(np.float32)
+
+
+def get_directions(angles: np.ndarray) -> np.ndarray:
+    """(num_beams, 3) unit vectors of (num_beams, 2) azimuths and elevations in degrees."""
+    azimuth, elevation = np.deg2rad(angles.astype(np.float64)).T
+    return np.stack((np.cos(elevation) * np.cos(azimuth),
+                     np.cos(elevation) * np.sin(azimuth),
+                     np.sin(elevation)), axis=-1)
+
+
+@lru_cache(maxsize=4)
+def get_steering_vectors(positions: tuple, angles: tuple, freqs: tuple, speed_of_sound: float) -> Tensor:
+    """(num_freq, num_beams, num_channels) conjugate steering vectors divided by the number of channels.
+
+    Arguments are tuples so they key the cache, tensors are shared and must not be modified.
+    """
+    # seconds each mic leads the origin for a plane wave from each direction
+    leads = get_directions(np.array(angles)) @ np.array(positions).T / speed_of_sound
+    phases = -2 * np.pi * np.array(freqs)[:, None, None] * leads
+    steering = np.exp(1j * phases) / len(positions)
+    return torch.from_numpy(steering.astype(np.complex64))
+
+
+class DelayAndSum:
+    """Band beam power of STFT frames."""
+
+    def __init__(self, config: BeamformerConfig) -> Self:
+        """Setup grid and band, steering vectors come from the shared cache."""
+        num_freq = config.mfft // 2 + 1
+        self.bin_start = min(int(np.ceil(config.f_bounds[0] * config.mfft / config.sample_rate)), num_freq)
+        self.bin_stop = min(int(np.floor(config.f_bounds[1] * config.mfft / config.sample_rate)) + 1, num_freq)
+        self.bin_step = config.bin_step
+        self.f_axis = np.arange(self.bin_start, self.bin_stop, self.bin_step) * config.sample_rate / config.mfft
+        self.num_channels = len(config.positions)
+        self.angles = get_angles(config)
+        self.steering = get_steering_vectors(
+                tuple(map(tuple, config.positions)),
+                tuple(map(tuple, self.angles.tolist())),
+                tuple(self.f_axis.tolist()),
+                config.speed_of_sound,
+                )
+
+    @classmethod
+    def from_cfg(cls, cfg) -> Self:
+        """Initilize class instance from keywords."""
+        beam_cfg = cfg.get('beamformer') or {}
+        stft_cfg = cfg['stft']
+        config = BeamformerConfig(
+                positions=get_mic_positions(cfg),
+                sample_rate=cfg['gstreamer_src']['sample_rate'],
+                mfft=stft_cfg.get('mfft') or stft_cfg['window_length'],
+                azimuth_deg=tuple(beam_cfg.get('azimuth_deg', (-90., 90.))),
+                elevation_deg=tuple(beam_cfg.get('elevation_deg', (0., 0.))),
+                num_azimuth=beam_cfg.get('num_azimuth', 37),
+                num_elevation=beam_cfg.get('num_elevation', 1),
+                f_bounds=tuple(beam_cfg.get('f_bounds', (500., 4000.))),
+                bin_step=beam_cfg.get('bin_step', 1),
+                speed_of_sound=beam_cfg.get('speed_of_sound', SPEED_OF_SOUND),
+                )
+        return cls(config)
+
+    @property
+    def num_beams(self) -> int:
+        return len(self.angles)
+
+    def forward(self, stft: Tensor) -> Tensor:
+        """(num_times, num_beams) band power of (num_channels, num_freq, num_times) STFT frames."""
+        if stft.shape[0] != self.num_channels:
+            raise ValueError(f"STFT has {stft.shape[0]} channels, the array {self.num_channels} mics.")
+        band = stft[:, self.bin_start:self.bin_stop:self.bin_step, :]
+        beams = torch.einsum("fbc,cft->tfb", self.steering, band)
+        power = beams.real.square_()
+        power += beams.imag.square()
+        return power.sum(dim=1)
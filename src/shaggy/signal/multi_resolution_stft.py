@@ -0,0 +1,135 @@
+"""
+Streaming short time FFTs of several resolutions sharing one sample ring.
+
+Every resolution is a ShortTimeFFT with its own window, stride and FFT length. Pushed samples are
+deinterleaved once into a channel major ring holding the stream from the largest pre padding on, and
+each resolution takes its windows as views of that ring, from its own first_index and at its own stride.
+Memory is the ring of the longest window plus the output buffers, and the cost of each pushed frame
+besides the FFTs does not grow with the number of resolutions.
+
+Windows are those of a ShortTimeFFT pushed the same stream, and flush post pads each resolution as
+ShortTimeFFT.flush does, so every resolution outputs the frames of its own streaming transform.
+"""
+
+from typing import List, Optional
+from typing_extensions import Self
+
+import numpy as np
+import torch
+from torch import Tensor
+
+from shaggy.signal.short_time_fft import ShortTimeFFT, ShortTimeFFTConfig, get_config
+
+CAPACITY_STRIDES = 8
+
+
+def get_resolution_cfgs(cfg) -> list:
+    """Configs of each resolution, the stft section overridden by one multi_resolution_stft.resolutions entry."""
+    resolutions = cfg['multi_resolution_stft']['resolutions']
+    if not resolutions:
+        raise ValueError("Multi resolution STFT needs at least one resolution.")
+    return [{**cfg, 'stft': {**cfg['stft'], **resolution}} for resolution in resolutions]
+
+
+class MultiResolutionSTFT:
+    """Streaming short time FFTs of one stream at several resolutions."""
+
+    def __init__(self, configs: List[ShortTimeFFTConfig]) -> Self:
+        """Setup one short time FFT per resolution, all with the same sample rate."""
+        if len({config.sample_rate for config in configs}) != 1:
+            raise ValueError("Resolutions must share one sample rate.")
+        self.transforms = [ShortTimeFFT(config) for config in configs]
+        self.pre_padding = max(-transform.first_index for transform in self.transforms)
+        self.capacity = max(transform.window_length + CAPACITY_STRIDES * transform.stride_length
+                            for transform in self.transforms) + self.pre_padding
+        self.buffer = None
+        self.reset_stream()
+
+    @classmethod
+    def from_cfg(cls, cfg) -> Self:
+        """Initilize class instance from keywords."""
+        return cls([get_config(resolution_cfg) for resolution_cfg in get_resolution_cfgs(cfg)])
+
+    @property
+    def num_resolutions(self) -> int:
+        return len(self.transforms)
+
+    def push(self, samples: Tensor | np.ndarray) -> List[Optional[Tensor]]:
+        """Streaming short time FFTs, keeps the overlap between calls.
+
+        Args:
+            samples: Next samples of the stream with shape (num_channels, num_samples).
+
+        Returns:
+            stfts: Per resolution (num_channels, num_freq, num_times) frames completed by these samples, from
+                forward_into and overwritten by later calls. None for resolutions with no completed frame.
+        """
+        if isinstance(samples, Tensor):
+            samples = samples.numpy(force=True)
+        num_channels, num_samples = samples.shape
+        if self._num_pushed == 0:
+            self._write_zeros(self.pre_padding, num_channels)
+        self._reserve(num_samples, num_channels)
+        self.buffer[:, self.end - self.origin:self.end - self.origin + num_samples] = samples
+        self.end += num_samples
+        self._num_pushed += num_samples
+        return [self._process(index) for index in range(self.num_resolutions)]
+
+    def flush(self) -> List[Optional[Tensor]]:
+        """Post pad the pushed stream, return each resolution's final frames and reset for a new stream."""
+        if self._num_pushed == 0:
+            return [None] * self.num_resolutions
+        num_windows = [transform.get_num_windows(self._num_pushed) for transform in self.transforms]
+        last_index = max(transform.first_index + (count - 1) * transform.stride_length + transform.window_length
+                         for transform, count in zip(self.transforms, num_windows))
+        self._write_zeros(max(last_index - self.end, 0))
+        stfts = [self._process(index, count) for index, count in enumerate(num_windows)]
+        self.reset_stream()
+        return stfts
+
+    def reset_stream(self) -> None:
+        """Drop any pushed samples, the next push starts a new stream."""
+        # stream index of the first ring column, and of the next window of each resolution
+        self.origin = -self.pre_padding
+        self.end = -self.pre_padding
+        self.next_starts = [transform.first_index for transform in self.transforms]
+        self._num_pushed = 0
+
+    def _process(self, index: int, num_total: int = None) -> Optional[Tensor]:
+        """Frames of a resolution complete in the ring, at most up to window num_total of the stream."""
+        transform = self.transforms[index]
+        start = self.next_starts[index]
+        if self.end - start < transform.window_length:
+            return None
+        num_windows = 1 + (self.end - start - transform.window_length) // transform.stride_length
+        if num_total is not None:
+            num_done = (start - transform.first_index) // transform.stride_length
+            num_windows = min(num_windows, num_total - num_done)
+            if num_windows <= 0:
+                return None
+        num_samples = transform.window_length + (num_windows - 1) * transform.stride_length
+        samples = self.buffer[:, start - self.origin:start - self.origin + num_samples]
+        self.next_starts[index] = start + num_windows * transform.stride_length
+        samples = torch.from_numpy(samples).to(device=transform.scaled_window.device)
+        return transform.forward_into(samples)
+
+    def _write_zeros(self, num_samples: int, num_channels: int = None) -> None:
+        self._reserve(num_samples, num_channels or self.buffer.shape[0])
+        self.buffer[:, self.end - self.origin:self.end - self.origin + num_samples] = 0
+        self.end += num_samples
+
+    def _reserve(self, num_samples: int, num_channels: int) -> None:
+        """Make room for num_samples past the end, dropping samples every resolution has passed."""
+        if self.buffer is None or self.buffer.shape[0] != num_channels:
+            self.buffer = np.zeros((num_channels, self.capacity), dtype=np.float32)
+        if self.end + num_samples - self.origin <= self.buffer.shape[1]:
+            return
+        keep = min(min(self.next_starts), self.end)
+        num_kept = self.end - keep
+        if num_kept + num_samples > self.buffer.shape[1]:
+            buffer = np.zeros((num_channels, num_kept + num_samples + self.capacity), dtype=np.float32)
+            buffer[:, :num_kept] = self.buffer[:, keep - self.origin:self.end - self.origin]
+            self.buffer = buffer
+        else:
+            self.buffer[:, :num_kept] = self.buffer[:, keep - self.origin:self.end - self.origin]
+        self.origin = keep
@@ -0,0 +1,121 @@
+"""
+Channel major sample ring that hands out strided windows without reallocating.
+
+Storage is linear so every window is a plain view, when writes reach the end of storage the unread
+tail is moved to the front. Each incoming interleaved frame costs a single deinterleaving copy.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+CAPACITY_STRIDES = 8
+
+
+class RingBuffer:
+    """Preallocated (num_channels, capacity) float32 sample ring."""
+
+    def __init__(
+        self,
+        window_length: int,
+        stride_length: int,
+        num_channels: Optional[int] = None,
+        capacity: Optional[int] = None,
+        dtype: np.dtype = np.float32,
+    ):
+        """
+        Setup sample ring.
+
+        Args:
+            window_length: Integer number of samples in each window.
+            stride_length: Integer number of samples between each window.
+            num_channels: Number of interleaved channels, allocated on first write if not specified.
+            capacity: Number of samples stored per channel, defaults to a few strides past the window length.
+            dtype: Sample data type.
+        """
+        if stride_length > window_length:
+            raise ValueError("Stride length much be less than or equal to window length.")
+        self.window_length = window_length
+        self.stride_length = stride_length
+        self.capacity = capacity or window_length + CAPACITY_STRIDES * stride_length
+        if self.capacity < window_length:
+            raise ValueError("Ring capacity must be greater than or equal to window length.")
+        self.dtype = np.dtype(dtype)
+        self.buffer = None
+        self.read_index = 0
+        self.write_index = 0
+        if num_channels is not None:
+            self._allocate(num_channels, self.capacity)
+
+    @property
+    def num_channels(self) -> Optional[int]:
+        return None if self.buffer is None else self.buffer.shape[0]
+
+    @property
+    def num_unread(self) -> int:
+        """Number of samples written but not yet passed by a read."""
+        return self.write_index - self.read_index
+
+    def write(self, samples: np.ndarray) -> None:
+        """Deinterleave and copy samples into the ring.
+
+        Args:
+            samples: Interleaved samples with shape (num_samples, num_channels).
+        """
+        num_samples, num_channels = samples.shape
+        self._prepare(num_samples, num_channels)
+        self.buffer[:, self.write_index: self.write_index + num_samples] = samples.T
+        self.write_index += num_samples
+
+    def write_zeros(self, num_samples: int, num_channels: Optional[int] = None) -> None:
+        """Append zero padding to every channel."""
+        self._prepare(num_samples, num_channels or self.num_channels)
+        self.buffer[:, self.write_index: self.write_index + num_samples] = 0
+        self.write_index += num_samples
+
+    def read(self) -> Optional[np.ndarray]:
+        """View of all complete windows and advance past them.
+
+        Returns:
+            samples: (num_channels, window_length + (num_windows - 1) * stride_length) view into the ring,
+                valid until the next write. None if there is not a complete window.
+        """
+        if self.num_unread < self.window_length:
+            return None
+        num_windows = 1 + (self.num_unread - self.window_length) // self.stride_length
+        num_samples = self.window_length + (num_windows - 1) * self.stride_length
+        samples = self.buffer[:, self.read_index: self.read_index + num_samples]
+        self.read_index += num_windows * self.stride_length
+        return samples
+
+    def reset(self) -> None:
+        """Drop all unread samples."""
+        self.read_index = 0
+        self.write_index = 0
+
+    def _prepare(self, num_samples: int, num_channels: Optional[int]) -> None:
+        if num_channels is None:
+            raise ValueError("Number of channels is unknown before the first write.")
+        if num_channels != self.num_channels:
+            self._allocate(num_channels, self.capacity)
+        self._reserve(num_samples)
+
+    def _allocate(self, num_channels: int, capacity: int) -> None:
+        self.buffer = np.zeros((num_channels, capacity), dtype=self.dtype)
+        self.capacity = capacity
+        self.reset()
+
+    def _reserve(self, num_samples: int) -> None:
+        """Make room for num_samples past the write index, moving the unread tail to the front if needed."""
+        if self.write_index + num_samples <= self.capacity:
+            return
+        num_unread = self.num_unread
+        if num_unread + num_samples > self.capacity:
+            buffer = np.zeros((self.num_channels, num_unread + num_samples + self.window_length), dtype=self.dtype)
+            buffer[:, :num_unread] = self.buffer[:, self.read_index: self.write_index]
+            self.buffer = buffer
+            self.capacity = buffer.shape[1]
+        else:
+            self.buffer[:, :num_unread] = self.buffer[:, self.read_index: self.write_index]
+        self.read_index = 0
+        self.write_index = num_unread
@@ -1,9 +1,11 @@
 """
 Short time FFT matches scipy.signal.ShortTimeFFT stride and padding conventions.
 
-Can be run in batch or buffered processing.
+Can be run in batch or buffered processing. Batch processing is forward on a padded timeseries, buffered
+processing pushes samples as they arrive and flushes at the end of the stream, emitting the same frames.
 """
 
+import numpy as np
 import torch
 from pydantic import Field
 from pydantic.dataclasses import dataclass
@@ -11,6 +13,7 @@ from torch import Tensor
 from typing_extensions import Annotated, Literal, Self, Optional
 
 from shaggy.signal import windows
+from shaggy.signal.ring_buffer import RingBuffer
 
 
 @dataclass
@@ -46,6 +49,18 @@ class ShortTimeFFTConfig:
             )
 
 
+def get_config(cfg) -> ShortTimeFFTConfig:
+    """Short time FFT definition of the stft section of a config."""
+    return ShortTimeFFTConfig(
+            window_length=cfg['stft']['window_length'],
+            stride_length=cfg['stft']['stride_length'],
+            sample_rate=cfg['gstreamer_src']['sample_rate'],
+            window_spec=cfg['stft']['window_spec'],
+            mfft=cfg['stft'].get('mfft'),
+            scaling_spec=cfg['stft']['scaling_spec'],
+            )
+
+
 class ShortTimeFFT(torch.nn.Module):
     """A reduced functionality torch port of scipy ShortTimeFFT."""
 
@@ -84,21 +99,16 @@ class ShortTimeFFT(torch.nn.Module):
         else:
             raise ValueError("Scaling type must be psd or magnitude.")
         self.register_buffer("scaling", scaling)
+        self.register_buffer("scaled_window", self.window * scaling)
 
-        self.unprocessed_samples = None
+        self._workspaces = {}
+        self._ring = RingBuffer(self.window_length, self.stride_length)
+        self._num_pushed = 0
 
     @classmethod
     def from_cfg(cls, cfg) -> Self:
         """Initilize class instance from keywords."""
-        stft_cfg = ShortTimeFFTConfig(
-                window_length=cfg['stft']['window_length'],
-                stride_length=cfg['stft']['stride_length'],
-                sample_rate=cfg['gstreamer_src']['sample_rate'],
-                window_spec=cfg['stft']['window_spec'],
-                mfft=cfg['stft'].get('mfft'),
-                scaling_spec=cfg['stft']['scaling_spec'],
-                )
-        return cls(stft_cfg)
+        return cls(get_config(cfg))
 
     def forward(self, timeseries: Tensor) -> Tensor:
         """Bulk data implimentation of a short time FFT.
@@ -112,17 +122,52 @@ class ShortTimeFFT(torch.nn.Module):
                 f"Number of samples ({num_samples}) must be greater than window_length ({self.window_length})"
             )
         x = timeseries.unfold(-1, self.window_length, self.stride_length)
+        x = torch.fft.rfft(x * self.scaled_window, n=self.mfft, dim=-1)
+        return torch.movedim(x, -1, -2)
 
-        if x.shape[-1] < self.mfft:  # zero pad if needed
-            z_shape = list(x.shape)
-            z_shape[-1] = self.mfft - x.shape[-1]
-            x = torch.hstack((x, torch.zeros(z_shape, dtype=x.dtype, device=x.device)))
+    def forward_into(self, timeseries: Tensor) -> Tensor:
+        """Short time FFT computed into reusable buffers, steady state calls allocate no tensors.
+
+        Window and scaling are applied as one precomputed buffer, and the FFT zero pads to mfft itself.
+
+        Args:
+            timeseries: Data with shape (num_channels, num_samples).
 
-        x = x * self.window
-        x = torch.fft.rfft(x, dim=-1)
-        x = torch.movedim(x, 2, 1)
+        Returns:
+            stft: (num_channels, num_freq, num_times) view of a contiguous (num_times, num_freq, num_channels)
+                buffer, which is overwritten by the next call with the same number of windows.
+        """
+        num_samples = timeseries.shape[-1]
+        if num_samples < self.window_length:
+            raise ValueError(
+                f"Number of samples ({num_samples}) must be greater than window_length ({self.window_length})"
+            )
+        frames = timeseries.unfold(-1, self.window_length, self.stride_length)
+        windowed, stft = self._get_workspace(frames)
+        torch.mul(frames, self.scaled_window, out=windowed)
+        torch.fft.rfft(windowed, n=self.mfft, dim=-1, out=stft.permute(2, 0, 1))
+        return stft.permute(2, 1, 0)
 
-        return x * self.scaling
+    def detach_output(self) -> None:
+        """Stop reusing output buffers returned so far, e.g. while they are still queued for a zero copy send."""
+        for workspace in self._workspaces.values():
+            workspace[1] = None
+
+    def _get_workspace(self, frames: Tensor) -> list:
+        """Windowed frame and output buffers for a (num_channels, num_times, window_length) frame view."""
+        num_channels, num_times, _ = frames.shape
+        key = (num_channels, num_times, frames.device, frames.dtype)
+        if key not in self._workspaces:
+            windowed = torch.empty(frames.shape, dtype=frames.dtype, device=frames.device)
+            self._workspaces[key] = [windowed, None]
+        workspace = self._workspaces[key]
+        if workspace[1] is None:
+            workspace[1] = torch.empty(
+                    (num_times, self.mfft // 2 + 1, num_channels),
+                    dtype=frames.dtype.to_complex(),
+                    device=frames.device,
+                    )
+        return workspace
 
     def get_time_axis(self, processed_stft: Tensor) -> Tensor:
         """Time axis of stft."""
@@ -152,24 +197,57 @@ class ShortTimeFFT(torch.nn.Module):
         padded_timeseries = torch.cat([timeseries, torch.zeros(post_pad_shape)], dim=-1)
         return padded_timeseries
 
-    def finalize_buffer(self, stft_result: Tensor) -> Tensor:
-        """Compute final samples in FFT after data stream has closed.
+    def get_num_windows(self, num_samples: int) -> int:
+        """Number of windows of a padded timeseries, as output by push and flush of a whole stream."""
+        last_index, _ = self._post_padding(num_samples)
+        return (last_index - self.first_index - self.window_length) // self.stride_length + 1
+
+    def push(self, samples: Tensor | np.ndarray) -> Optional[Tensor]:
+        """Streaming short time FFT, keeps the overlap between calls.
+
+        The first push is pre padded and flush post pads, so the concatenated output of a stream matches
+        forward on the padded concatenated timeseries.
 
         Args:
-            stft_result: Current short time FFT result.
+            samples: Next samples of the stream with shape (num_channels, num_samples).
+
+        Returns:
+            stft: (num_channels, num_freq, num_times) frames completed by these samples from forward_into,
+                overwritten by later calls. None if no frame was completed.
         """
-        num_windows = stft_result.shape[1]
-        num_padded_samples = self.window_length + (num_windows - 1) * self.stride_length
-        num_samples = num_padded_samples - abs(self.first_index)
-        num_samples += self.unprocessed_samples.shape[-1]
-        num_samples -= abs(self.first_index)
-        num_post_padding, _ = self._post_padding(num_samples)
-        padding_shape = [stft_result.shape[2]] + [num_post_padding - num_samples]
-        padding = torch.zeros(
-            padding_shape, dtype=stft_result.dtype.to_real(), device=stft_result.device
-        )
-        padded_timeseries = torch.cat([self.unprocessed_samples, padding], dim=1)
-        return self(padded_timeseries)
+        if isinstance(samples, Tensor):
+            samples = samples.numpy(force=True)
+        if self._num_pushed == 0:
+            self._ring.write_zeros(abs(self.first_index), samples.shape[0])
+        self._ring.write(samples.T)
+        self._num_pushed += samples.shape[-1]
+        return self._process_ring()
+
+    def flush(self) -> Optional[Tensor]:
+        """Post pad the pushed stream, return its final frames and reset for a new stream.
+
+        Returns:
+            stft: (num_channels, num_freq, num_times) final frames, None if nothing was pushed.
+        """
+        if self._num_pushed == 0:
+            return None
+        last_index, _ = self._post_padding(self._num_pushed)
+        self._ring.write_zeros(last_index - self._num_pushed)
+        stft = self._process_ring()
+        self.reset_stream()
+        return stft
+
+    def reset_stream(self) -> None:
+        """Drop any pushed samples, the next push starts a new stream."""
+        self._ring.reset()
+        self._num_pushed = 0
+
+    def _process_ring(self) -> Optional[Tensor]:
+        samples = self._ring.read()
+        if samples is None:
+            return None
+        samples = torch.from_numpy(samples).to(device=self.scaled_window.device)
+        return self.forward_into(samples)
 
     def _pre_padding(self) -> tuple[int, int]:
         """Smallest signal index and slice index due to padding.
@@ -0,0 +1,121 @@
+"""
+Streaming averages of power spectra.
+
+Welch averaging keeps a preallocated ring of the last num_windows power frames and a running sum, so
+each frame costs O(num_freq * num_channels) regardless of num_windows. Exponential averaging and
+max-hold keep a single accumulator.
+"""
+
+from typing import Optional
+from typing_extensions import Annotated, Literal, Self
+
+import numpy as np
+from pydantic import Field
+from pydantic.dataclasses import dataclass
+
+WELCH = "welch"
+EXPONENTIAL = "exponential"
+MAX_HOLD = "max-hold"
+
+
+@dataclass
+class SpectralAverageConfig:
+    """Definition of a power spectrum average.
+
+    Attributes:
+        num_windows: Number of power frames in each Welch average, or the time constant of the exponential
+            average in frames.
+        window_hop: Number of new power frames between each output.
+        mode: "welch" averages the last num_windows frames, "exponential" weights new frames by
+            1 / num_windows, "max-hold" keeps the maximum of every frame since the last reset.
+    """
+
+    num_windows: Annotated[int, Field(gt=0)] = 1
+    window_hop: Annotated[int, Field(gt=0)] = 1
+    mode: Literal["welch", "exponential", "max-hold"] = WELCH
+
+
+class SpectralAverage:
+    """Average (num_freq, num_channels) power frames as they arrive."""
+
+    def __init__(self, config: SpectralAverageConfig) -> Self:
+        """Setup average, buffers are allocated on the first frame."""
+        self.num_windows = config.num_windows
+        self.window_hop = config.window_hop
+        self.mode = config.mode
+        self.ring = None
+        self.total = None
+        self.average = None
+        self.num_frames = 0
+
+    @classmethod
+    def from_cfg(cls, cfg) -> Self:
+        """Initilize class instance from keywords."""
+        psd_cfg = cfg.get('psd') or {}
+        average_cfg = SpectralAverageConfig(
+                num_windows=psd_cfg.get('num_windows', 1),
+                window_hop=psd_cfg.get('window_hop', 1),
+                mode=psd_cfg.get('mode', WELCH),
+                )
+        return cls(average_cfg)
+
+    def reset(self) -> None:
+        """Forget every frame seen."""
+        self.average = None
+        self.num_frames = 0
+
+    def update(self, power: np.ndarray) -> Optional[np.ndarray]:
+        """Add power frames to the average.
+
+        Args:
+            power: Power frames with shape (num_times, num_freq, num_channels).
+
+        Returns:
+            average: (num_freq, num_channels) float32 average if an output was due during these frames,
+                a buffer that is overwritten by later updates. None otherwise.
+        """
+        is_due = False
+        for frame in power:
+            self._add_frame(frame)
+            is_due |= self._is_due()
+        if not is_due:
+            return None
+        if self.mode == WELCH:
+            np.divide(self.total, self.num_windows, out=self.average, casting="same_kind")
+        return self.average
+
+    def detach_output(self) -> None:
+        """Move the average to a new buffer so the previous output is not overwritten, e.g. while it is in flight."""
+        if self.average is not None:
+            self.average = self.average.copy()
+
+    def _add_frame(self, frame: np.ndarray) -> None:
+        if self.average is None or self.average.shape != frame.shape:
+            self._allocate(frame.shape)
+        if self.mode == WELCH:
+            slot = self.ring[self.num_frames % self.num_windows]
+            if self.num_frames >= self.num_windows:
+                self.total -= slot
+            slot[...] = frame
+            self.total += slot
+        elif self.num_frames == 0:
+            self.average[...] = frame
+        elif self.mode == EXPONENTIAL:
+            alpha = 1 / self.num_windows
+            self.average *= 1 - alpha
+            self.average += alpha * frame
+        else:
+            np.maximum(self.average, frame, out=self.average)
+        self.num_frames += 1
+
+    def _is_due(self) -> bool:
+        num_past = self.num_frames - self.num_windows
+        return num_past >= 0 and num_past % self.window_hop == 0
+
+    def _allocate(self, shape: tuple) -> None:
+        self.average = np.zeros(shape, dtype=np.float32)
+        if self.mode == WELCH:
+            self.ring = np.zeros((self.num_windows,) + shape, dtype=np.float32)
+            # running sum kept in double precision so adding and removing frames does not drift
+            self.total = np.zeros(shape, dtype=np.float64)
+        self.num_frames = 0
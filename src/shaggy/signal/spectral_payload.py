@@ -0,0 +1,165 @@
+"""
+Band, channel and precision reduction of spectral frames before they are published.
+
+Only the bins inside f_bounds and the listed channels are sent. Power can be sent as float16 with
+power = value * scale, or in dB quantized to uint8 or uint16 with value_dB = code * scale + offset.
+Receivers recover float32 power with to_power, the band and channels are known from the same config
+the block was started with.
+"""
+
+from typing import List, Optional, Tuple
+from typing_extensions import Literal, Self
+
+import numpy as np
+from pydantic.dataclasses import dataclass
+
+COMPLEX64 = "complex64"
+FLOAT32 = "float32"
+FLOAT16 = "float16"
+UINT8_DB = "uint8-dB"
+UINT16_DB = "uint16-dB"
+
+ENCODING_DTYPES = {
+    COMPLEX64: np.dtype(np.complex64),
+    FLOAT32: np.dtype(np.float32),
+    FLOAT16: np.dtype(np.float16),
+    UINT8_DB: np.dtype(np.uint8),
+    UINT16_DB: np.dtype(np.uint16),
+}
+DB_ENCODINGS = (UINT8_DB, UINT16_DB)
+# float16 value of the upper dB level, leaves headroom below the float16 maximum of 65504
+FLOAT16_FULL_SCALE = 2. ** 15
+
+
+@dataclass
+class SpectralPayloadConfig:
+    """Definition of a reduced spectral payload.
+
+    Attributes:
+        mfft: Integer number of samples in each FFT.
+        sample_rate: Integer number of data samples per second.
+        num_channels: Number of channels in each spectral frame.
+        f_bounds: Lower and upper frequency in Hz of transmitted bins, every bin if not specified.
+        channels: Indices of transmitted channels, every channel if not specified.
+        encoding: "complex64" sends the complex spectrum, "float32" and "float16" send power,
+            "uint8-dB" and "uint16-dB" send power in dB quantized over db_range.
+        db_range: Lower and upper dB level of quantized encodings, levels outside are clipped. float16
+            power is scaled so the upper level is well inside the float16 range.
+    """
+
+    mfft: int
+    sample_rate: int
+    num_channels: int
+    f_bounds: Optional[Tuple[float, float]] = None
+    channels: Optional[List[int]] = None
+    encoding: Literal["complex64", "float32", "float16", "uint8-dB", "uint16-dB"] = COMPLEX64
+    db_range: Tuple[float, float] = (-140., 0.)
+
+    def __post_init__(self) -> Self:
+        """Parameter checks."""
+        if self.f_bounds is not None and self.f_bounds[0] > self.f_bounds[1]:
+            raise ValueError("Lower frequency bound must be less than or equal to the upper bound.")
+        if self.channels is not None and not all(0 <= c < self.num_channels for c in self.channels):
+            raise ValueError(f"Channels {self.channels} are not all in range of {self.num_channels} channels.")
+        if self.db_range[0] >= self.db_range[1]:
+            raise ValueError("Lower dB level must be less than the upper dB level.")
+
+
+class SpectralPayload:
+    """Select and encode (..., num_freq, num_channels) spectral frames."""
+
+    def __init__(self, config: SpectralPayloadConfig) -> Self:
+        """Setup bin and channel selection and encoding scale."""
+        num_freq = config.mfft // 2 + 1
+        if config.f_bounds is None:
+            self.bin_start, self.bin_stop = 0, num_freq
+        else:
+            self.bin_start = min(int(np.ceil(config.f_bounds[0] * config.mfft / config.sample_rate)), num_freq)
+            self.bin_stop = min(int(np.floor(config.f_bounds[1] * config.mfft / config.sample_rate)) + 1, num_freq)
+        self.f_axis = np.arange(self.bin_start, self.bin_stop) * config.sample_rate / config.mfft
+        self.channels = None if config.channels is None else list(config.channels)
+        self.channel_numbers = self.channels or list(range(config.num_channels))
+        self.num_channels = len(self.channel_numbers)
+
+        self.encoding = config.encoding
+        self.dtype = ENCODING_DTYPES[config.encoding]
+        self.is_db = config.encoding in DB_ENCODINGS
+        if self.is_db:
+            self.max_code = np.iinfo(self.dtype).max
+            self.offset = float(config.db_range[0])
+            self.scale = float(config.db_range[1] - config.db_range[0]) / self.max_code
+            self.power_floor = np.float32(10 ** (config.db_range[0] / 10))
+        elif self.encoding == FLOAT16:
+            self.offset = 0.
+            self.scale = 10 ** (config.db_range[1] / 10) / FLOAT16_FULL_SCALE
+        else:
+            self.offset = 0.
+            self.scale = 1.
+
+    @classmethod
+    def from_cfg(cls, cfg, encoding: str = COMPLEX64) -> Self:
+        """Initilize class instance from keywords, encoding is the default if the stft config has none."""
+        stft_cfg = cfg['stft']
+        f_bounds = stft_cfg.get('f_bounds')
+        channels = stft_cfg.get('channels')
+        payload_cfg = SpectralPayloadConfig(
+                mfft=stft_cfg.get('mfft') or stft_cfg['window_length'],
+                sample_rate=cfg['gstreamer_src']['sample_rate'],
+                num_channels=cfg['gstreamer_src']['channels'],
+                f_bounds=None if f_bounds is None else tuple(f_bounds),
+                channels=None if channels is None else list(channels),
+                encoding=stft_cfg.get('encoding', encoding),
+                db_range=tuple(stft_cfg.get('db_range', (-140., 0.))),
+                )
+        return cls(payload_cfg)
+
+    @property
+    def num_freq(self) -> int:
+        return self.bin_stop - self.bin_start
+
+    def select(self, spectra: np.ndarray) -> np.ndarray:
+        """Transmitted bins and channels of (..., num_freq, num_channels) frames, a view if all channels are kept."""
+        spectra = spectra[..., self.bin_start: self.bin_stop, :]
+        if self.channels is not None:
+            spectra = np.take(spectra, self.channels, axis=-1)
+        return spectra
+
+    def encode(self, spectra: np.ndarray) -> np.ndarray:
+        """Contiguous encoded payload of selected complex spectra or power.
+
+        A contiguous complex64 input is returned as is when the encoding is complex64.
+        """
+        if self.encoding == COMPLEX64:
+            if not np.iscomplexobj(spectra):
+                raise ValueError("Complex encoding needs complex spectra, not power.")
+            return np.ascontiguousarray(spectra, dtype=self.dtype)
+        power = get_power(spectra) if np.iscomplexobj(spectra) else spectra
+        if self.encoding == FLOAT16:
+            return np.minimum(power / self.scale, np.finfo(np.float16).max).astype(self.dtype)
+        if not self.is_db:
+            return np.ascontiguousarray(power, dtype=self.dtype)
+        # levels below the range clip to code 0, flooring first also keeps zero power out of the log
+        codes = 10 * np.log10(np.maximum(power, self.power_floor))
+        codes -= self.offset
+        codes /= self.scale
+        np.rint(codes, out=codes)
+        np.clip(codes, 0, self.max_code, out=codes)
+        return codes.astype(self.dtype)
+
+
+def get_power(spectra: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Float32 |X|^2 of complex spectra."""
+    out = np.square(spectra.real, out=out, dtype=np.float32)
+    out += np.square(spectra.imag)
+    return out
+
+
+def to_power(payload: np.ndarray, scale: float = 1., offset: float = 0., is_db: bool = False) -> np.ndarray:
+    """Float32 power of a received payload in any encoding."""
+    if np.iscomplexobj(payload):
+        return get_power(payload)
+    if is_db:
+        level_dB = payload * np.float32(scale / 10)
+        level_dB += np.float32(offset / 10)
+        return np.power(np.float32(10), level_dB)
+    return payload.astype(np.float32) * np.float32(scale)
@@ -25,7 +25,10 @@ class HeartbeatSrc:
         self._running.set()
         while self._running.is_set():
             payload = self._compose_payload()
-            self.pub_socket.send_string(library.BlockName.HeartbeatSrc.value, zmq.SNDMORE)
+            self.pub_socket.send_string(
+                    library.get_topic(library.BlockName.HeartbeatSrc.value, self.thread_id),
+                    zmq.SNDMORE,
+                    )
             timestamp_ns = time.monotonic_ns()
             self.pub_socket.send_string(f"{timestamp_ns}", zmq.SNDMORE)
             self.pub_socket.send(payload)
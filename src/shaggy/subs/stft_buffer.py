@@ -1,6 +1,7 @@
 """Converts streaming audio data to tensor following kernel and stride length.
 """
 
+from typing import Optional
 from typing_extensions import Annotated, Literal, Self
 
 from pydantic.dataclasses import dataclass
@@ -8,13 +9,15 @@ from pydantic import Field
 import numpy as np
 import torch
 
-from shaggy.proto.samples_pb2 import Samples
+from shaggy.proto import codec
+from shaggy.signal.ring_buffer import RingBuffer
 
 @dataclass
 class STFTBufferConfig:
     """Definition of kernel transform."""
     window_length: Annotated[int, Field(gt=0)]
     stride_length: Annotated[int, Field(gt=0)]
+    num_channels: Optional[Annotated[int, Field(gt=0)]] = None
     device: Literal["cpu", "cuda"] = "cpu"
 
     def __post_init__(self) -> Self:
@@ -30,9 +33,11 @@ class STFTBuffer():
         self.window_length = config.window_length
         self.stride_length = config.stride_length
         self.device = config.device
-        self.buffer = b""
-        self.sample_width = 4
-        self.dtype = np.float32
+        self.ring = RingBuffer(
+                config.window_length,
+                config.stride_length,
+                num_channels=config.num_channels,
+                )
 
     @classmethod
     def from_cfg(cls, cfg) -> Self:
@@ -40,44 +45,28 @@ class STFTBuffer():
         stft_kernel_config = STFTBufferConfig(
                 window_length=cfg['stft']['window_length'],
                 stride_length=cfg['stft']['stride_length'],
+                num_channels=cfg['gstreamer_src']['channels'],
                 )
         return cls(stft_kernel_config)
 
-    def __call__(self, samples_proto: bytes) -> torch.Tensor:
+    def __call__(self, samples_msg: bytes | np.ndarray) -> torch.Tensor:
         """Stride data to create kernels.
         Args:
-            sample_proto: Sample protobuf string.
+            samples_msg: Sample protobuf string, or a (num_samples, num_channels) array from the binary wire format.
 
         Returns:
-            kernels: (num_kernels, ..., window_length).
+            samples: (num_channels, window_length + (num_kernels - 1) * stride_length). On cpu this shares
+                memory with the ring and is only valid until the next call.
         """
-        msg = Samples()
-        msg.ParseFromString(samples_proto)
-
-        num_channels = msg.num_channels_1
-        sample_buffer = msg.samples
-        sample_stride = num_channels * self.sample_width
-        self.buffer += sample_buffer
-        num_samples = len(self.buffer) // sample_stride
+        if not isinstance(samples_msg, np.ndarray):
+            samples_msg = codec.proto_to_samples(samples_msg)
 
-        if num_samples < self.window_length:
+        self.ring.write(samples_msg)
+        samples = self.ring.read()
+        if samples is None:
             return
 
-
-        num_buffers = 1 + (num_samples - self.window_length) // self.stride_length
-        num_excess = (num_samples - self.window_length) % self.stride_length
-        num_short = self.stride_length - num_excess
-
-        num_samples = self.window_length + (num_buffers - 1) * self.stride_length
-        num_remainder = self.window_length - num_short
-        samples = self.buffer[: num_samples * sample_stride]
-        self.buffer = self.buffer[-num_remainder * sample_stride :]
-
-
-        samples = np.frombuffer(samples, dtype=self.dtype)
-        #samples = samples.reshape((num_channels, -1))
-        samples = samples.reshape((-1, num_channels)).T
-        samples = samples.copy()
-        samples = torch.from_numpy(samples).to(device=self.device)
-
+        samples = torch.from_numpy(samples)
+        if self.device != "cpu":
+            samples = samples.to(device=self.device)
         return samples
@@ -0,0 +1,125 @@
+"""Per topic delivery policies and drop accounting.
+
+"latest" keeps queues short and receivers skip to the newest message, for displays where only the current
+value matters. "bounded" queues up to hwm messages per connection and drops beyond that, "lossless" never
+drops and lets queues grow. Publishers number each message of a topic, receivers count gaps in the
+numbers, so losses at any high-water mark along the way are visible.
+"""
+from typing import Optional
+from typing_extensions import Annotated, Literal, Self
+
+from pydantic import Field
+from pydantic.dataclasses import dataclass
+import zmq
+
+from shaggy.transport import library
+
+LATEST = "latest"
+BOUNDED = "bounded"
+LOSSLESS = "lossless"
+
+
+@dataclass
+class DeliveryPolicy:
+    """Delivery of one topic.
+
+    Attributes:
+        policy: "latest", "bounded" or "lossless".
+        hwm: Number of messages queued per connection on each side, ignored when lossless.
+    """
+
+    policy: Literal["latest", "bounded", "lossless"] = BOUNDED
+    hwm: Annotated[int, Field(gt=0)] = 10
+
+    @property
+    def socket_hwm(self) -> int:
+        """ZMQ high-water mark, zero is unlimited."""
+        return 0 if self.policy == LOSSLESS else self.hwm
+
+
+DEFAULT_POLICIES = {
+    library.BlockName.Heartbeat.value: DeliveryPolicy(LATEST, 2),
+    library.BlockName.HeartbeatSrc.value: DeliveryPolicy(LATEST, 2),
+    library.BlockName.GStreamerSrc.value: DeliveryPolicy(LOSSLESS),
+    library.BlockName.ChannelLevels.value: DeliveryPolicy(LATEST, 2),
+    library.BlockName.ShortTimeFFT.value: DeliveryPolicy(BOUNDED, 10),
+    library.BlockName.PowerSpectralDensity.value: DeliveryPolicy(BOUNDED, 10),
+    library.BlockName.Beamformer.value: DeliveryPolicy(BOUNDED, 10),
+    library.BlockName.MultiResolutionSTFT.value: DeliveryPolicy(BOUNDED, 10),
+    # the bridge forwards every topic, drops are left to the policies of the blocks
+    library.BlockName.EdgeBridge.value: DeliveryPolicy(LOSSLESS),
+}
+
+
+def get_delivery_policy(cfg, block_name: str) -> DeliveryPolicy:
+    """Delivery policy of a block's topic, from the delivery section of a config if present."""
+    delivery_cfg = (cfg.get('delivery') if cfg is not None else None) or {}
+    default = DEFAULT_POLICIES.get(block_name, DeliveryPolicy())
+    topic_cfg = delivery_cfg.get(block_name)
+    if topic_cfg is None:
+        return default
+    return DeliveryPolicy(
+            policy=topic_cfg.get('policy', default.policy),
+            hwm=topic_cfg.get('hwm', default.hwm),
+            )
+
+
+def set_send_policy(socket: zmq.Socket, policy: Optional[DeliveryPolicy]) -> None:
+    """Set the send high-water mark, before the socket binds or connects."""
+    if policy is not None:
+        socket.setsockopt(zmq.SNDHWM, policy.socket_hwm)
+
+
+def set_receive_policy(socket: zmq.Socket, policy: Optional[DeliveryPolicy]) -> None:
+    """Set the receive high-water mark, before the socket binds or connects."""
+    if policy is not None:
+        socket.setsockopt(zmq.RCVHWM, policy.socket_hwm)
+
+
+def recv_latest(socket: zmq.Socket, frames: list, copy: bool = True) -> tuple:
+    """Drain every queued message after frames.
+
+    Returns:
+        frames: Newest message.
+        num_skipped: Number of older messages discarded.
+    """
+    num_skipped = 0
+    while True:
+        try:
+            newer = socket.recv_multipart(zmq.NOBLOCK, copy=copy)
+        except zmq.Again:
+            return frames, num_skipped
+        frames = newer
+        num_skipped += 1
+
+
+class DropCounter:
+    """Count messages lost in transport, from gaps in per topic sequence numbers."""
+
+    def __init__(self):
+        self.sequences = {}
+        self.num_dropped = {}
+
+    def update(self, topic: str, sequence: Optional[int], num_skipped: int = 0) -> int:
+        """Record a received sequence number, returns the number of messages dropped before it.
+
+        num_skipped messages discarded by the receiver are only counted when the topic is not numbered,
+        otherwise they are part of the gap.
+        """
+        if sequence is None:
+            return self.add(topic, num_skipped)
+        last = self.sequences.get(topic)
+        self.sequences[topic] = sequence
+        if last is None or sequence <= last:
+            # first message, or the publisher restarted
+            return 0
+        return self.add(topic, sequence - last - 1)
+
+    def add(self, topic: str, num_dropped: int) -> int:
+        if num_dropped > 0:
+            self.num_dropped[topic] = self.num_dropped.get(topic, 0) + num_dropped
+        return num_dropped
+
+    @property
+    def total(self) -> int:
+        return sum(self.num_dropped.values())
@@ -1,19 +1,28 @@
+import logging
+import time
+
 from omegaconf import OmegaConf
 import zmq
 
-from shaggy.transport import library
+from shaggy.transport import delivery, library, trace
 from shaggy.proto.command_pb2 import Command
 from shaggy.blocks.block_hub import BlockHub
 
+logger = logging.getLogger(__name__)
+
+
 class EdgeBridge:
     """ZMQ bridge that runs on the device side and manages block threads."""
 
-    def __init__(self, address, context: zmq.Context = None):
+    def __init__(self, address, context: zmq.Context = None, cfg=None):
         self.address = address
         self.context = context or zmq.Context.instance()
+        self.policy = delivery.get_delivery_policy(cfg, library.BlockName.EdgeBridge.value)
         self.command_socket = self.context.socket(zmq.PAIR)
         self.frontend = self.context.socket(zmq.SUB)
         self.backend = self.context.socket(zmq.PUB)
+        delivery.set_receive_policy(self.frontend, self.policy)
+        delivery.set_send_policy(self.backend, self.policy)
         self.block_hub = BlockHub(address, self.context)
         self._poller = None
 
@@ -21,6 +30,14 @@ class EdgeBridge:
         self.gstreamer_src_id = None
         self.channel_levels_id = None
         self.short_time_fft_id = None
+        self.power_spectral_density_id = None
+        self.beamformer_id = None
+        self.multi_resolution_stft_id = None
+        # stream topic of each running block, and the topics of clients attached to it as aliases
+        self.topics = {}
+        self.topic_aliases = {}
+        # fan outs the frontend is connected to for their metrics
+        self.fan_outs = set()
 
     def run(self):
 
@@ -31,6 +48,8 @@ class EdgeBridge:
         self._poller = zmq.Poller()
         self._poller.register(self.command_socket, zmq.POLLIN)
         self._poller.register(self.frontend, zmq.POLLIN)
+        # metrics snapshots of every block
+        self.frontend.setsockopt_string(zmq.SUBSCRIBE, library.get_topic_prefix(library.BlockName.Metrics.value))
 
         command = Command()
         command.command = 'startup'
@@ -40,44 +59,125 @@ class EdgeBridge:
         while True:
             socks = dict(self._poller.poll())
             if socks.get(self.frontend) == zmq.POLLIN:
-                topic, timestamp, msg = self.frontend.recv_multipart()
-                self.backend.send_multipart((topic, timestamp, msg))
+                frames = self.frontend.recv_multipart(copy=False)
+                if len(frames) > 3:
+                    frames = trace.forward(frames, library.BlockName.EdgeBridge.value, "", time.monotonic_ns())
+                self.backend.send_multipart(frames, copy=False)
+                # sub-topics of a shared block follow its aliases
+                topic, separator, sub_topic = frames[0].bytes.partition(library.SUB_TOPIC_SEPARATOR.encode())
+                for alias in self.topic_aliases.get(topic, ()):
+                    self.backend.send_multipart([alias + separator + sub_topic, *frames[1:]], copy=False)
             if socks.get(self.command_socket) == zmq.POLLIN:
                 timestamp, message = self.command_socket.recv_multipart()
                 command = Command()
                 command.ParseFromString(message)
                 if command.command == 'startup':
                     self.startup(command)
+                elif command.command == 'shutdown' and command.block_name:
+                    self.release(command)
                 else:
                     self.block_hub.passthrough(command)
 
-            for pair_socket in self.block_hub.command_pairs.values():
+            for pair_socket in list(self.block_hub.command_pairs.values()):
                 if socks.get(pair_socket) == zmq.POLLIN:
                     timestamp, message = pair_socket.recv_multipart()
                     command = Command()
                     command.ParseFromString(message)
                     if command.command == 'shutdown':
-                        self.block_hub.shutdown(command)
+                        self.shutdown(command)
 
     def startup(self, command):
-        block_socket = library.get_block_socket(command.block_name, command.thread_id)
         cfg = OmegaConf.create(command.config)
+        mode = library.get_execution_mode(cfg, command.block_name)
+
+        try:
+            if command.block_name == library.BlockName.Heartbeat.value:
+                thread_name = self.block_hub.start_heartbeat("")
+                self.heartbeat_id = thread_name
+            elif command.block_name == library.BlockName.GStreamerSrc.value:
+                thread_name = self.block_hub.start_gstreamer_src(cfg, command.thread_id, mode)
+                self.gstreamer_src_id = thread_name
+            elif command.block_name == library.BlockName.ChannelLevels.value:
+                thread_name = self.block_hub.start_channel_levels(self.gstreamer_src_id, cfg, command.thread_id, mode)
+                self.channel_levels_id = thread_name
+            elif command.block_name == library.BlockName.ShortTimeFFT.value:
+                thread_name = self.block_hub.start_short_time_fft(self.gstreamer_src_id, cfg, command.thread_id, mode)
+                self.short_time_fft_id = thread_name
+            elif command.block_name == library.BlockName.PowerSpectralDensity.value:
+                thread_name = self.block_hub.start_power_spectral_density(
+                        self.gstreamer_src_id, cfg, command.thread_id, mode)
+                self.power_spectral_density_id = thread_name
+            elif command.block_name == library.BlockName.Beamformer.value:
+                thread_name = self.block_hub.start_beamformer(self.gstreamer_src_id, cfg, command.thread_id, mode)
+                self.beamformer_id = thread_name
+            elif command.block_name == library.BlockName.MultiResolutionSTFT.value:
+                thread_name = self.block_hub.start_multi_resolution_stft(
+                        self.gstreamer_src_id, cfg, command.thread_id, mode)
+                self.multi_resolution_stft_id = thread_name
+        except ValueError as error:
+            # a thread name already running with another config, the running block is left as it is
+            logger.warning("Rejected startup of %s: %s", command.block_name, error)
+            return
+
+        for fan_out_name in self.block_hub.fan_outs.keys() - self.fan_outs:
+            self.fan_outs.add(fan_out_name)
+            self.frontend.connect(self.block_hub.get_block_address(fan_out_name))
 
-        if command.block_name == library.BlockName.Heartbeat.value:
-            thread_name = self.block_hub.start_heartbeat("")
-            self.heartbeat_id = thread_name
-        elif command.block_name == library.BlockName.GStreamerSrc.value:
-            thread_name = self.block_hub.start_gstreamer_src(cfg, command.thread_id)
-            self.gstreamer_src_id = thread_name
-        elif command.block_name == library.BlockName.ChannelLevels.value:
-            thread_name = self.block_hub.start_channel_levels(self.gstreamer_src_id, cfg, command.thread_id)
-            self.channel_levels_id = thread_name
-        elif command.block_name == library.BlockName.ShortTimeFFT.value:
-            thread_name = self.block_hub.start_short_time_fft(self.gstreamer_src_id, cfg, command.thread_id)
-            self.short_time_fft_id = thread_name
+        topic = library.get_topic(command.block_name, command.thread_id)
+        if thread_name in self.topics:
+            # attached to a running block, its stream is also sent under this client's topic
+            running_topic = self.topics[thread_name]
+            if topic != running_topic:
+                self.topic_aliases.setdefault(running_topic.encode(), []).append(topic.encode())
+            return
+        self.topics[thread_name] = topic
 
         pair_socket = self.block_hub.command_pairs[thread_name]
         self._poller.register(pair_socket, zmq.POLLIN)
 
-        self.frontend.connect(block_socket)
-        self.frontend.setsockopt_string(zmq.SUBSCRIBE, command.block_name)
+        # queued per block connection as the block's topic is
+        delivery.set_receive_policy(self.frontend, delivery.get_delivery_policy(cfg, command.block_name))
+        self.frontend.connect(self.block_hub.get_block_address(thread_name))
+        self.frontend.setsockopt_string(zmq.SUBSCRIBE, topic)
+
+    def release(self, command):
+        """Drop a client's use of a block, which shuts down once no client uses it."""
+        thread_name = self.block_hub.get_running_name(
+                library.get_thread_name(command.block_name, command.thread_id))
+        running_topic = self.topics.get(thread_name, "").encode()
+        aliases = self.topic_aliases.get(running_topic, [])
+        topic = library.get_topic(command.block_name, command.thread_id).encode()
+        if topic in aliases:
+            aliases.remove(topic)
+
+        # unshared blocks and the last use of a shared one shut down
+        if self.block_hub.ref_counts.get(thread_name, 1) <= 1:
+            self._stop_forwarding(thread_name)
+        self.block_hub.release(command)
+
+    def shutdown(self, command):
+        """Shut down a block, or every block but the heartbeat for a command without block name.
+
+        Topics are forgotten along with the blocks, so blocks started again under the same thread names,
+        e.g. by a client reconnecting after missed heartbeats, are forwarded again.
+        """
+        thread_name = library.get_thread_name(command.block_name, command.thread_id)
+        if thread_name:
+            self._stop_forwarding(thread_name)
+        else:
+            for running_name in [name for name in self.topics if name != self.heartbeat_id]:
+                self._stop_forwarding(running_name)
+            for fan_out_name in self.fan_outs:
+                self.frontend.disconnect(self.block_hub.get_block_address(fan_out_name))
+            self.fan_outs = set()
+        self.block_hub.shutdown(command)
+
+    def _stop_forwarding(self, thread_name):
+        """Unsubscribe from and disconnect a block, before the block hub shuts it down and forgets it."""
+        topic = self.topics.pop(thread_name, None)
+        if topic is None:
+            return
+        self.topic_aliases.pop(topic.encode(), None)
+        self.frontend.setsockopt_string(zmq.UNSUBSCRIBE, topic)
+        self.frontend.disconnect(self.block_hub.get_block_address(thread_name))
+        self._poller.unregister(self.block_hub.command_pairs[thread_name])
@@ -4,26 +4,35 @@ from shaggy.transport import library
 from shaggy.workers.worker_hub import WorkerHub
 
 class HostBridge:
-    """ZMQ bridge that runs on the host side and manages the command socket."""
+    """ZMQ bridge that runs on the host side and manages the command socket.
+
+    The bridge owns the only connection to the edge and republishes it inproc to every worker. Worker
+    subscriptions are forwarded to the edge, so each stream crosses the network once and only while
+    some worker is subscribed to it.
+    """
 
     def __init__(self, address, context: zmq.Context = None):
         self.address = address
         self.context = context or zmq.Context.instance()
 
-        self.frontend = self.context.socket(zmq.SUB)
+        self.frontend = self.context.socket(zmq.XSUB)
+        self.backend = self.context.socket(zmq.XPUB)
         self.worker_hub = WorkerHub(self.address, self.context)
         self.worker_hub.start()
 
     def run(self):
         self.frontend.connect(library.get_bridge_connection(self.address))
-        for topic in library.TRANSPORT_TOPICS.keys():
-            self.frontend.setsockopt_string(zmq.SUBSCRIBE, topic)
+        self.backend.bind(library.HOST_BACKEND_ADDRESS)
         self._poller = zmq.Poller()
         self._poller.register(self.frontend, zmq.POLLIN)
+        self._poller.register(self.backend, zmq.POLLIN)
         self.is_running = True
 
         while True:
             socks = dict(self._poller.poll())
             if socks.get(self.frontend) == zmq.POLLIN:
-                topic, timestamp, message = self.frontend.recv_multipart()
-                self.worker_hub.handle_transport_message(topic, timestamp, message)
+                frames = self.frontend.recv_multipart(copy=False)
+                self.backend.send_multipart(frames, copy=False)
+            if socks.get(self.backend) == zmq.POLLIN:
+                # subscribe and unsubscribe messages from workers
+                self.frontend.send(self.backend.recv())
@@ -4,11 +4,14 @@ from typing import Optional
 from shaggy.proto.command_pb2 import Command
 from shaggy.proto.channel_levels_pb2 import ChannelLevels
 from shaggy.proto.stft_pb2 import STFT
+from shaggy.proto.psd_pb2 import PSD
+from shaggy.proto.detections_pb2 import Detections
 
 EXTERNAL_HOST = "10.0.0.15"
 EXTERNAL_EDGE = "10.0.0.10"
 LOCAL_HOST = "127.0.0.1"
 FRONTEND_ADDRESS = 'inproc://bridge'
+HOST_BACKEND_ADDRESS = 'inproc://host-bridge'
 
 
 class BlockName(str, Enum):
@@ -17,12 +20,34 @@ class BlockName(str, Enum):
     GStreamerSrc = "gstreamer-src"
     ChannelLevels = "channel-levels"
     ShortTimeFFT = "short-time-fft"
+    PowerSpectralDensity = "power-spectral-density"
+    FanOut = "fan-out"
+    EdgeBridge = "edge-bridge"
+    Metrics = "metrics"
+    Beamformer = "beamformer"
+    MultiResolutionSTFT = "multi-resolution-stft"
 
 
+class ExecutionMode(str, Enum):
+    Thread = "thread"
+    Process = "process"
+    # run in a thread shared by every fan out consumer of the same source, see blocks.fan_out
+    FanOut = "fan-out"
+
+
+IPC_DIRECTORY = "/tmp"
+# topic frames are block name, separator, thread id so receivers can route on the frame alone
+TOPIC_SEPARATOR = "/"
+# blocks publishing several streams publish each under its own thread id, e.g. 00003.1
+SUB_TOPIC_SEPARATOR = "."
+
 TRANSPORT_TOPICS = {
         BlockName.Heartbeat.value: Command,
         BlockName.ChannelLevels.value: ChannelLevels,
         BlockName.ShortTimeFFT.value: STFT,
+        BlockName.PowerSpectralDensity.value: PSD,
+        BlockName.Beamformer.value: Detections,
+        BlockName.MultiResolutionSTFT.value: STFT,
 }
 
 def get_address_from_cfg(cfg):
@@ -38,11 +63,24 @@ def get_address(address_type):
         raise ValueError(f"address specification {address} not reckognized.")
     return address
 
-def get_control_socket(thread_id):
+def get_execution_mode(cfg, block_name):
+    execution_cfg = cfg.get('execution') or {}
+    mode = execution_cfg.get(block_name, ExecutionMode.Thread.value)
+    if mode not in (ExecutionMode.Thread.value, ExecutionMode.Process.value, ExecutionMode.FanOut.value):
+        raise ValueError(f"execution mode {mode} not reckognized.")
+    return mode
+
+def get_local_address(name, mode=ExecutionMode.Thread.value):
+    """Inproc address for blocks run as threads, ipc address for blocks run as processes."""
+    if mode == ExecutionMode.Process.value:
+        return f"ipc://{IPC_DIRECTORY}/shaggy-{name}"
+    return f"inproc://{name}"
+
+def get_control_socket(thread_id, mode=ExecutionMode.Thread.value):
     if thread_id == "":
-        return f"inproc://control-{BlockName.Heartbeat.value}"
+        return get_local_address(f"control-{BlockName.Heartbeat.value}", mode)
     else:
-        return f"inproc://control-{thread_id}"
+        return get_local_address(f"control-{thread_id}", mode)
 
 def get_thread_name(block_name: Optional[str], thread_id: Optional[str]):
     if block_name is not None:
@@ -55,9 +93,38 @@ def get_thread_name(block_name: Optional[str], thread_id: Optional[str]):
     return thread_name
 
 
-def get_block_socket(block_name, thread_id):
+def get_topic(block_name: str, thread_id: Optional[str]):
+    """Topic frame of one block thread's stream, e.g. short-time-fft/00003."""
+    return f"{block_name}{TOPIC_SEPARATOR}{thread_id or ''}"
+
+def get_sub_thread_id(thread_id: str, index: int):
+    """Thread id of one stream of a block publishing several, its topic extends the block's topic."""
+    return f"{thread_id}{SUB_TOPIC_SEPARATOR}{index}"
+
+def get_topic_prefix(block_name: str):
+    """Subscription prefix matching every thread of a block, and no other block."""
+    return f"{block_name}{TOPIC_SEPARATOR}"
+
+def split_topic(topic: str):
+    """Block name and thread id of a topic frame."""
+    block_name, _, thread_id = topic.partition(TOPIC_SEPARATOR)
+    return block_name, thread_id
+
+
+def get_block_socket(block_name, thread_id, mode=ExecutionMode.Thread.value):
+    thread_name = get_thread_name(block_name, thread_id)
+    return get_local_address(thread_name, mode)
+
+def get_block_sockets(block_name, thread_id, mode=ExecutionMode.Thread.value):
+    """Publish addresses of a block, threads also bind ipc so blocks in other processes can subscribe."""
+    addresses = [get_block_socket(block_name, thread_id, ExecutionMode.Process.value)]
+    if mode != ExecutionMode.Process.value:
+        addresses.insert(0, get_block_socket(block_name, thread_id, mode))
+    return addresses
+
+def get_sample_ring_name(block_name, thread_id):
     thread_name = get_thread_name(block_name, thread_id)
-    return f"inproc://{thread_name}"
+    return f"shaggy-{thread_name}"
 
 def get_bridge_connection(address):
     return f"tcp://{address}:8100"
@@ -0,0 +1,156 @@
+"""Single writer, many reader sample ring in shared memory.
+
+The writer copies each interleaved frame into the ring and advances a sequence counter of samples
+written, only a small reference to the new frame is published over 0MQ. Readers in any process
+attach by name and wrap the referenced samples without copying. A reference is valid while the
+writer has not wrapped past it, readers check this before and after using a view to detect overrun.
+"""
+
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+import numpy as np
+
+MAGIC = 0x53484752  # "SHGR"
+# magic, number of channels, capacity, margin, samples written, frames written
+NUM_CONTROL = 6
+MAGIC_IDX, CHANNELS_IDX, CAPACITY_IDX, MARGIN_IDX, SEQUENCE_IDX, FRAMES_IDX = range(NUM_CONTROL)
+CONTROL_BYTES = NUM_CONTROL * np.dtype(np.int64).itemsize
+
+# rings created by this process, readers in other processes must not let the tracker unlink them
+_OWNED_NAMES = set()
+
+
+class SampleRingOverrun(RuntimeError):
+    """Samples were overwritten before a reader used them."""
+
+
+class SampleRing:
+    """Shared memory layout, a control block followed by (capacity + margin, num_channels) samples.
+
+    The first margin samples are mirrored after the end of the ring, so any span up to margin samples
+    long is a contiguous view.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.control = np.ndarray((NUM_CONTROL,), dtype=np.int64, buffer=shm.buf)
+        if self.control[MAGIC_IDX] != MAGIC:
+            raise ValueError(f"Shared memory {shm.name} is not a sample ring.")
+        self.num_channels = int(self.control[CHANNELS_IDX])
+        self.capacity = int(self.control[CAPACITY_IDX])
+        self.margin = int(self.control[MARGIN_IDX])
+        self.samples = np.ndarray(
+                (self.capacity + self.margin, self.num_channels),
+                dtype=np.float32,
+                buffer=shm.buf,
+                offset=CONTROL_BYTES,
+                )
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def sequence(self) -> int:
+        """Total number of samples written."""
+        return int(self.control[SEQUENCE_IDX])
+
+    def is_valid(self, start: int) -> bool:
+        """Check that samples from start onward have not been overwritten."""
+        return self.sequence - start <= self.capacity
+
+    def close(self) -> None:
+        self.control = None
+        self.samples = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            _OWNED_NAMES.discard(self.shm.name)
+
+
+class SampleRingWriter(SampleRing):
+    """Owner of a shared sample ring."""
+
+    @classmethod
+    def create(cls, name: str, num_channels: int, capacity: int, margin: int):
+        """Allocate a new ring, replacing a stale one left with the same name."""
+        num_bytes = CONTROL_BYTES + (capacity + margin) * num_channels * np.dtype(np.float32).itemsize
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=num_bytes)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=num_bytes)
+        control = np.ndarray((NUM_CONTROL,), dtype=np.int64, buffer=shm.buf)
+        control[:] = 0
+        control[CHANNELS_IDX] = num_channels
+        control[CAPACITY_IDX] = capacity
+        control[MARGIN_IDX] = margin
+        control[MAGIC_IDX] = MAGIC
+        del control
+        _OWNED_NAMES.add(name)
+        return cls(shm, owner=True)
+
+    def write(self, samples: np.ndarray) -> int:
+        """Copy interleaved (num_samples, num_channels) samples into the ring.
+
+        Returns:
+            start: Sequence number of the first sample written.
+        """
+        num_samples = samples.shape[0]
+        if num_samples > self.capacity:
+            raise ValueError(f"Frame of {num_samples} samples does not fit in ring of {self.capacity}.")
+        start = self.sequence
+        position = start % self.capacity
+        num_first = min(num_samples, self.capacity - position)
+        self.samples[position: position + num_first] = samples[:num_first]
+        if num_first < num_samples:
+            self.samples[: num_samples - num_first] = samples[num_first:]
+        self._mirror(position, num_samples)
+        # publish only after the samples are in place
+        self.control[SEQUENCE_IDX] = start + num_samples
+        self.control[FRAMES_IDX] += 1
+        return start
+
+    def _mirror(self, position: int, num_samples: int) -> None:
+        """Copy any samples written to the head of the ring into the margin past its end."""
+        end = position + num_samples
+        for begin, stop in ((position, end), (position - self.capacity, end - self.capacity)):
+            begin, stop = max(begin, 0), min(stop, self.margin)
+            if begin < stop:
+                self.samples[self.capacity + begin: self.capacity + stop] = self.samples[begin: stop]
+
+
+class SampleRingReader(SampleRing):
+    """Read only attachment to a shared sample ring."""
+
+    @classmethod
+    def attach(cls, name: str):
+        shm = shared_memory.SharedMemory(name=name)
+        if name not in _OWNED_NAMES:
+            # the writer owns the segment, stop the tracker from unlinking it when this process exits
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    def read(self, start: int, num_samples: int) -> Optional[np.ndarray]:
+        """Interleaved (num_samples, num_channels) samples starting at a sequence number.
+
+        Spans up to margin samples are views into shared memory, longer wrapped spans are copied.
+
+        Raises:
+            SampleRingOverrun: The samples have already been overwritten.
+        """
+        if not self.is_valid(start):
+            raise SampleRingOverrun(f"Samples from {start} overwritten, ring is at {self.sequence}.")
+        position = start % self.capacity
+        if position + num_samples <= self.capacity + self.margin:
+            samples = self.samples[position: position + num_samples]
+        else:
+            num_first = self.capacity - position
+            samples = np.concatenate((self.samples[position:self.capacity], self.samples[: num_samples - num_first]))
+        samples = samples.view()
+        samples.flags.writeable = False
+        return samples
@@ -0,0 +1,167 @@
+"""Per hop latency tracing of streaming topics.
+
+With tracing enabled in the transport config, sources send a fourth frame after [topic, stamp, payload]
+holding the monotonic capture time of the source frame. Every block appends the time it received the
+frame, started and ended its computation and published its output, and the edge bridge appends its
+forwarding, so the trace of an output shows where its latency was spent. A block that combines several
+source frames, e.g. an STFT window, carries the trace of the most recent one.
+
+Entries are monotonic times of the device running the pipeline, the host only reads them.
+"""
+import struct
+import threading
+import time
+
+import numpy as np
+
+from shaggy.proto import wire
+from shaggy.transport import library
+
+RECEIVE = 0
+COMPUTE_START = 1
+COMPUTE_END = 2
+PUBLISH = 3
+EVENT_NAMES = ("receive", "compute-start", "compute-end", "publish")
+
+CAPTURE = struct.Struct("<Q")
+# topic id of the block, event, thread id, monotonic ns
+ENTRY = struct.Struct("<HB8sQ")
+
+# histogram bins per decade from 1 us to 100 s, percentiles are exact to about 12 %
+BINS_PER_DECADE = 20
+MIN_LATENCY_NS = 1_000
+NUM_DECADES = 8
+
+
+def is_enabled(cfg) -> bool:
+    """Check if a block config requests trace frames."""
+    return bool((cfg.get('transport') or {}).get('trace', False))
+
+
+class Trace:
+    """Capture time of a source frame and the hops it has been through."""
+
+    def __init__(self, capture_ns: int = None, entries: list = None):
+        self.capture_ns = time.monotonic_ns() if capture_ns is None else capture_ns
+        # (block name, thread id, event, monotonic ns)
+        self.entries = entries or []
+
+    @classmethod
+    def unpack(cls, frame) -> "Trace":
+        frame = wire._to_bytes(frame)
+        capture_ns, = CAPTURE.unpack_from(frame)
+        entries = []
+        for topic_id, event, thread_id, timestamp_ns in ENTRY.iter_unpack(frame[CAPTURE.size:]):
+            entries.append((wire.TOPIC_NAMES[topic_id], thread_id.rstrip(b"\0").decode(), event, timestamp_ns))
+        return cls(capture_ns, entries)
+
+    def pack(self) -> bytes:
+        return CAPTURE.pack(self.capture_ns) + b"".join(
+                ENTRY.pack(wire.TOPIC_IDS[block_name], event, thread_id.encode(), timestamp_ns)
+                for block_name, thread_id, event, timestamp_ns in self.entries
+                )
+
+    def copy(self) -> "Trace":
+        return Trace(self.capture_ns, list(self.entries))
+
+    def add(self, block_name: str, thread_id: str, event: int, timestamp_ns: int = None) -> "Trace":
+        """Append an entry, timestamped now if not given."""
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        self.entries.append((block_name, thread_id or "", event, timestamp_ns))
+        return self
+
+
+def get_trace(frames: list) -> Trace | None:
+    """Trace frame of a received message, None if it was sent without."""
+    if len(frames) < 4:
+        return None
+    return Trace.unpack(frames[3])
+
+
+def forward(frames: list, block_name: str, thread_id: str, receive_ns: int) -> list:
+    """Append receive and publish entries to the trace frame of a message passed through unchanged."""
+    trace = get_trace(frames)
+    if trace is None:
+        return frames
+    trace.add(block_name, thread_id, RECEIVE, receive_ns)
+    trace.add(block_name, thread_id, PUBLISH)
+    return [*frames[:3], trace.pack()]
+
+
+class LatencyHistogram:
+    """Log binned latency counts with an exact maximum."""
+
+    def __init__(self):
+        self.counts = np.zeros(NUM_DECADES * BINS_PER_DECADE + 2, dtype=np.int64)
+        self.max_ns = 0
+
+    def add(self, latency_ns: int) -> None:
+        if latency_ns < MIN_LATENCY_NS:
+            idx = 0
+        else:
+            idx = min(int(np.log10(latency_ns / MIN_LATENCY_NS) * BINS_PER_DECADE) + 1, len(self.counts) - 1)
+        self.counts[idx] += 1
+        self.max_ns = max(self.max_ns, latency_ns)
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def percentile(self, q: float) -> float:
+        """Upper edge in ns of the bin holding the q-th percentile, at most the maximum."""
+        count = self.count
+        if count == 0:
+            return 0.
+        idx = int(np.searchsorted(np.cumsum(self.counts), q / 100 * count))
+        upper_ns = MIN_LATENCY_NS * 10 ** (idx / BINS_PER_DECADE)
+        return min(upper_ns, float(self.max_ns))
+
+
+class TraceCollector:
+    """Latency histograms of each hop of received traces, safe to share between workers.
+
+    A hop is keyed by block and event, e.g. "short-time-fft compute-end" is the time between the
+    STFT starting and ending its computation. "short-time-fft total" is the time from capture to the last
+    entry of traces output by the STFT, whatever forwarded them afterwards.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace) -> None:
+        with self._lock:
+            previous_ns = trace.capture_ns
+            output_name = None
+            for block_name, _, event, timestamp_ns in trace.entries:
+                self._add(f"{block_name} {EVENT_NAMES[event]}", timestamp_ns - previous_ns)
+                previous_ns = timestamp_ns
+                if block_name != library.BlockName.EdgeBridge.value:
+                    output_name = block_name
+            self._add(f"{output_name} total", previous_ns - trace.capture_ns)
+
+    def _add(self, hop: str, latency_ns: int) -> None:
+        if hop not in self.histograms:
+            self.histograms[hop] = LatencyHistogram()
+        self.histograms[hop].add(latency_ns)
+
+    def summary(self) -> dict:
+        """Count and p50, p99 and max latency in ms of each hop."""
+        with self._lock:
+            return {
+                hop: {
+                    'count': histogram.count,
+                    'p50_ms': histogram.percentile(50) / 1e6,
+                    'p99_ms': histogram.percentile(99) / 1e6,
+                    'max_ms': histogram.max_ns / 1e6,
+                }
+                for hop, histogram in self.histograms.items()
+            }
+
+    def format(self) -> str:
+        """Text table of the summary."""
+        lines = [f"{'hop':<40}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for hop, stats in self.summary().items():
+            lines.append(f"{hop:<40}{stats['count']:>8}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+                         f"{stats['max_ms']:>10.3f}")
+        return "\n".join(lines)
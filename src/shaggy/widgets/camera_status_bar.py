@@ -1,4 +1,5 @@
-from PySide6.QtWidgets import QStatusBar, QPushButton
+from PySide6.QtCore import Slot
+from PySide6.QtWidgets import QLabel, QStatusBar, QPushButton
 
 from shaggy.widgets.heartbeat_status import HeartbeatStatus
 
@@ -13,11 +14,22 @@ class CameraStatusBar(QStatusBar):
         self.record_button = QPushButton("Record")
         self.record_button.setCheckable(True)
         self.record_button.setEnabled(False)
+        self.drops_label = QLabel("Dropped 0")
 
+        self.addPermanentWidget(self.drops_label)
         self.addPermanentWidget(self.heartbeat_status)
         self.addPermanentWidget(self.record_button)
 
         self.record_button.clicked.connect(self._switch_record_text)
+        host_bridge.worker_hub.drops.connect(self._set_drops)
+
+    @Slot(dict)
+    def _set_drops(self, num_dropped: dict):
+        """Show the messages lost by each worker that lost any."""
+        counts = ", ".join(f"{thread_name} {count}" for thread_name, count in sorted(num_dropped.items()) if count)
+        self.drops_label.setText(f"Dropped {counts or 0}")
+        self.drops_label.setToolTip(
+                "\n".join(f"{thread_name}: {count}" for thread_name, count in sorted(num_dropped.items())))
 
     def _switch_record_text(self, checked: bool):
         self.record_button.setText("Stop" if checked else "Record")
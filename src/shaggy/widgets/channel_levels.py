@@ -6,6 +6,7 @@ from PySide6.QtWidgets import QLabel, QHBoxLayout, QVBoxLayout, QWidget
 
 from omegaconf import OmegaConf
 
+from shaggy.proto import wire
 from shaggy.proto.command_pb2 import Command
 from shaggy.proto.channel_levels_pb2 import ChannelLevels
 from shaggy.transport import library
@@ -101,8 +102,11 @@ class AcousticChannels(QWidget):
 
     @Slot(bytes, bytes, bytes)
     def set_channel_levels(self, topic, timestamp, msg):
-        command = ChannelLevels()
-        command.ParseFromString(msg)
-        levels = np.frombuffer(command.levels, dtype=np.float32)
+        if wire.is_header(timestamp):
+            levels = wire.to_array(wire.unpack_header(timestamp), msg)
+        else:
+            command = ChannelLevels()
+            command.ParseFromString(msg)
+            levels = np.frombuffer(command.levels, dtype=np.float32)
         for i, l in enumerate(levels):
             self.meter_packages[i].meter.setLevel(float(l))
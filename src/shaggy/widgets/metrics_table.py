@@ -0,0 +1,22 @@
+from PySide6.QtCore import Slot
+from PySide6.QtGui import QFontDatabase
+from PySide6.QtWidgets import QPlainTextEdit
+
+from shaggy.workers.metrics import Metrics
+
+
+class MetricsTable(QPlainTextEdit):
+    """Table of the latest metrics snapshot of every edge block."""
+
+    def __init__(self, host_bridge, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+
+        self.metrics = Metrics(host_bridge)
+        self.metrics.snapshot.connect(self._update_table)
+
+    @Slot(object)
+    def _update_table(self, snapshot):
+        self.setPlainText(self.metrics.format())
@@ -3,6 +3,8 @@ from PySide6.QtCore import Slot
 from PySide6.QtWidgets import QHBoxLayout, QWidget
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from shaggy.signal.spectral_payload import SpectralPayload
+from shaggy.transport import library
 from shaggy.workers.power_spectral_density import PowerSpectralDensity
 
 
@@ -12,6 +14,7 @@ class PowerSpectralDensityWidget(QWidget):
         cfg,
         host_bridge,
         thread_id: str,
+        block_name: str = library.BlockName.ShortTimeFFT.value,
         num_windows: int = 10,
         window_hop: int = 1,
     ):
@@ -20,12 +23,14 @@ class PowerSpectralDensityWidget(QWidget):
         self.host_bridge = host_bridge
         self.thread_id = thread_id
         self.sample_rate = cfg["gstreamer_src"]["sample_rate"]
-        self.num_channels = self.cfg["gstreamer_src"]["channels"]
         self.channel_idx = None
 
-        num_freq = cfg["stft"]["window_length"] // 2 + 1
-        f_axis = np.arange(num_freq) / cfg["stft"]["window_length"]
-        self.f_axis = f_axis * self.sample_rate
+        # transmitted bins and channels, which may be a subset of the STFT
+        spectral_payload = SpectralPayload.from_cfg(cfg)
+        self.num_channels = spectral_payload.num_channels
+        self.f_axis = spectral_payload.f_axis
+        # DC is not shown on a log axis
+        self.f_idx = self.f_axis > 0
 
         self.figure = Figure()
         self.canvas = FigureCanvas(self.figure)
@@ -43,6 +48,7 @@ class PowerSpectralDensityWidget(QWidget):
             window_hop=window_hop,
             host_bridge=host_bridge,
             thread_id=self.thread_id,
+            block_name=block_name,
         )
         self.worker.psd_ready.connect(self.update_psd)
 
@@ -61,9 +67,9 @@ class PowerSpectralDensityWidget(QWidget):
 
         if self.line is None:
             self.axes.cla()
-            self.line, = self.axes.semilogx(self.f_axis[1:], psd_dB[1:])
-            self.axes.set_xlim(10.0, self.f_axis[-1])
+            self.line, = self.axes.semilogx(self.f_axis[self.f_idx], psd_dB[self.f_idx])
+            self.axes.set_xlim(max(10.0, self.f_axis[self.f_idx][0]), self.f_axis[-1])
             self.axes.set_ylim(-110.0, -50.)
         else:
-            self.line.set_ydata(psd_dB[1:])
+            self.line.set_ydata(psd_dB[self.f_idx])
         self.canvas.draw_idle()
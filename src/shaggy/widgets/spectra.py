@@ -10,6 +10,8 @@ from PySide6.QtWidgets import (
 
 from shaggy.widgets.power_spectral_density import PowerSpectralDensityWidget
 from shaggy.widgets.spectrogram import SpectrogramWidget
+from shaggy.signal.spectral_payload import SpectralPayload
+from shaggy.transport import library
 
 
 class SpectraWidget(QWidget):
@@ -18,6 +20,7 @@ class SpectraWidget(QWidget):
         cfg,
         host_bridge,
         thread_id: str,
+        block_name: str = library.BlockName.ShortTimeFFT.value,
         num_windows: int = 1,
         window_hop: int = 1,
     ):
@@ -25,7 +28,7 @@ class SpectraWidget(QWidget):
         self.cfg = cfg
         self.host_bridge = host_bridge
         self.thread_id = thread_id
-        self.num_channels = cfg["gstreamer_src"]["channels"]
+        self.channel_numbers = SpectralPayload.from_cfg(cfg).channel_numbers
 
         layout = QHBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
@@ -35,6 +38,7 @@ class SpectraWidget(QWidget):
             cfg,
             host_bridge,
             thread_id,
+            block_name=block_name,
             num_windows=num_windows,
             window_hop=window_hop,
         )
@@ -42,6 +46,7 @@ class SpectraWidget(QWidget):
             cfg,
             host_bridge,
             thread_id,
+            block_name=block_name,
             num_windows=num_windows,
             window_hop=window_hop,
         )
@@ -56,8 +61,8 @@ class SpectraWidget(QWidget):
         avg_button.setChecked(True)
         self.channel_buttons.addButton(avg_button, -1)
         channel_layout.addWidget(avg_button)
-        for idx in range(self.num_channels):
-            button = QRadioButton(f"Channel {idx+1}")
+        for idx, channel in enumerate(self.channel_numbers):
+            button = QRadioButton(f"Channel {channel+1}")
             self.channel_buttons.addButton(button, idx)
             channel_layout.addWidget(button)
         channel_layout.addStretch(1)
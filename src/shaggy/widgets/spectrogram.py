@@ -2,28 +2,219 @@ from math import ceil
 from copy import copy
 
 import numpy as np
+from PySide6 import QtCore, QtGui
 from PySide6.QtCore import Slot
 from PySide6.QtWidgets import QVBoxLayout, QWidget
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
 
+from shaggy.recording.pyramid import MEAN, SpectrogramPyramid
+from shaggy.signal.spectral_payload import SpectralPayload
+from shaggy.transport import library
 from shaggy.workers.power_spectral_density import PowerSpectralDensity
 
 CMAP = copy(plt.cm.magma_r)
 CMAP.set_under('w')
+# number of colormap levels, lookup table index 0 is the under color
+NUM_COLORS = 256
+# narrowest recorded span shown, in STFT windows
+MIN_BROWSE_WINDOWS = 4
+
+
+def get_color_table(cmap, num_colors: int = NUM_COLORS) -> np.ndarray:
+    """QImage RGB32 lookup table, the under color followed by num_colors colormap levels."""
+    rgba = np.vstack((cmap.get_under(), cmap(np.linspace(0., 1., num_colors))))
+    rgb = np.round(rgba[:, :3] * 255).astype(np.uint32)
+    return (0xFF << 24) | (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+
+
+class SpectrogramHistory:
+    """Circular history of spectrogram columns in dB, with a colormapped image of one channel.
+
+    Levels are kept for every channel and for the channel average, (num_channels + 1, num_freq, num_columns).
+    Each new column is converted to dB and colormapped once, older columns are never touched again unless
+    the displayed channel or color range changes. The column about to be overwritten is the oldest, the
+    image is drawn in two pieces split there instead of being shifted.
+    """
+
+    def __init__(self, num_columns: int, num_freq: int, num_channels: int, vmin: float, vmax: float, cmap=CMAP):
+        self.num_columns = num_columns
+        self.num_freq = num_freq
+        self.num_channels = num_channels
+        self.vmin = vmin
+        self.vmax = vmax
+        self.color_table = get_color_table(cmap)
+        self.levels_dB = np.full((num_channels + 1, num_freq, num_columns), -np.inf, dtype=np.float32)
+        # rows ordered from the highest frequency down, as an image is drawn
+        self.pixels = np.empty((num_freq, num_columns), dtype=np.uint32)
+        self.image = QtGui.QImage(self.pixels.data, num_columns, num_freq, 4 * num_columns,
+                                  QtGui.QImage.Format.Format_RGB32)
+        self.column = 0
+        self.channel_idx = None
+        self._color_columns(slice(None))
+
+    @property
+    def display_idx(self) -> int:
+        return self.num_channels if self.channel_idx is None else self.channel_idx
+
+    def add_column(self, psd: np.ndarray) -> None:
+        """Append one (num_freq, num_channels) power column, overwriting the oldest."""
+        levels_dB = self.levels_dB[:, :, self.column]
+        np.log10(psd.T + 1e-11, out=levels_dB[:self.num_channels])
+        np.log10(psd.mean(axis=-1) + 1e-11, out=levels_dB[self.num_channels])
+        levels_dB *= 10
+        self._color_columns(self.column)
+        self.column = (self.column + 1) % self.num_columns
+
+    def load_columns(self, power: np.ndarray) -> None:
+        """Replace the displayed channel with (num_columns, num_freq) power columns, oldest first."""
+        levels_dB = self.levels_dB[self.display_idx]
+        np.log10(power.T + 1e-11, out=levels_dB)
+        levels_dB *= 10
+        self.column = 0
+        self._color_columns(slice(None))
+
+    def clear(self) -> None:
+        """Forget every column."""
+        self.levels_dB.fill(-np.inf)
+        self.column = 0
+        self._color_columns(slice(None))
+
+    def set_channel_idx(self, channel_idx: int | None) -> None:
+        """Display one channel, or the channel average if None."""
+        self.channel_idx = channel_idx
+        self._color_columns(slice(None))
+
+    def set_levels(self, vmin: float, vmax: float) -> None:
+        self.vmin = vmin
+        self.vmax = vmax
+        self._color_columns(slice(None))
+
+    def _color_columns(self, columns) -> None:
+        levels_dB = self.levels_dB[self.display_idx, :, columns]
+        codes = (levels_dB - self.vmin) * (NUM_COLORS / (self.vmax - self.vmin))
+        np.floor(codes, out=codes)
+        # levels below vmin, including empty columns, map to the under color at index 0
+        codes = np.clip(codes + 1, 0, NUM_COLORS, out=codes).astype(np.intp)
+        self.pixels[::-1, columns] = self.color_table[codes]
 
 
 class SpectrogramWidget(QWidget):
+    """Scrolling spectrogram of PSD frames."""
+
+    class SpectrogramView(QWidget):
+        """Draw the history image with frequency, time and level labels.
+
+        While a recording is shown, time_range is its (start_s, stop_s) and the wheel zooms around the
+        cursor and dragging pans, requesting new ranges with range_requested.
+        """
+
+        range_requested = QtCore.Signal(float, float)
+
+        def __init__(self, history: SpectrogramHistory, f_range: tuple, time_span_s: float):
+            super().__init__()
+            self.history = history
+            self.f_range = f_range
+            self.time_span_s = time_span_s
+            self.time_range = None
+            self.drag_x = None
+            self.margins = QtCore.QMargins(60, 10, 70, 30)
+            self.colorbar_width = 15
+            colorbar = np.arange(NUM_COLORS, 0, -1).reshape(-1, 1)
+            self.colorbar = self.history.color_table[colorbar].astype(np.uint32)
+            self.colorbar_image = QtGui.QImage(self.colorbar.data, 1, NUM_COLORS, 4, QtGui.QImage.Format.Format_RGB32)
+            self.setMinimumSize(200, 150)
+
+        def paintEvent(self, event):
+            """Refresh display."""
+            painter = QtGui.QPainter(self)
+            painter.fillRect(self.rect(), QtGui.QColor("white"))
+            plot = self.rect().marginsRemoved(self.margins)
+            plot.setRight(plot.right() - self.colorbar_width)
+            if plot.width() <= 0 or plot.height() <= 0:
+                return
+
+            # oldest columns to the left of the newest, without moving the image
+            history = self.history
+            num_old = history.num_columns - history.column
+            split = plot.left() + plot.width() * num_old / history.num_columns
+            painter.drawImage(
+                QtCore.QRectF(plot.left(), plot.top(), split - plot.left(), plot.height()),
+                history.image,
+                QtCore.QRectF(history.column, 0, num_old, history.num_freq),
+            )
+            painter.drawImage(
+                QtCore.QRectF(split, plot.top(), plot.right() + 1 - split, plot.height()),
+                history.image,
+                QtCore.QRectF(0, 0, history.column, history.num_freq),
+            )
+
+            bar = QtCore.QRect(plot.right() + 10, plot.top(), self.colorbar_width, plot.height())
+            painter.drawImage(bar, self.colorbar_image)
+
+            painter.setPen(QtGui.QColor("black"))
+            painter.drawRect(plot)
+            metrics = painter.fontMetrics()
+            for fraction in np.linspace(0., 1., 5):
+                y = plot.bottom() - fraction * plot.height()
+                f_label = f"{self.f_range[0] + fraction * (self.f_range[1] - self.f_range[0]):.0f}"
+                painter.drawText(QtCore.QPointF(plot.left() - 5 - metrics.horizontalAdvance(f_label),
+                                                y + metrics.ascent() / 2), f_label)
+                level_label = f"{history.vmin + fraction * (history.vmax - history.vmin):.0f}"
+                painter.drawText(QtCore.QPointF(bar.right() + 5, y + metrics.ascent() / 2), level_label)
+            for fraction in np.linspace(0., 1., 7):
+                x = plot.left() + fraction * plot.width()
+                if self.time_range is None:
+                    t_label = f"{(fraction - 1) * self.time_span_s:.0f}"
+                else:
+                    start_s, stop_s = self.time_range
+                    t_label = f"{start_s + fraction * (stop_s - start_s):.{2 if stop_s - start_s < 10 else 0}f}"
+                painter.drawText(QtCore.QPointF(x - metrics.horizontalAdvance(t_label) / 2,
+                                                plot.bottom() + metrics.height() + 2), t_label)
+            painter.drawText(QtCore.QPointF(plot.center().x() - metrics.horizontalAdvance("Time (s)") / 2,
+                                            self.height() - 2), "Time (s)")
+            painter.save()
+            painter.translate(metrics.height(), plot.center().y() + metrics.horizontalAdvance("Frequency (Hz)") / 2)
+            painter.rotate(-90)
+            painter.drawText(0, 0, "Frequency (Hz)")
+            painter.restore()
+
+        def _plot_fraction(self, x: float) -> float:
+            plot = self.rect().marginsRemoved(self.margins)
+            return (x - plot.left()) / max(plot.width() - self.colorbar_width, 1)
+
+        def wheelEvent(self, event):
+            if self.time_range is None:
+                return
+            start_s, stop_s = self.time_range
+            factor = 0.5 if event.angleDelta().y() > 0 else 2.
+            cursor_s = start_s + self._plot_fraction(event.position().x()) * (stop_s - start_s)
+            self.range_requested.emit(cursor_s - (cursor_s - start_s) * factor,
+                                      cursor_s + (stop_s - cursor_s) * factor)
+
+        def mousePressEvent(self, event):
+            self.drag_x = event.position().x()
+
+        def mouseMoveEvent(self, event):
+            if self.time_range is None or self.drag_x is None:
+                return
+            start_s, stop_s = self.time_range
+            x = event.position().x()
+            shift_s = (self._plot_fraction(self.drag_x) - self._plot_fraction(x)) * (stop_s - start_s)
+            self.drag_x = x
+            self.range_requested.emit(start_s + shift_s, stop_s + shift_s)
+
+        def mouseReleaseEvent(self, event):
+            self.drag_x = None
+
     def __init__(
         self,
         cfg,
         host_bridge,
         thread_id: str,
+        block_name: str = library.BlockName.ShortTimeFFT.value,
         num_windows: int = 1,
         window_hop: int = 1,
         time_span_s: float = 60.,
-        num_blocks: int = 6,
     ):
         super().__init__()
         self.cfg = cfg
@@ -32,100 +223,97 @@ class SpectrogramWidget(QWidget):
         self.num_windows = num_windows
         self.window_hop = window_hop
         self.time_span_s = time_span_s
-        self.num_blocks = num_blocks
-        self.channel_idx = None
         self.f_bounds = (0, 1000)
 
         self.sample_rate = cfg["gstreamer_src"]["sample_rate"]
-        self.num_channels = cfg["gstreamer_src"]["channels"]
-        num_freq = cfg["stft"]["window_length"] // 2 + 1
-        f_axis = np.arange(num_freq) / cfg["stft"]["window_length"]
-        self.f_axis = (f_axis * self.sample_rate)
+        # transmitted bins and channels, which may be a subset of the STFT
+        spectral_payload = SpectralPayload.from_cfg(cfg)
+        self.num_channels = spectral_payload.num_channels
+        self.f_axis = spectral_payload.f_axis
         self.f_idx = (self.f_axis > self.f_bounds[0]) & (self.f_axis < self.f_bounds[1])
         self.time_step_s = cfg["stft"]["stride_length"] * self.window_hop / self.sample_rate
 
-        self.figure = Figure()
-        self.canvas = FigureCanvas(self.figure)
-        self.axes = self.figure.add_subplot(1, 1, 1)
-        self.axes.set_xlabel("Time (s)")
-        self.axes.set_ylabel("Frequency (Hz)")
-        self.image = None
-        self.buffer = None
+        num_columns = ceil(self.time_span_s / self.time_step_s)
+        self.history = SpectrogramHistory(
+            num_columns,
+            int(self.f_idx.sum()),
+            self.num_channels,
+            vmin=-100.0,
+            vmax=-50.0,
+        )
+        f_display = self.f_axis[self.f_idx]
+        self.view = self.SpectrogramView(self.history, (f_display[0], f_display[-1]), num_columns * self.time_step_s)
 
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
-        layout.addWidget(self.canvas)
+        layout.addWidget(self.view)
 
         self.worker = PowerSpectralDensity(
             num_windows=num_windows,
             window_hop=window_hop,
             host_bridge=host_bridge,
             thread_id=self.thread_id,
+            block_name=block_name,
         )
         self.worker.psd_ready.connect(self.update_spectrogram)
+        self.pyramid = None
+        self.pyramid_f_idx = None
+        self.pyramid_stat = MEAN
+        self.view.range_requested.connect(self.set_time_range)
 
-        self.block_size = ceil(self.time_span_s / (self.time_step_s * self.num_blocks))
-        self.block_shape = (self.block_size, self.f_axis.size, self.num_channels)
-        self.sample_history = []
-        for i in range(self.num_blocks):
-            block = np.full(self.block_shape, 1e-11, dtype=np.float32)
-            self.sample_history.append(block)
-
-        self.t_axis = np.arange(self.block_size * self.num_blocks, dtype=np.float32)
-        self.t_axis *= self.time_step_s
-        self.block_idx = 0
-        self.sample_idx = 0
-        self.image = self.axes.pcolormesh(
-            self.t_axis,
-            self.f_axis[self.f_idx],
-            self._get_spectrogram()[self.f_idx],
-            vmin=-100.0,
-            vmax=-50.0,
-            shading="auto",
-            cmap=CMAP,
-        )
-        self.figure.colorbar(self.image)
-        self.num_skip = 5
-        self.skip_idx = 0
-
-    def _add_slice(self, psd) -> None:
-        if self.sample_idx >= self.block_size:
-            if self.block_idx < self.num_blocks - 1:
-                self.block_idx += 1
-                self.sample_idx = 0
-            else:
-                self.sample_history = self.sample_history[1:]
-                block = np.full(self.block_shape, 1e-11, dtype=np.float32)
-                self.sample_history.append(block)
-                self.sample_idx = 0
-
-        current_block = self.sample_history[self.block_idx]
-        current_block[self.sample_idx] = psd
-        self.sample_idx += 1
-
-    def _get_spectrogram(self) -> np.array:
-        spectrogram = np.array(self.sample_history)
-        spectrogram = np.reshape(spectrogram, (-1, self.f_axis.size, self.num_channels))
-        if self.channel_idx is None:
-            spectrogram = np.mean(spectrogram, axis=-1)
-        else:
-            spectrogram = spectrogram[:, :, self.channel_idx]
-        return spectrogram.T
-            
     def set_channel_idx(self, channel_idx: int | None) -> None:
-        self.channel_idx = channel_idx
+        self.history.set_channel_idx(channel_idx)
+        if self.pyramid is not None:
+            self._load_recording()
+        self.view.update()
 
-    @Slot(object)
-    def update_spectrogram(self, psd) -> None:
-        self._add_slice(psd)
-        self.skip_idx += 1
-        if self.skip_idx < self.num_skip:
+    def show_recording(self, pyramid: SpectrogramPyramid, start_s: float = 0., stop_s: float = None,
+                       stat: str = MEAN) -> None:
+        """Browse a recorded spectrogram instead of the live one, live columns are dropped meanwhile.
+
+        The recording must have the frequency bins of the live view between its frequency bounds.
+        """
+        f_idx = (pyramid.f_axis > self.f_bounds[0]) & (pyramid.f_axis < self.f_bounds[1])
+        if f_idx.sum() != self.history.num_freq:
+            raise ValueError(f"Recording has {f_idx.sum()} bins in {self.f_bounds} Hz, the live view "
+                             f"{self.history.num_freq}.")
+        if pyramid.num_channels != self.num_channels:
+            raise ValueError(f"Recording has {pyramid.num_channels} channels, the live view {self.num_channels}.")
+        self.pyramid = pyramid
+        self.pyramid_f_idx = f_idx
+        self.pyramid_stat = stat
+        self.set_time_range(start_s, pyramid.duration_s if stop_s is None else stop_s)
+
+    def show_live(self) -> None:
+        """Return to the live spectrogram, starting from an empty history."""
+        self.pyramid = None
+        self.view.time_range = None
+        self.history.clear()
+        self.view.update()
+
+    @Slot(float, float)
+    def set_time_range(self, start_s: float, stop_s: float) -> None:
+        """Show start_s to stop_s of the recording, kept to at least a few STFT windows."""
+        if self.pyramid is None:
             return
-        self.skip_idx = 0
-        spectrogram = self._get_spectrogram()
+        min_span_s = MIN_BROWSE_WINDOWS * self.pyramid.window_s
+        if stop_s - start_s < min_span_s:
+            centre_s = (start_s + stop_s) / 2
+            start_s, stop_s = centre_s - min_span_s / 2, centre_s + min_span_s / 2
+        self.view.time_range = (start_s, stop_s)
+        self._load_recording()
+        self.view.update()
 
-        spectrogram_dB = 10 * np.log10(spectrogram + 1e-11)
-        spectrogram_dB = spectrogram_dB[self.f_idx]
-        self.image.set_array(spectrogram_dB.ravel())
+    def _load_recording(self) -> None:
+        start_s, stop_s = self.view.time_range
+        power = self.pyramid.get_columns(start_s, stop_s, self.history.num_columns, self.history.channel_idx,
+                                         self.pyramid_stat)
+        self.history.load_columns(power[:, self.pyramid_f_idx])
 
-        self.canvas.draw_idle()
+    @Slot(object)
+    def update_spectrogram(self, psd) -> None:
+        if self.pyramid is not None:
+            return
+        self.history.add_column(psd[self.f_idx])
+        # repaints are coalesced by Qt, so bursts of columns cost one draw
+        self.view.update()
@@ -0,0 +1,46 @@
+from PySide6.QtCore import QObject, Signal, Slot
+
+from shaggy.blocks.metrics import format_table
+from shaggy.proto.command_pb2 import Command
+from shaggy.proto.metrics_pb2 import BlockMetrics
+from shaggy.transport import library
+from shaggy.transport.host_bridge import HostBridge
+
+
+class Metrics(QObject):
+    """Collect metrics snapshots of every edge block, and request them with stats commands."""
+
+    snapshot = Signal(object)
+
+    def __init__(self, host_bridge: HostBridge):
+        super().__init__()
+        self.host_bridge = host_bridge
+        self.snapshots = {}
+        self.previous = {}
+
+        command = Command()
+        command.command = 'startup'
+        command.block_name = library.BlockName.Metrics.value
+        self.host_bridge.worker_hub.add_worker(command)
+        self.worker = self.host_bridge.worker_hub.get_worker(library.BlockName.Metrics.value, None)
+        self.worker.content_msg.connect(self.parse_metrics)
+
+    @Slot(bytes, bytes, bytes)
+    def parse_metrics(self, topic, timestamp, msg):
+        metrics = BlockMetrics()
+        metrics.ParseFromString(msg)
+        thread_name = library.get_thread_name(metrics.block_name, metrics.thread_id)
+        if thread_name in self.snapshots:
+            self.previous[thread_name] = self.snapshots[thread_name]
+        self.snapshots[thread_name] = metrics
+        self.snapshot.emit(metrics)
+
+    def request_stats(self, block_name: str, thread_id: str) -> None:
+        command = Command()
+        command.command = 'stats'
+        command.block_name = block_name
+        command.thread_id = thread_id
+        self.host_bridge.worker_hub.send_command(command)
+
+    def format(self) -> str:
+        return format_table(self.snapshots, self.previous)
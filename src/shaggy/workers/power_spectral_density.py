@@ -1,13 +1,20 @@
 import numpy as np
 from PySide6.QtCore import QObject, Signal, Slot
 
-from shaggy.proto import stft_pb2
+from shaggy.proto import psd_pb2, stft_pb2, wire
+from shaggy.signal import spectral_payload
+from shaggy.signal.spectral_average import SpectralAverage, SpectralAverageConfig, WELCH
 from shaggy.transport import library
 from shaggy.transport.host_bridge import HostBridge
 
 
 class PowerSpectralDensity(QObject):
-    """Listen for STFT messages and emit PSD data (stubbed)."""
+    """Listen for STFT or edge PSD messages and emit PSD data.
+
+    STFT power is averaged in a preallocated ring, so each message costs O(new frames) whatever
+    num_windows is. With block_name set to the power spectral density block, averaging is done on
+    the edge and received PSD frames are passed straight through.
+    """
 
     psd_ready = Signal(object)
 
@@ -16,38 +23,79 @@ class PowerSpectralDensity(QObject):
                  window_hop: int,
                  host_bridge: HostBridge,
                  thread_id: str,
+                 block_name: str = library.BlockName.ShortTimeFFT.value,
+                 mode: str = WELCH,
                  ):
         super().__init__()
         self.num_windows = num_windows
         self.window_hop = window_hop
+        self.spectral_average = SpectralAverage(
+            SpectralAverageConfig(num_windows=num_windows, window_hop=window_hop, mode=mode)
+        )
         self.host_bridge = host_bridge
         self.thread_id = thread_id
+        self.block_name = block_name
         self.worker = self.host_bridge.worker_hub.get_worker(
-            library.BlockName.ShortTimeFFT.value,
+            self.block_name,
             self.thread_id,
         )
-        self.worker.content_msg.connect(self._handle_stft)
-        self.stft_windows = []
+        if self.block_name == library.BlockName.PowerSpectralDensity.value:
+            self.worker.content_msg.connect(self._handle_psd)
+        else:
+            self.worker.content_msg.connect(self._handle_stft)
 
     @Slot(bytes, bytes, bytes)
-    def _handle_stft(self, topic, timestamp, msg) -> None:
-        stft_msg = stft_pb2.STFT()
-        stft_msg.ParseFromString(msg)
+    def _handle_psd(self, topic, timestamp, msg) -> None:
+        if wire.is_header(timestamp):
+            header = wire.unpack_header(timestamp)
+            psd = wire.to_array(header, msg)
+            psd = spectral_payload.to_power(psd, header.scale, header.offset, header.flags & wire.FLAG_DECIBEL)
+        else:
+            psd_msg = psd_pb2.PSD()
+            psd_msg.ParseFromString(msg)
+            psd = np.frombuffer(psd_msg.psd, dtype=_get_dtype(psd_msg, spectral_payload.FLOAT32))
+            psd = psd.reshape((psd_msg.num_freq_0, psd_msg.num_channels_1))
+            psd = spectral_payload.to_power(psd, *_get_quantization(psd_msg))
+        self.psd_ready.emit(psd)
 
-        num_times = stft_msg.num_times_0
-        num_freq = stft_msg.num_fft // 2 + 1
+    @Slot(bytes, bytes, bytes)
+    def _handle_stft(self, topic, timestamp, msg) -> None:
+        if wire.is_header(timestamp):
+            header = wire.unpack_header(timestamp)
+            stft_samples = wire.to_array(header, msg)
+            power = spectral_payload.to_power(
+                    stft_samples, header.scale, header.offset, header.flags & wire.FLAG_DECIBEL)
+        else:
+            stft_msg = stft_pb2.STFT()
+            stft_msg.ParseFromString(msg)
 
-        stft_flat = np.frombuffer(stft_msg.stft_samples, dtype=np.complex64)
-        stft_samples = stft_flat.reshape((num_times, num_freq, stft_msg.num_channel_2))
-        self.stft_windows += list(stft_samples)
+            num_times = stft_msg.num_times_0
+            if stft_msg.HasField('num_freq_1'):
+                num_freq = stft_msg.num_freq_1
+            else:
+                num_freq = stft_msg.num_fft // 2 + 1
 
-        while len(self.stft_windows) > self.num_windows + self.window_hop:
-            self.stft_windows = self.stft_windows[self.window_hop:]
+            stft_flat = np.frombuffer(stft_msg.stft_samples, dtype=_get_dtype(stft_msg, spectral_payload.COMPLEX64))
+            stft_samples = stft_flat.reshape((num_times, num_freq, stft_msg.num_channel_2))
+            power = spectral_payload.to_power(stft_samples, *_get_quantization(stft_msg))
 
-        if len(self.stft_windows) < self.num_windows:
+        psd = self.spectral_average.update(power)
+        if psd is None:
             return
+        # the average buffer is reused by the next update
+        self.psd_ready.emit(psd.copy())
 
-        stft_ensamble = np.array(self.stft_windows[:self.num_windows])
-        psd = np.mean(abs(stft_ensamble) ** 2, axis=0)
 
-        self.psd_ready.emit(psd)
+def _get_dtype(msg, encoding: str) -> np.dtype:
+    """Payload dtype of an STFT or PSD message, encoding is the default for messages without one."""
+    if msg.HasField('encoding'):
+        encoding = msg.encoding
+    return spectral_payload.ENCODING_DTYPES[encoding]
+
+
+def _get_quantization(msg) -> tuple:
+    """Scale, offset and decibel flag of an STFT or PSD message."""
+    is_db = msg.HasField('encoding') and msg.encoding in spectral_payload.DB_ENCODINGS
+    scale = msg.scale if msg.HasField('scale') else 1.
+    offset = msg.offset if msg.HasField('offset') else 0.
+    return scale, offset, is_db
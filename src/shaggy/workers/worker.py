@@ -3,13 +3,16 @@ import zmq
 
 from omegaconf import Container
 
-from shaggy.transport import library
+from shaggy.proto import wire
+from shaggy.transport import delivery, library, trace
 
 
 class Worker(QObject):
     """Proxy shared between host bridge and qt widgets."""
 
     content_msg = Signal(bytes, bytes, bytes)
+    # thread name and total number of messages lost so far
+    drops = Signal(str, int)
 
     def __init__(
         self,
@@ -18,6 +21,8 @@ class Worker(QObject):
         transport_topic: str,
         address: str,
         context: zmq.Context = None,
+        delivery_policy: delivery.DeliveryPolicy = None,
+        trace_collector: trace.TraceCollector = None,
     ):
         super().__init__()
         self.block_name = block_name
@@ -25,15 +30,19 @@ class Worker(QObject):
         self.transport_topic = transport_topic
         self.address = address
         self.context = context or zmq.Context.instance()
+        self.delivery_policy = delivery_policy or delivery.get_delivery_policy(None, block_name)
+        self.drop_counter = delivery.DropCounter()
+        self.trace_collector = trace_collector
 
         self.frontend = self.context.socket(zmq.SUB)
-        thread_name = library.get_thread_name(self.block_name, self.thread_id)
-        self.poller_control_address = f"inproc://poller-control-{thread_name}"
+        self.thread_name = library.get_thread_name(self.block_name, self.thread_id)
+        self.poller_control_address = f"inproc://poller-control-{self.thread_name}"
         self.poller_control_socket = self.context.socket(zmq.PAIR)
         self.poller_control_socket.bind(self.poller_control_address)
 
     def run(self, cfg: Container = None):
-        self.frontend.connect(library.get_bridge_connection(self.address))
+        delivery.set_receive_policy(self.frontend, self.delivery_policy)
+        self.frontend.connect(library.HOST_BACKEND_ADDRESS)
         self.frontend.setsockopt_string(zmq.SUBSCRIBE, self.transport_topic)
         local_control_socket = self.context.socket(zmq.PAIR)
         local_control_socket.connect(self.poller_control_address)
@@ -47,7 +56,21 @@ class Worker(QObject):
             if socks.get(local_control_socket) == zmq.POLLIN:
                 break
             if socks.get(self.frontend) == zmq.POLLIN:
-                self.content_msg.emit(*self.frontend.recv_multipart())
+                frames = self._recv()
+                if len(frames) > 3 and self.trace_collector is not None:
+                    self.trace_collector.add(trace.Trace.unpack(frames[3]))
+                self.content_msg.emit(*frames[:3])
+
+    def _recv(self) -> list:
+        """Receive the next message, or the newest for latest only topics, and report drops."""
+        frames = self.frontend.recv_multipart()
+        num_skipped = 0
+        if self.delivery_policy.policy == delivery.LATEST:
+            frames, num_skipped = delivery.recv_latest(self.frontend, frames)
+        # sub-topics of a block publishing several streams are numbered separately
+        if self.drop_counter.update(frames[0].decode(), wire.get_sequence(frames[1]), num_skipped):
+            self.drops.emit(self.thread_name, self.drop_counter.total)
+        return frames
 
     @Slot()
     def shutdown(self):
@@ -1,15 +1,19 @@
 from typing import Optional
 import time
 
-from PySide6.QtCore import QObject, QThread, Slot
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+from omegaconf import OmegaConf
 import zmq
 
 from shaggy.proto.command_pb2 import Command
-from shaggy.transport import library
+from shaggy.transport import delivery, library, trace
 from shaggy.workers.worker import Worker
 
 class WorkerHub(QObject):
 
+    # number of messages lost by each worker, keyed by thread name
+    drops = Signal(dict)
+
     def __init__(self, address: str, context: zmq.Context = None):
         super().__init__()
         self.address = address
@@ -18,6 +22,9 @@ class WorkerHub(QObject):
         self.command_socket = None
         self.workers = {}
         self.worker_threads = {}
+        self.num_dropped = {}
+        # latency of traced messages received by any worker
+        self.trace_collector = trace.TraceCollector()
 
     @Slot()
     def start(self) -> None:
@@ -33,12 +40,17 @@ class WorkerHub(QObject):
 
     @Slot(Command)
     def add_worker(self, command: Command):
+        cfg = OmegaConf.create(command.config) if command.config else None
         worker = Worker(
             command.block_name,
             command.thread_id,
-            command.block_name,
+            library.get_topic(command.block_name, command.thread_id),
             self.address,
+            self.context,
+            delivery.get_delivery_policy(cfg, command.block_name),
+            self.trace_collector,
         )
+        worker.drops.connect(self._on_drops)
         worker_thread = QThread()
         worker.moveToThread(worker_thread)
         worker_thread.started.connect(worker.run)
@@ -47,7 +59,8 @@ class WorkerHub(QObject):
         self.worker_threads[thread_name] = worker_thread
         worker_thread.start()
 
-        if command.block_name != library.BlockName.Heartbeat.value:
+        # heartbeat and metrics are published by the edge without being started
+        if command.block_name not in (library.BlockName.Heartbeat.value, library.BlockName.Metrics.value):
             payload = command.SerializeToString()
             self.command_socket.send_string(f"{time.monotonic_ns()}", zmq.SNDMORE)
             self.command_socket.send(payload)
@@ -71,18 +84,7 @@ class WorkerHub(QObject):
         del self.worker_threads[thread_name]
         del self.workers[thread_name]
 
-    @Slot(bytes, bytes, bytes)
-    def handle_transport_message(
-        self,
-        topic: bytes,
-        timestamp: bytes,
-        message: bytes,
-    ) -> None:
-        topic_name = topic.decode()
-        message_type = library.TRANSPORT_TOPICS[topic_name]
-
-        content = message_type()
-        content.ParseFromString(message)
-        thread_name = library.get_thread_name(topic_name, content.thread_id)
-        worker = self.workers[thread_name]
-        worker.content_msg.emit(topic, timestamp, message)
+    @Slot(str, int)
+    def _on_drops(self, thread_name: str, num_dropped: int) -> None:
+        self.num_dropped[thread_name] = num_dropped
+        self.drops.emit(dict(self.num_dropped))
@@ -0,0 +1,92 @@
+"""Offline batch results against the streaming ShortTimeFFT and PSD on short synthetic sessions."""
+from pathlib import Path
+import tempfile
+import unittest
+
+import numpy as np
+
+from shaggy.recording import batch, chunked, spectrogram
+from shaggy.signal import spectral_payload
+from shaggy.signal.short_time_fft import ShortTimeFFT
+from shaggy.signal.spectral_average import SpectralAverage
+
+NUM_CHANNELS = 4
+SAMPLE_RATE = 48000
+WINDOW_LENGTH = 960
+FRAME_LENGTH = 480
+
+
+def get_cfg(encoding: str) -> dict:
+    return {
+        'gstreamer_src': {'sample_rate': SAMPLE_RATE, 'channels': NUM_CHANNELS},
+        'stft': {'window_length': WINDOW_LENGTH, 'stride_length': 480, 'window_spec': "HAMMING",
+                 'scaling_spec': "psd", 'encoding': encoding},
+        'psd': {'num_windows': 4, 'window_hop': 2, 'mode': "welch"},
+    }
+
+
+def write_session(folder: Path, samples: np.ndarray) -> None:
+    writer = chunked.ChunkedWriter(folder, SAMPLE_RATE, samples.shape[1], chunk_s=0.5)
+    writer.open(0, 0)
+    writer.write(samples.tobytes(), 0, 0, 0)
+    writer.close()
+
+
+def stream(cfg: dict, samples: np.ndarray) -> tuple:
+    """Encoded STFT windows and PSD outputs of the streaming transform pushed samples in frames."""
+    stft = ShortTimeFFT.from_cfg(cfg)
+    payload = spectral_payload.SpectralPayload.from_cfg(cfg)
+    psd_payload = spectral_payload.SpectralPayload.from_cfg(cfg, spectral_payload.FLOAT32)
+    average = SpectralAverage.from_cfg(cfg)
+    windows, psds = [], []
+    frames = [samples[start:start + FRAME_LENGTH] for start in range(0, len(samples), FRAME_LENGTH)]
+    for frame in [*frames, None]:
+        # each output is overwritten by the next push, the stream is flushed after its last frame
+        output = stft.flush() if frame is None else stft.push(frame.T)
+        if output is None:
+            continue
+        buf = output.permute(2, 1, 0).numpy()
+        windows.append(payload.encode(payload.select(buf)).copy())
+        power = spectral_payload.get_power(psd_payload.select(buf))
+        for window in range(len(power)):
+            psd = average.update(power[window:window + 1])
+            if psd is not None:
+                psds.append(psd_payload.encode(psd).copy())
+    return np.concatenate(windows), np.stack(psds)
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.root = Path(folder.name)
+        rng = np.random.default_rng(0)
+        # neither the session nor the batch chunks are whole numbers of frames or strides
+        self.samples = rng.standard_normal((round(1.3 * SAMPLE_RATE) + 7, NUM_CHANNELS)).astype(np.float32)
+        write_session(self.root / "session", self.samples)
+
+    def test_matches_streaming(self):
+        for encoding in (spectral_payload.FLOAT32, spectral_payload.UINT16_DB):
+            with self.subTest(encoding=encoding):
+                cfg = get_cfg(encoding)
+                output = self.root / encoding
+                tasks = batch.plan_session(self.root / "session", cfg, output, chunk_s=0.2)
+                self.assertGreater(len(tasks), 2)
+                for _ in batch.run_tasks(tasks, 1):
+                    pass
+
+                reader = spectrogram.SpectrogramReader(output / "session" / batch.STFT_TASK)
+                batch_windows = reader.read(0, reader.num_times)
+                batch_psds = np.load(output / "session" / batch.PSD_TASK / spectrogram.PSD_FILE)
+                stream_windows, stream_psds = stream(cfg, self.samples)
+                self.assertTrue(np.array_equal(stream_windows, batch_windows))
+                self.assertTrue(np.array_equal(stream_psds, batch_psds))
+
+    def test_short_session_is_skipped(self):
+        write_session(self.root / "short", self.samples[:WINDOW_LENGTH // 2 - 1])
+        self.assertIsNone(batch.plan_session(self.root / "short", get_cfg(spectral_payload.FLOAT32), self.root))
+
+
+if __name__ == "__main__":
+    unittest.main()
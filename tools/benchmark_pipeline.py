@@ -0,0 +1,271 @@
+#!/usr/bin/env -S uv run
+"""Throughput, latency, CPU and memory of the edge pipeline on a synthetic source.
+
+Each configuration runs in a fresh process with an EdgeBridge on the local address, started and acked
+the way the host UI does it. The synthetic source replaces the audio interface and camera, blocks
+publish metrics snapshots and trace frames, and the harness subscribes to the bridge like the host.
+
+Latency is from source capture to the edge bridge forwarding the output, the summary shows the slowest
+output block, per hop percentiles are in the json report. CPU is user plus system time of the run and
+its block processes over wall time, RSS is their resident memory at the end of the run. Reports record the commit, library versions and machine,
+--baseline prints each run relative to a previous report.
+"""
+
+import json
+import multiprocessing
+import os
+from pathlib import Path
+import platform
+import subprocess
+import threading
+import time
+
+import click
+import numpy as np
+from omegaconf import OmegaConf
+import torch
+import zmq
+
+from shaggy.blocks.block_hub import SYNTHETIC_SOURCE
+from shaggy.proto import wire
+from shaggy.proto.command_pb2 import Command
+from shaggy.proto.metrics_pb2 import BlockMetrics
+from shaggy.transport import library, trace
+from shaggy.transport.edge_bridge import EdgeBridge
+
+ROOT = Path(__file__).parent.parent
+BLOCK_NAMES = (
+    library.BlockName.ChannelLevels.value,
+    library.BlockName.ShortTimeFFT.value,
+    library.BlockName.PowerSpectralDensity.value,
+)
+# source queue when frames are not paced, an unbounded queue would only measure memory growth
+FREE_RUNNING_HWM = 100
+STARTUP_TIMEOUT_S = 60.
+
+
+def build_cfg(num_channels, sample_rate, window_length, stride_length, frame_length, wire_format, realtime, mode):
+    return {
+        'gstreamer_src': {'sample_rate': sample_rate, 'channels': num_channels, 'source': SYNTHETIC_SOURCE},
+        'synthetic_src': {'frame_length': frame_length, 'realtime': realtime},
+        'stft': {
+            'window_length': window_length,
+            'stride_length': stride_length,
+            'window_spec': "HAMMING",
+            'scaling_spec': "psd",
+        },
+        'transport': {'wire': wire_format, 'trace': True},
+        'execution': {block_name: mode for block_name in BLOCK_NAMES},
+        'delivery': {} if realtime else {
+            library.BlockName.GStreamerSrc.value: {'policy': "bounded", 'hwm': FREE_RUNNING_HWM},
+        },
+        'metrics': {'interval_s': 0.5},
+    }
+
+
+def send_command(socket, command: Command) -> None:
+    socket.send_string(f"{time.monotonic_ns()}", zmq.SNDMORE)
+    socket.send(command.SerializeToString())
+
+
+def get_cpu_s(pid) -> float:
+    """User plus system CPU seconds of a process."""
+    fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def get_rss_mb(pid) -> float:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return 0.
+
+
+def get_pids() -> list:
+    return [os.getpid(), *(child.pid for child in multiprocessing.active_children())]
+
+
+def run_config(cfg: dict, block_names: list, duration_s: float, warmup_s: float, connection) -> None:
+    """Run one configuration and send its results, the process exits without joining block threads."""
+    address = library.LOCAL_HOST
+    context = zmq.Context.instance()
+    edge_bridge = EdgeBridge(address, context)
+    threading.Thread(target=edge_bridge.run, daemon=True).start()
+
+    command_socket = context.socket(zmq.PAIR)
+    command_socket.connect(library.get_command_connection(address))
+    sub_socket = context.socket(zmq.SUB)
+    sub_socket.connect(library.get_bridge_connection(address))
+    for block_name in (library.BlockName.Heartbeat.value, library.BlockName.Metrics.value, *block_names):
+        sub_socket.setsockopt_string(zmq.SUBSCRIBE, library.get_topic_prefix(block_name))
+
+    yaml_cfg = OmegaConf.to_yaml(OmegaConf.create(cfg))
+    thread_ids = {}
+    for thread_number, block_name in enumerate((library.BlockName.GStreamerSrc.value, *block_names)):
+        thread_ids[block_name] = f"{thread_number:05d}"
+        command = Command()
+        command.command = 'startup'
+        command.block_name = block_name
+        command.thread_id = thread_ids[block_name]
+        command.config = yaml_cfg
+        send_command(command_socket, command)
+
+    collector = trace.TraceCollector()
+    counts = {block_name: [0, 0] for block_name in block_names}
+    first_metrics, last_metrics = {}, {}
+    # warmup starts once every block has published, block processes take a while to import
+    started = set()
+    startup_timeout_s = time.monotonic() + STARTUP_TIMEOUT_S
+    measure_s = stop_s = np.inf
+    is_measuring = False
+    while (now_s := time.monotonic()) < stop_s:
+        if measure_s == np.inf and (len(started) == len(block_names) or now_s > startup_timeout_s):
+            measure_s = now_s + warmup_s
+            stop_s = measure_s + duration_s
+        if not is_measuring and now_s >= measure_s:
+            is_measuring = True
+            start_cpu_s = sum(get_cpu_s(pid) for pid in get_pids())
+        if not sub_socket.poll(100):
+            continue
+        frames = sub_socket.recv_multipart()
+        block_name, _ = library.split_topic(frames[0].decode())
+        _, _, message = wire.decode(frames)
+        if block_name == library.BlockName.Heartbeat.value:
+            command = Command()
+            command.ParseFromString(message)
+            command.ack = True
+            send_command(command_socket, command)
+        elif block_name == library.BlockName.Metrics.value:
+            metrics = BlockMetrics()
+            metrics.ParseFromString(message)
+            thread_name = library.get_thread_name(metrics.block_name, metrics.thread_id)
+            if is_measuring:
+                first_metrics.setdefault(thread_name, last_metrics.get(thread_name, metrics))
+            last_metrics[thread_name] = metrics
+        elif not is_measuring:
+            started.add(block_name)
+        else:
+            counts[block_name][0] += 1
+            counts[block_name][1] += sum(len(frame) for frame in frames[:3])
+            if len(frames) > 3:
+                collector.add(trace.Trace.unpack(frames[3]))
+
+    cpu_s = sum(get_cpu_s(pid) for pid in get_pids()) - start_cpu_s
+    blocks = {}
+    for thread_name, last in last_metrics.items():
+        first = first_metrics.get(thread_name, BlockMetrics())
+        elapsed_s = max(last.elapsed_ns - first.elapsed_ns, 1) / 1e9
+        blocks[thread_name] = {
+            'messages_in_per_s': (last.messages_in - first.messages_in) / elapsed_s,
+            'busy': (last.parse_ns - first.parse_ns) / 1e9 / elapsed_s,
+            'max_queue_depth': last.max_queue_depth,
+            'num_dropped': last.num_dropped,
+        }
+    connection.send({
+        'topics': {
+            block_name: {'messages_per_s': num_messages / duration_s, 'MB_per_s': num_bytes / duration_s / 1e6}
+            for block_name, (num_messages, num_bytes) in counts.items()
+        },
+        'latency_ms': collector.summary(),
+        'cpu_cores': cpu_s / duration_s,
+        'rss_mb': sum(get_rss_mb(pid) for pid in get_pids()),
+        'blocks': blocks,
+    })
+    connection.close()
+    # block threads only stop on the host's shutdown commands, nothing is left to clean up, exiting skips
+    # the cleanup of daemon block processes so they are stopped here
+    for child in multiprocessing.active_children():
+        child.terminate()
+    os._exit(0)
+
+
+def get_environment() -> dict:
+    def git(*args):
+        result = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=False)
+        return result.stdout.strip()
+
+    cpu_model = next((line.split(":", 1)[1].strip() for line in Path("/proc/cpuinfo").read_text().splitlines()
+                      if line.startswith("model name")), platform.processor())
+    return {
+        'commit': git("rev-parse", "--short", "HEAD"),
+        'dirty': bool(git("status", "--porcelain", "--untracked-files=no")),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'torch': torch.__version__,
+        'zmq': zmq.zmq_version(),
+        'cpu': cpu_model,
+        'num_cpus': os.cpu_count(),
+    }
+
+
+def summarize(run: dict) -> dict:
+    """Headline numbers of a run, compared against a baseline."""
+    results = run['results']
+    totals = [stats for hop, stats in results['latency_ms'].items() if hop.endswith(" total")]
+    return {
+        'msg/s': sum(topic['messages_per_s'] for topic in results['topics'].values()),
+        'p50 ms': max((total['p50_ms'] for total in totals), default=0.),
+        'p99 ms': max((total['p99_ms'] for total in totals), default=0.),
+        'max ms': max((total['max_ms'] for total in totals), default=0.),
+        'cpu': results['cpu_cores'],
+        'RSS MB': results['rss_mb'],
+    }
+
+
+def get_run_name(run: dict) -> str:
+    cfg = run['cfg']
+    return (f"{cfg['gstreamer_src']['channels']}ch {cfg['gstreamer_src']['sample_rate']}Hz "
+            f"{cfg['stft']['window_length']}/{cfg['stft']['stride_length']}")
+
+
+@click.command()
+@click.option('--channels', 'channel_counts', multiple=True, type=int, default=(2, 8, 16),
+              help="Channel counts, one run each.")
+@click.option('--sample-rate', default=48000)
+@click.option('--window-length', default=12000)
+@click.option('--stride-length', default=6000)
+@click.option('--frame-length', default=480, help="Samples per source frame.")
+@click.option('--blocks', 'block_names', default=",".join(BLOCK_NAMES), help="Comma separated consumer blocks.")
+@click.option('--wire', 'wire_format', type=click.Choice([wire.PROTOBUF, wire.BINARY]), default=wire.PROTOBUF)
+@click.option('--mode', type=click.Choice([mode.value for mode in library.ExecutionMode]),
+              default=library.ExecutionMode.Thread.value, help="Execution mode of every consumer block.")
+@click.option('--realtime/--free-running', default=True, help="Pace the source or publish as fast as possible.")
+@click.option('--duration-s', default=10.)
+@click.option('--warmup-s', default=2., help="Seconds discarded after every block has published.")
+@click.option('--output', type=click.Path(dir_okay=False), help="Write the json report.")
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help="Report to compare against.")
+def main(channel_counts, sample_rate, window_length, stride_length, frame_length, block_names, wire_format, mode,
+         realtime, duration_s, warmup_s, output, baseline):
+    block_names = [block_name for block_name in block_names.split(",") if block_name]
+    process_context = multiprocessing.get_context("spawn")
+    report = {'environment': get_environment(), 'runs': []}
+    for num_channels in channel_counts:
+        cfg = build_cfg(num_channels, sample_rate, window_length, stride_length, frame_length, wire_format,
+                        realtime, mode)
+        receiver, sender = process_context.Pipe(duplex=False)
+        process = process_context.Process(target=run_config, args=(cfg, block_names, duration_s, warmup_s, sender))
+        process.start()
+        results = receiver.recv()
+        process.join()
+        report['runs'].append({'cfg': cfg, 'block_names': block_names, 'results': results})
+
+    baseline_runs = {}
+    if baseline:
+        baseline_runs = {get_run_name(run): summarize(run) for run in json.loads(Path(baseline).read_text())['runs']}
+    columns = list(summarize(report['runs'][0]))
+    click.echo(f"{'run':<24}" + "".join(f"{column:>12}" for column in columns))
+    for run in report['runs']:
+        name = get_run_name(run)
+        summary = summarize(run)
+        click.echo(f"{name:<24}" + "".join(f"{summary[column]:>12.2f}" for column in columns))
+        if name in baseline_runs:
+            ratios = [summary[column] / baseline_runs[name][column] if baseline_runs[name][column] else np.nan
+                      for column in columns]
+            click.echo(f"{'  vs baseline':<24}" + "".join(f"{ratio:>11.2f}x" for ratio in ratios))
+
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
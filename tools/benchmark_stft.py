@@ -0,0 +1,106 @@
+#!/usr/bin/env -S uv run
+"""Per frame latency and allocation counts of the STFT publish path.
+
+Compares the original path (unfold, pad, window, rfft, movedim, scaling, numpy, moveaxis, tobytes)
+with ShortTimeFFT.forward_into for the conf/stft/default.yaml settings.
+"""
+
+from pathlib import Path
+import time
+import tracemalloc
+
+import click
+import numpy as np
+from omegaconf import OmegaConf
+import torch
+from torch.profiler import ProfilerActivity, profile
+
+from shaggy.signal.short_time_fft import ShortTimeFFT
+
+ROOT = Path(__file__).parent.parent
+CONF_DIR = ROOT / "conf"
+
+
+def load_cfg(num_channels):
+    """Compose the block config from the default acoustic source and stft configs."""
+    conf = OmegaConf.create({
+        "acoustic_src": OmegaConf.load(CONF_DIR / "acoustic_src/test_src.yaml"),
+        "stft": OmegaConf.load(CONF_DIR / "stft/default.yaml"),
+    })
+    return {
+        "gstreamer_src": {
+            "sample_rate": conf.acoustic_src.sample_rate,
+            "channels": num_channels or conf.acoustic_src.channels,
+        },
+        "stft": OmegaConf.to_container(conf.stft, resolve=True),
+    }
+
+
+def original_frame(stft, samples):
+    x = samples.unfold(-1, stft.window_length, stft.stride_length)
+    if x.shape[-1] < stft.mfft:
+        z_shape = list(x.shape)
+        z_shape[-1] = stft.mfft - x.shape[-1]
+        x = torch.hstack((x, torch.zeros(z_shape, dtype=x.dtype, device=x.device)))
+    x = x * stft.window
+    x = torch.fft.rfft(x, dim=-1)
+    x = torch.movedim(x, 2, 1)
+    x = x * stft.scaling
+    sample_buf = np.moveaxis(x.numpy(), [0, 1, 2], [-1, -2, -3])
+    return sample_buf.tobytes()
+
+
+def fused_frame(stft, samples):
+    return stft.forward_into(samples).permute(2, 1, 0).numpy()
+
+
+def count_allocations(frame, stft, samples):
+    """Number of tensor allocations and peak python heap bytes for one steady state frame."""
+    frame(stft, samples)
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        frame(stft, samples)
+    num_tensors = sum(1 for event in prof.events() if event.cpu_memory_usage > 0)
+
+    tracemalloc.start()
+    frame(stft, samples)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return num_tensors, peak_bytes
+
+
+def time_frames(frame, stft, samples, num_frames):
+    frame(stft, samples)
+    latencies = np.empty(num_frames)
+    for i in range(num_frames):
+        start = time.perf_counter_ns()
+        frame(stft, samples)
+        latencies[i] = time.perf_counter_ns() - start
+    return latencies / 1e6
+
+
+@click.command()
+@click.option('--channels', 'num_channels', type=int, default=None, help="Defaults to the acoustic source config.")
+@click.option('--windows', 'num_windows', type=int, default=1, help="STFT windows computed per frame.")
+@click.option('--frames', 'num_frames', type=int, default=200)
+def main(num_channels, num_windows, num_frames):
+    cfg = load_cfg(num_channels)
+    stft = ShortTimeFFT.from_cfg(cfg)
+    num_samples = stft.window_length + (num_windows - 1) * stft.stride_length
+    samples = torch.randn((cfg["gstreamer_src"]["channels"], num_samples), dtype=torch.float32)
+
+    expected = np.frombuffer(original_frame(stft, samples), dtype=np.complex64)
+    result = fused_frame(stft, samples).ravel()
+    max_error = np.max(np.abs(expected - result)) / np.max(np.abs(expected))
+
+    print(f"channels={samples.shape[0]} window_length={stft.window_length} stride_length={stft.stride_length} "
+          f"mfft={stft.mfft} windows/frame={num_windows} relative error={max_error:.2e}")
+    print(f"{'path':<10}{'p50 ms':>10}{'p99 ms':>10}{'tensor allocs':>16}{'python peak B':>16}")
+    for name, frame in (("original", original_frame), ("fused", fused_frame)):
+        latencies = time_frames(frame, stft, samples, num_frames)
+        num_tensors, peak_bytes = count_allocations(frame, stft, samples)
+        print(f"{name:<10}{np.percentile(latencies, 50):>10.3f}{np.percentile(latencies, 99):>10.3f}"
+              f"{num_tensors:>16}{peak_bytes:>16}")
+
+
+if __name__ == "__main__":
+    main()
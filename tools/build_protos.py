@@ -12,6 +12,8 @@ proto_files = [
     "detections.proto",
     "command.proto",
     "channel_levels.proto",
+    "psd.proto",
+    "metrics.proto",
 ]
 
 for proto in proto_files:
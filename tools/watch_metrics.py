@@ -0,0 +1,45 @@
+#!/usr/bin/env -S uv run
+"""Print metrics snapshots of every edge block as a text table.
+
+Subscribes to the edge bridge alongside the host UI, blocks only publish snapshots when started with a
+metrics interval_s in their config.
+"""
+
+import time
+
+import click
+import zmq
+
+from shaggy.blocks.metrics import format_table
+from shaggy.proto import wire
+from shaggy.proto.metrics_pb2 import BlockMetrics
+from shaggy.transport import library
+
+
+@click.command()
+@click.option('--external', 'address_type', flag_value='external', default='external')
+@click.option('--local', 'address_type', flag_value='local')
+@click.option('--interval-s', default=1., help="Seconds between printed tables.")
+def main(address_type, interval_s):
+    socket = zmq.Context.instance().socket(zmq.SUB)
+    socket.connect(library.get_bridge_connection(library.get_address(address_type)))
+    socket.setsockopt_string(zmq.SUBSCRIBE, library.get_topic_prefix(library.BlockName.Metrics.value))
+
+    snapshots = {}
+    previous = {}
+    next_print = time.monotonic() + interval_s
+    while True:
+        if socket.poll(max(0, int((next_print - time.monotonic()) * 1000))):
+            _, _, message = wire.decode(socket.recv_multipart())
+            metrics = BlockMetrics()
+            metrics.ParseFromString(message)
+            snapshots[library.get_thread_name(metrics.block_name, metrics.thread_id)] = metrics
+        if time.monotonic() >= next_print:
+            click.clear()
+            click.echo(format_table(snapshots, previous))
+            previous = dict(snapshots)
+            next_print += interval_s
+
+
+if __name__ == "__main__":
+    main()